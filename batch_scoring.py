@@ -0,0 +1,471 @@
+"""
+バッチ予測エンジン
+Description: 保存済みパイプライン（pipeline_artifacts.py）を使い、入力をマイクロバッチで読みながら
+             正規化と予測を中間DataFrameのコピーなしで実行する。
+             ファイル入力はプロセスプールで並列処理し、予測結果を出力先へ順に追記する。
+             HTTP / 標準入力（JSON Lines）からの予測リクエストもまとめて処理できる
+
+使用例:
+    # ファイルを一括予測
+    python batch_scoring.py file models/sales_forecast daily_inputs.csv predictions.csv
+    # HTTPサーバー（POST /predict）
+    python batch_scoring.py http models/sales_forecast --port 8080
+    # 標準入力（1行1レコードのJSON）
+    cat requests.jsonl | python batch_scoring.py stdin models/sales_forecast
+"""
+
+import argparse
+import json
+import os
+import queue
+import sys
+import threading
+import time
+import warnings
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from compact_numeric import CompactScaler, to_compact_matrix
+from parallel_normalize import _ordered_results, _read_task, plan_source
+from pipeline_artifacts import PipelineArtifact, load_pipeline
+from streaming_scaler import apply_scaling
+
+DEFAULT_CHUNK_BYTES = 8 * 1024 * 1024
+DEFAULT_MAX_BATCH = 4096
+DEFAULT_MAX_WAIT_MS = 5
+
+
+# =========================================
+# 1. 正規化と予測の一体化
+# =========================================
+
+def fused_scaling_params(scaler: Any) -> Optional[Dict[str, np.ndarray]]:
+    """
+    学習済みスケーラーを (x - offset) / scale の形のパラメータに変換
+
+    StandardScaler / MinMaxScaler / RobustScaler / CompactScaler に対応。それ以外のスケーラーや、
+    with_mean=False などで transform() と同じ式にならない設定では None を返し、
+    呼び出し側はスケーラーの transform() を使う（sklearn は with_mean=False でも mean_ を持つため、
+    属性の有無ではなく設定で判定する）。
+
+    Args:
+        scaler (Any): 学習済みスケーラー
+
+    Returns:
+        Optional[Dict[str, np.ndarray]]: apply_scaling() 用のパラメータ
+    """
+    if isinstance(scaler, CompactScaler):
+        return scaler.params
+    try:
+        from sklearn.preprocessing import MinMaxScaler, RobustScaler, StandardScaler
+    except ImportError:  # sklearn がなければ sklearn のスケーラーも読み込めない
+        return None
+
+    if isinstance(scaler, StandardScaler):
+        n = scaler.n_features_in_
+        offset = scaler.mean_ if scaler.with_mean else np.zeros(n)
+        scale = scaler.scale_ if scaler.with_std else np.ones(n)
+    elif isinstance(scaler, MinMaxScaler):
+        # x * scale_ + min_ = (x - (-min_ / scale_)) / (1 / scale_)
+        if scaler.clip:
+            return None
+        offset = -scaler.min_ / scaler.scale_
+        scale = 1.0 / scaler.scale_
+    elif isinstance(scaler, RobustScaler):
+        n = scaler.n_features_in_
+        offset = scaler.center_ if scaler.with_centering else np.zeros(n)
+        scale = scaler.scale_ if scaler.with_scaling else np.ones(n)
+    else:
+        return None
+    if offset is None or scale is None:
+        return None
+    return {'offset': np.asarray(offset, dtype=float), 'scale': np.asarray(scale, dtype=float)}
+
+
+class ArtifactScorer:
+    """
+    保存済みパイプラインで DataFrame / 配列を予測するクラス
+
+    特徴量は事前に確保した1つの配列へ列ごとに書き込み、その配列をその場で正規化して
+    model.predict() に渡す（DataFrameのコピーを作らない）。
+    予測の前に学習時の特徴量スキーマと照合する（JSONやCSVの整数列など、学習時の型に変換できる列は変換する）。
+    """
+
+    def __init__(self, artifact: PipelineArtifact):
+        self.artifact = artifact
+        self.feature_columns = artifact.feature_columns
+        artifact.load()
+        self.params = fused_scaling_params(artifact.scaler) if artifact.scaler is not None else None
+        # CompactScaler で学習したモデルには学習時と同じ float32 の配列を渡す
+        self.dtype = np.dtype(getattr(artifact.scaler, 'dtype', np.float64))
+
+    def conform(self, frame: pd.DataFrame) -> pd.DataFrame:
+        """特徴量の列を学習時の型に揃える（変換できない列はそのまま残し、check_schema で検出する）"""
+        expected = self.artifact.metadata.get('feature_dtypes') or {}
+        changed = {}
+        for col in self.feature_columns:
+            if col in frame.columns and col in expected and str(frame[col].dtype) != expected[col]:
+                try:
+                    changed[col] = frame[col].astype(expected[col])
+                except (ValueError, TypeError):
+                    pass
+        return frame.assign(**changed) if changed else frame
+
+    def feature_array(self, frame: pd.DataFrame) -> np.ndarray:
+        """特徴量の列を学習時の順序で1つの配列にまとめる"""
+        missing = [col for col in self.feature_columns if col not in frame.columns]
+        if missing:
+            raise ValueError(f"特徴量の列が不足しています: {missing}")
+        return to_compact_matrix(frame, self.feature_columns, dtype=self.dtype)
+
+    def score_array(self, values: np.ndarray) -> np.ndarray:
+        """
+        特徴量配列を正規化して予測（values はその場で書き換える）
+
+        Args:
+            values (np.ndarray): 2次元配列（行 × 特徴量）
+
+        Returns:
+            np.ndarray: 予測値
+        """
+        scaler, model = self.artifact.scaler, self.artifact.model
+        if self.params is not None:
+            values = apply_scaling(values, self.params)
+        elif scaler is not None:
+            values = scaler.transform(values)
+        with warnings.catch_warnings():
+            # 列名付きで学習したモデルに配列を渡した時の警告は出さない
+            warnings.filterwarnings('ignore', message='X does not have valid feature names')
+            return model.predict(values)
+
+    def score_frame(self, frame: pd.DataFrame) -> np.ndarray:
+        """DataFrameの特徴量列を予測"""
+        if frame.empty:
+            return np.empty(0)
+        frame = self.conform(frame)
+        self.artifact.check_schema(frame)
+        return self.score_array(self.feature_array(frame))
+
+
+# =========================================
+# 2. ファイルのバッチ予測（プロセスプール）
+# =========================================
+
+_worker_scorer: Optional[ArtifactScorer] = None
+
+
+def _init_worker(artifact_path: str, version: Optional[str]):
+    """
+    ワーカー起動時にパイプラインを読み込む
+
+    メモリマップで共有されるのはスケーラーなどの ndarray だけで、決定木のモデルは
+    ワーカーごとにコピーされる（ワーカー数 × モデルの大きさのメモリが必要）。
+    """
+    global _worker_scorer
+    _worker_scorer = ArtifactScorer(load_pipeline(artifact_path, version, mmap_mode='r'))
+
+
+def _score_task(source: Dict[str, Any], task: Any, prediction_column: str,
+                keep_columns: Optional[List[str]]) -> pd.DataFrame:
+    """ワーカー内で1バッチを読み込んで予測"""
+    chunk = _read_task(source, task)
+    chunk[prediction_column] = _worker_scorer.score_frame(chunk)
+    if keep_columns is not None:
+        chunk = chunk[keep_columns + [prediction_column]]
+    return chunk
+
+
+class CsvSink:
+    """予測結果をCSVへ追記する出力先"""
+
+    def __init__(self, path: str, encoding: str = 'utf-8-sig'):
+        self.path = path
+        self.encoding = encoding
+        self.file = None
+        self.rows = 0
+
+    def write(self, chunk: pd.DataFrame):
+        if self.file is None:
+            self.file = open(self.path, 'w', encoding=self.encoding, newline='')
+            chunk.to_csv(self.file, index=False)
+        else:
+            chunk.to_csv(self.file, index=False, header=False)
+        self.rows += len(chunk)
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+
+
+def open_output(output_path: str):
+    """出力先を作成（.csv はCSV、それ以外は parallel_normalize.open_sink）"""
+    if output_path.lower().endswith('.csv'):
+        return CsvSink(output_path)
+    from parallel_normalize import open_sink
+    return open_sink(output_path)
+
+
+def score_file(artifact_path: str, input_path: str, output_path: str, version: str = None,
+               prediction_column: str = None, keep_columns: List[str] = None, max_workers: int = None,
+               chunk_bytes: int = DEFAULT_CHUNK_BYTES, encoding: str = 'utf-8') -> int:
+    """
+    ファイルをマイクロバッチに分けて並列に予測し、予測結果を出力先へ追記
+
+    Args:
+        artifact_path (str): save_pipeline() の保存先ディレクトリ
+        input_path (str): 入力ファイル（.csv, .parquet, .npy）
+        output_path (str): 出力先（.csv, .parquet、またはディレクトリ）
+        version (str): パイプラインのバージョン（None=最新）
+        prediction_column (str): 予測値の列名（None=predicted_<目的変数名>）
+        keep_columns (List[str]): 出力に残す入力列（None=すべて）
+        max_workers (int): プロセス数（None=CPU数）
+        chunk_bytes (int): CSVの1バッチのバイト数
+        encoding (str): CSVの文字エンコーディング
+
+    Returns:
+        int: 予測した行数
+    """
+    artifact = load_pipeline(artifact_path, version)
+    prediction_column = prediction_column or f"predicted_{artifact.metadata.get('target_column') or 'value'}"
+    source, tasks = plan_source(input_path, chunk_bytes=chunk_bytes, encoding=encoding)
+    print(f"🔀 {len(tasks)}バッチに分割しました (モデル: {artifact.version})")
+
+    workers = max_workers or os.cpu_count() or 1
+    start = time.perf_counter()
+    sink = open_output(output_path)
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(artifact_path, artifact.version)) as executor:
+            for chunk in _ordered_results(executor, _score_task, source, tasks,
+                                          (prediction_column, keep_columns), max_in_flight=workers * 2):
+                sink.write(chunk)
+    finally:
+        sink.close()
+
+    elapsed = time.perf_counter() - start
+    rate = sink.rows / elapsed * 60 if elapsed > 0 else 0
+    print(f"✅ {sink.rows:,}行を予測しました: {output_path} ({elapsed:.1f}秒, {rate:,.0f}行/分)")
+    return sink.rows
+
+
+# =========================================
+# 3. リクエストのマイクロバッチ処理
+# =========================================
+
+class MicroBatcher:
+    """
+    少量ずつ届く予測リクエストをまとめて予測するクラス
+
+    max_batch 行たまるか、最初のリクエストから max_wait_ms 経過した時点で
+    1回の予測にまとめ、結果を各リクエストの Future に分配する。
+    """
+
+    def __init__(self, scorer: ArtifactScorer, max_batch: int = DEFAULT_MAX_BATCH,
+                 max_wait_ms: float = DEFAULT_MAX_WAIT_MS):
+        self.scorer = scorer
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.requests = queue.Queue()
+        self.batches = 0
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def submit(self, records: List[Dict[str, Any]]) -> Future:
+        """
+        レコードのリストを予測キューに追加
+
+        Returns:
+            Future: 予測値のリストを返す Future
+        """
+        future = Future()
+        self.requests.put((records, future))
+        return future
+
+    def predict(self, records: List[Dict[str, Any]], timeout: float = None) -> List[float]:
+        """レコードを予測して結果を待つ"""
+        return self.submit(records).result(timeout)
+
+    def close(self):
+        """キューに残ったリクエストを処理して停止"""
+        self.requests.put(None)
+        self._thread.join()
+
+    def _collect(self, first) -> tuple:
+        """最初のリクエストに続くリクエストを上限まで集める"""
+        batch, rows = [first], len(first[0])
+        deadline = time.monotonic() + self.max_wait
+        stop = False
+        while rows < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self.requests.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is None:
+                stop = True
+                break
+            batch.append(item)
+            rows += len(item[0])
+        return batch, stop
+
+    def _run(self):
+        stop = False
+        while not stop:
+            first = self.requests.get()
+            if first is None:
+                break
+            batch, stop = self._collect(first)
+            records = [record for request_records, _ in batch for record in request_records]
+            try:
+                predictions = self.scorer.score_frame(pd.DataFrame.from_records(records)).tolist()
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+
+            self.batches += 1
+            offset = 0
+            for request_records, future in batch:
+                future.set_result(predictions[offset:offset + len(request_records)])
+                offset += len(request_records)
+
+
+def serve_http(batcher: MicroBatcher, host: str = '127.0.0.1', port: int = 8080):
+    """
+    ローカルHTTPサーバーで予測リクエストを受け付ける
+
+    POST /predict  本文: {"records": [{...}, ...]} またはレコードのリスト
+                   応答: {"predictions": [...], "version": "..."}
+    GET  /health   応答: パイプラインのメタデータ
+    """
+    metadata = batcher.scorer.artifact.metadata
+
+    class PredictHandler(BaseHTTPRequestHandler):
+        def _send_json(self, status: int, payload: Any):
+            body = json.dumps(payload, ensure_ascii=False, default=str).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == '/health':
+                self._send_json(200, metadata)
+            else:
+                self._send_json(404, {'error': 'not found'})
+
+        def do_POST(self):
+            if self.path != '/predict':
+                self._send_json(404, {'error': 'not found'})
+                return
+            try:
+                payload = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+                records = payload['records'] if isinstance(payload, dict) else payload
+                predictions = batcher.predict(records)
+            except (ValueError, KeyError, TypeError) as e:
+                self._send_json(400, {'error': str(e)})
+                return
+            except Exception as e:  # 予測中の想定外のエラーでも接続を切らずに返す
+                self._send_json(500, {'error': f"{type(e).__name__}: {e}"})
+                return
+            self._send_json(200, {'predictions': predictions, 'version': metadata['version']})
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), PredictHandler)
+    print(f"🌐 予測サーバーを起動しました: http://{host}:{port}/predict (Ctrl+Cで停止)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        batcher.close()
+        print(f"🛑 停止しました ({batcher.batches:,}バッチを処理)")
+
+
+def serve_stdin(batcher: MicroBatcher, prediction_column: str, input_stream=None, output_stream=None):
+    """
+    標準入力の JSON Lines（1行1レコード）を予測し、予測値を付けて標準出力へ書き出す
+
+    出力の順序は入力と同じ。読み込みと予測は並行して進む。
+    """
+    input_stream = input_stream or sys.stdin
+    output_stream = output_stream or sys.stdout
+    pending = deque()
+
+    def flush(wait: bool):
+        while pending and (wait or pending[0][1].done()):
+            record, future = pending.popleft()
+            try:
+                record[prediction_column] = future.result()[0]
+            except Exception as e:
+                record['error'] = str(e)
+            output_stream.write(json.dumps(record, ensure_ascii=False, default=float) + '\n')
+
+    for line in input_stream:
+        line = line.strip()
+        if not line:
+            continue
+        record = json.loads(line)
+        pending.append((record, batcher.submit([record])))
+        flush(wait=len(pending) >= batcher.max_batch * 4)
+    flush(wait=True)
+    output_stream.flush()
+    batcher.close()
+
+
+def main():
+    """メイン関数"""
+    parser = argparse.ArgumentParser(description='保存済みパイプラインによるバッチ予測')
+    subparsers = parser.add_subparsers(dest='mode', required=True)
+
+    file_parser = subparsers.add_parser('file', help='ファイルを一括予測')
+    file_parser.add_argument('artifact', help='save_pipeline() の保存先ディレクトリ')
+    file_parser.add_argument('input', help='入力ファイル（.csv, .parquet, .npy）')
+    file_parser.add_argument('output', help='出力先（.csv, .parquet、またはディレクトリ）')
+    file_parser.add_argument('--workers', type=int, help='プロセス数')
+    file_parser.add_argument('--chunk-mb', type=int, default=DEFAULT_CHUNK_BYTES // 1024 // 1024)
+    file_parser.add_argument('--encoding', default='utf-8')
+    file_parser.add_argument('--keep-columns', nargs='+', help='出力に残す入力列')
+
+    for name, help_text in [('http', 'HTTPサーバーで予測'), ('stdin', '標準入力のJSON Linesを予測')]:
+        sub = subparsers.add_parser(name, help=help_text)
+        sub.add_argument('artifact', help='save_pipeline() の保存先ディレクトリ')
+        sub.add_argument('--max-batch', type=int, default=DEFAULT_MAX_BATCH)
+        sub.add_argument('--max-wait-ms', type=float, default=DEFAULT_MAX_WAIT_MS)
+        if name == 'http':
+            sub.add_argument('--host', default='127.0.0.1')
+            sub.add_argument('--port', type=int, default=8080)
+
+    for sub in subparsers.choices.values():
+        sub.add_argument('--version', help='パイプラインのバージョン（省略時は最新）')
+        sub.add_argument('--prediction-column', help='予測値の列名')
+    args = parser.parse_args()
+
+    if args.mode == 'file':
+        score_file(args.artifact, args.input, args.output, version=args.version,
+                   prediction_column=args.prediction_column, keep_columns=args.keep_columns,
+                   max_workers=args.workers, chunk_bytes=args.chunk_mb * 1024 * 1024, encoding=args.encoding)
+        return
+
+    artifact = load_pipeline(args.artifact, args.version)
+    batcher = MicroBatcher(ArtifactScorer(artifact), max_batch=args.max_batch, max_wait_ms=args.max_wait_ms)
+    if args.mode == 'http':
+        serve_http(batcher, args.host, args.port)
+    else:
+        column = args.prediction_column or f"predicted_{artifact.metadata.get('target_column') or 'value'}"
+        serve_stdin(batcher, column)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,452 @@
+"""
+Tableau前処理ツール ベンチマークスイート
+Description: kyaba_sales.py形式の合成データで前処理・読み込み・保存・データ生成器の
+             実行時間とピークメモリ(RSS)を計測し、JSON履歴とベースライン比較で性能劣化を検出する
+
+使用例:
+    python benchmark_suite.py --scales 10000 1000000
+    python benchmark_suite.py --scales 10000 --save-baseline
+    python benchmark_suite.py --fail-on-regression
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import redirect_stdout
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from processing_metrics import peak_rss_bytes, resource
+from tableau_preprocessor import TableauDataPreprocessor
+
+
+# =========================================
+# 1. 基本設定
+# =========================================
+
+DEFAULT_SCALES = [10_000, 1_000_000, 10_000_000]
+DEFAULT_HISTORY_PATH = 'benchmark_history.json'
+DEFAULT_BASELINE_PATH = 'benchmark_baseline.json'
+
+# Excelは1シート1,048,576行が上限、かつ書き込みが極端に遅いため上限を設ける
+DEFAULT_MAX_EXCEL_ROWS = 100_000
+
+CSV_ENCODINGS = ['utf-8', 'shift_jis', 'cp932', 'iso-2022-jp']
+
+# kyaba_sales.py が書き出す売上CSV（実際に生成された行数を数える）
+GENERATOR_SALES_CSV = 'rose_garden_sales.csv'
+
+# kyaba_sales.py と同じ値の分布
+SERVICE_TYPES = ['通常セット', 'プレミアムセット', 'VIPコース', '延長コース', 'ボトルキープ']
+SERVICE_BASE_PRICES = [8000, 15000, 25000, 10000, 30000]
+PAYMENT_METHODS = ['現金', 'カード', '掛け', '電子マネー']
+HOUR_WEIGHTS = [5, 8, 12, 15, 18, 20, 15, 7]  # 19-26時の重み
+
+# 起動時間（新しいPythonプロセスでの import とウィンドウ表示）を計測するケース
+STARTUP_CASES = {
+    'cold_start_preprocessor': 'import tableau_preprocessor',
+    'cold_start_gui_import': 'import tableau_preprocessor_gui',
+    'cold_start_gui_window': ('import tkinter as tk, tableau_preprocessor_gui as gui; '
+                              'root = tk.Tk(); gui.TableauPreprocessorGUI(root); root.update(); root.destroy()'),
+}
+
+
+# =========================================
+# 2. 合成データ生成
+# =========================================
+
+def make_synthetic_sales(n_rows: int, seed: int = 42) -> pd.DataFrame:
+    """
+    kyaba_sales.py の売上データと同じ列構成の合成データをベクトル演算で生成
+
+    前処理の各操作が実際に仕事をするよう、欠損値・重複行・前後空白も混ぜる。
+
+    Args:
+        n_rows (int): 生成する行数
+        seed (int): 乱数シード
+
+    Returns:
+        pd.DataFrame: 合成売上データ
+    """
+    rng = np.random.default_rng(seed)
+
+    # 日付・時刻は取りうる値が少ないので、文字列表を作ってから添字で引く
+    start_date = pd.Timestamp.now().normalize() - pd.Timedelta(days=365)
+    date_labels = pd.date_range(start_date, periods=366).strftime('%Y-%m-%d').to_numpy()
+    time_labels = np.array([f"{h:02d}:{m:02d}:00" for h in range(24) for m in range(60)])
+    hour_p = np.array(HOUR_WEIGHTS, dtype=float) / sum(HOUR_WEIGHTS)
+    hours = rng.choice(np.arange(19, 27), n_rows, p=hour_p) % 24
+    minutes = rng.integers(0, 60, n_rows)
+
+    service_idx = rng.integers(0, len(SERVICE_TYPES), n_rows)
+    multiplier = rng.uniform(0.6, 4.0, n_rows)
+    base_charge = (np.take(SERVICE_BASE_PRICES, service_idx) * multiplier).astype(np.int64)
+    drink_charge = rng.integers(3000, 20001, n_rows)
+    nomination_fee = np.where(rng.random(n_rows) < 0.3, rng.integers(2000, 8001, n_rows), 0)
+    has_extension = rng.random(n_rows) < 0.2
+    extension_fee = np.where(has_extension, rng.integers(5000, 20001, n_rows), 0)
+    duration = np.where(has_extension, rng.integers(120, 361, n_rows), rng.integers(60, 181, n_rows))
+
+    df = pd.DataFrame({
+        'sale_id': np.arange(1, n_rows + 1),
+        'customer_id': rng.integers(1, 501, n_rows),
+        'cast_id': rng.integers(1, 31, n_rows),
+        'sale_date': np.take(date_labels, rng.integers(0, 366, n_rows)),
+        'sale_time': np.take(time_labels, hours * 60 + minutes),
+        'service_type': np.take(SERVICE_TYPES, service_idx),
+        'base_charge': base_charge,
+        'drink_charge': drink_charge,
+        'nomination_fee': nomination_fee,
+        'extension_fee': extension_fee,
+        'total_amount': base_charge + drink_charge + nomination_fee + extension_fee,
+        'payment_method': np.take(PAYMENT_METHODS, rng.integers(0, len(PAYMENT_METHODS), n_rows)),
+        'duration_minutes': duration,
+    })
+
+    # 前処理対象となる「汚れ」を混入
+    dirty = rng.random(n_rows) < 0.05
+    df.loc[dirty, 'service_type'] = '  ' + df.loc[dirty, 'service_type'] + '  '
+    df.loc[rng.random(n_rows) < 0.02, 'drink_charge'] = np.nan
+    df.loc[rng.random(n_rows) < 0.02, 'payment_method'] = np.nan
+    n_dup = n_rows // 100
+    if n_dup:
+        df = pd.concat([df.iloc[:n_rows - n_dup], df.iloc[:n_dup]], ignore_index=True)
+
+    return df
+
+
+# =========================================
+# 3. 計測ユーティリティ
+# =========================================
+
+def _new_processor(df: pd.DataFrame) -> TableauDataPreprocessor:
+    """読み込み済みの状態の TableauDataPreprocessor を作成"""
+    processor = TableauDataPreprocessor()
+    processor.file_path = 'benchmark.csv'
+    processor.data = df
+    processor.original_data = df
+    processor._update_data_info()
+    return processor
+
+
+def _operation_cases() -> Dict[str, Callable[[TableauDataPreprocessor, str], Any]]:
+    """TableauDataPreprocessor の各操作を計測ケースとして返す"""
+    return {
+        'show_data_info': lambda p, tmp: p.show_data_info(),
+        'remove_empty_rows': lambda p, tmp: p.remove_empty_rows(),
+        'remove_empty_columns': lambda p, tmp: p.remove_empty_columns(),
+        'remove_duplicates': lambda p, tmp: p.remove_duplicates(),
+        'fill_missing_values': lambda p, tmp: p.fill_missing_values(strategy='mean'),
+        'clean_text_data': lambda p, tmp: p.clean_text_data(),
+        'convert_data_types': lambda p, tmp: p.convert_data_types(),
+        'filter_data': lambda p, tmp: p.filter_data({
+            'total_amount': {'operator': '>', 'value': 30000},
+            'payment_method': {'operator': 'in', 'value': ['現金', 'カード']},
+        }),
+        'rename_columns': lambda p, tmp: p.rename_columns({'total_amount': 'amount'}),
+        'create_tableau_extract_csv': lambda p, tmp: p.create_tableau_extract(
+            os.path.join(tmp, 'extract.csv'), file_format='csv'),
+        'create_tableau_extract_excel': lambda p, tmp: p.create_tableau_extract(
+            os.path.join(tmp, 'extract.xlsx'), file_format='excel'),
+    }
+
+
+def _run_case(kind: str, name: str, source: str, workdir: str, args: List[str] = None) -> Dict[str, Any]:
+    """
+    子プロセス内で1ケースを実行して計測する
+
+    ケースごとに新しいプロセスを使うことで、ピークRSSが前のケースの影響を受けない。
+    args は generator ケースでスクリプトに渡すコマンドライン引数。
+    """
+    rss_before = peak_rss_bytes()
+    with open(os.devnull, 'w', encoding='utf-8') as devnull, redirect_stdout(devnull):
+        if kind == 'operation':
+            processor = _new_processor(pd.read_pickle(source))
+            rss_before = peak_rss_bytes()
+            operation = _operation_cases()[name]
+            wall_start, cpu_start = time.perf_counter(), time.process_time()
+            operation(processor, workdir)
+        elif kind == 'load':
+            processor = TableauDataPreprocessor()
+            wall_start, cpu_start = time.perf_counter(), time.process_time()
+            processor.load_data(source)
+        elif kind == 'generator':
+            wall_start, cpu_start = time.perf_counter(), time.process_time()
+            subprocess.run([sys.executable, source, *(args or [])], cwd=workdir, check=True,
+                           stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        elif kind == 'startup':
+            wall_start, cpu_start = time.perf_counter(), time.process_time()
+            subprocess.run([sys.executable, '-c', source], cwd=workdir, check=True,
+                           stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        else:
+            raise ValueError(f"不明なケース種別: {kind}")
+        wall_s = time.perf_counter() - wall_start
+        cpu_s = time.process_time() - cpu_start
+        child_process = kind in ('generator', 'startup')
+        if child_process and resource is not None:
+            usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+            cpu_s = usage.ru_utime + usage.ru_stime
+
+    peak = peak_rss_bytes(children=child_process)
+    return {
+        'wall_s': round(wall_s, 4),
+        'cpu_s': round(cpu_s, 4),
+        'peak_rss_mb': round(peak / 1024 / 1024, 1) if peak else None,
+        'rss_delta_mb': round((peak - rss_before) / 1024 / 1024, 1)
+        if peak and rss_before and not child_process else None,
+    }
+
+
+def _isolated(kind: str, name: str, source: str, workdir: str, args: List[str] = None) -> Dict[str, Any]:
+    """_run_case を新しいプロセスで実行"""
+    ctx = multiprocessing.get_context('spawn')
+    with ctx.Pool(1) as pool:
+        return pool.apply(_run_case, (kind, name, source, workdir, args))
+
+
+def _count_csv_rows(path: str) -> int:
+    """CSVのデータ行数（ヘッダーを除く）を、DataFrameを作らずに数える"""
+    with open(path, 'rb') as f:
+        lines = sum(chunk.count(b'\n') for chunk in iter(lambda: f.read(1 << 20), b''))
+    return max(lines - 1, 0)
+
+
+# =========================================
+# 4. ベンチマーク実行
+# =========================================
+
+def _write_inputs(df: pd.DataFrame, workdir: str, max_excel_rows: int,
+                  selected: Callable[[str], bool]) -> Dict[str, str]:
+    """load_data 計測用に各形式・各エンコーディングのファイルを書き出す"""
+    inputs = {}
+    for encoding in CSV_ENCODINGS:
+        name = f"load_data_csv_{encoding}"
+        if not selected(name):
+            continue
+        path = os.path.join(workdir, f"input_{encoding.replace('-', '_')}.csv")
+        df.to_csv(path, index=False, encoding=encoding)
+        inputs[name] = path
+    if len(df) <= max_excel_rows and selected('load_data_xlsx'):
+        path = os.path.join(workdir, 'input.xlsx')
+        df.to_excel(path, index=False, engine='openpyxl')
+        inputs['load_data_xlsx'] = path
+    return inputs
+
+
+def _has_display() -> bool:
+    """Tkのウィンドウを作れる環境か"""
+    return sys.platform in ('win32', 'darwin') or bool(os.environ.get('DISPLAY') or os.environ.get('WAYLAND_DISPLAY'))
+
+
+def run_benchmarks(scales: List[int], max_excel_rows: int = DEFAULT_MAX_EXCEL_ROWS,
+                   include_generator: bool = True, only: List[str] = None,
+                   include_startup: bool = True) -> List[Dict[str, Any]]:
+    """
+    すべてのベンチマークケースを実行
+
+    Args:
+        scales (List[int]): 計測する行数のリスト
+        max_excel_rows (int): Excelケースを実行する最大行数
+        include_generator (bool): kyaba_sales.py の実行時間も計測するか
+        only (List[str]): 指定した場合、名前にこれらの文字列を含むケースのみ実行
+        include_startup (bool): 起動時間（import・ウィンドウ表示）も計測するか
+
+    Returns:
+        List[Dict[str, Any]]: 計測結果のリスト
+    """
+    def selected(case_name: str) -> bool:
+        return not only or any(key in case_name for key in only)
+
+    generator = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'kyaba_sales.py')
+    results = []
+    for n_rows in scales:
+        with tempfile.TemporaryDirectory() as workdir:
+            print(f"\n📏 {n_rows:,}行のデータを生成中...")
+            df = make_synthetic_sales(n_rows)
+            source = os.path.join(workdir, 'sales.pkl')
+            df.to_pickle(source)
+            inputs = _write_inputs(df, workdir, max_excel_rows, selected)
+            del df
+
+            cases = [('load', name, path) for name, path in inputs.items()]
+            for name in _operation_cases():
+                if name == 'create_tableau_extract_excel' and n_rows > max_excel_rows:
+                    continue
+                cases.append(('operation', name, source))
+
+            for kind, name, case_source in cases:
+                if not selected(name):
+                    continue
+                result = _isolated(kind, name, case_source, workdir)
+                result.update({'case': name, 'rows': n_rows})
+                results.append(result)
+                print(f"  ⏱️  {name:<32} {result['wall_s']:>9.3f}s  "
+                      f"peak {result['peak_rss_mb'] or '-':>8} MB")
+
+        # 生成器は曜日で試行を間引くため、実際の行数は --sales より少なく、乱数で変わる
+        if include_generator and selected('kyaba_sales') and os.path.exists(generator):
+            with tempfile.TemporaryDirectory() as workdir:
+                result = _isolated('generator', 'kyaba_sales', generator, workdir,
+                                   ['--sales', str(n_rows), '--seed', '42'])
+                result.update({'case': 'kyaba_sales', 'rows': _count_csv_rows(
+                    os.path.join(workdir, GENERATOR_SALES_CSV)), 'requested_rows': n_rows})
+                results.append(result)
+                print(f"  ⏱️  {'kyaba_sales':<32} {result['wall_s']:>9.3f}s  "
+                      f"peak {result['peak_rss_mb'] or '-':>8} MB  ({result['rows']:,}行)")
+
+    if include_startup:
+        repo_dir = os.path.dirname(os.path.abspath(__file__))
+        for name, code in STARTUP_CASES.items():
+            if not selected(name) or (name == 'cold_start_gui_window' and not _has_display()):
+                continue
+            result = _isolated('startup', name, code, repo_dir)
+            result.update({'case': name, 'rows': 0})
+            results.append(result)
+            print(f"  ⏱️  {name:<32} {result['wall_s']:>9.3f}s  "
+                  f"peak {result['peak_rss_mb'] or '-':>8} MB")
+
+    return results
+
+
+# =========================================
+# 5. 履歴・ベースライン比較
+# =========================================
+
+def _git_commit() -> Optional[str]:
+    """現在のgitコミットIDを取得"""
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _load_json(path: str, default: Any) -> Any:
+    if not os.path.exists(path):
+        return default
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _save_json(path: str, payload: Any):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(payload, f, ensure_ascii=False, indent=2)
+
+
+def build_run_record(results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """1回分の実行結果を環境情報付きの履歴レコードにする"""
+    return {
+        'timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        'commit': _git_commit(),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'results': results,
+    }
+
+
+def append_history(record: Dict[str, Any], history_path: str = DEFAULT_HISTORY_PATH):
+    """JSON履歴ファイルに実行結果を追記"""
+    history = _load_json(history_path, [])
+    history.append(record)
+    _save_json(history_path, history)
+
+
+def find_regressions(results: List[Dict[str, Any]], baseline: Dict[str, Any],
+                     time_tolerance: float = 0.2, memory_tolerance: float = 0.2,
+                     min_time_delta: float = 0.05) -> List[Dict[str, Any]]:
+    """
+    ベースラインと比較して性能劣化したケースを抽出
+
+    Args:
+        results (List[Dict]): 今回の計測結果
+        baseline (Dict): ベースラインの実行レコード
+        time_tolerance (float): 許容する実行時間の増加率（0.2 = 20%）
+        memory_tolerance (float): 許容するピークRSSの増加率
+        min_time_delta (float): 計測誤差とみなす実行時間差（秒）
+
+    Returns:
+        List[Dict]: 劣化したケースと指標
+    """
+    # 生成器の実際の行数は実行日で変わるため、指定した行数で突き合わせる
+    def key(r: Dict[str, Any]):
+        return r['case'], r.get('requested_rows', r['rows'])
+
+    base_index = {key(r): r for r in baseline.get('results', [])}
+    regressions = []
+    for result in results:
+        base = base_index.get(key(result))
+        if base is None:
+            continue
+        if (result['wall_s'] > base['wall_s'] * (1 + time_tolerance)
+                and result['wall_s'] - base['wall_s'] > min_time_delta):
+            regressions.append({'case': result['case'], 'rows': result['rows'], 'metric': 'wall_s',
+                                'baseline': base['wall_s'], 'current': result['wall_s']})
+        if (result.get('peak_rss_mb') and base.get('peak_rss_mb')
+                and result['peak_rss_mb'] > base['peak_rss_mb'] * (1 + memory_tolerance)):
+            regressions.append({'case': result['case'], 'rows': result['rows'], 'metric': 'peak_rss_mb',
+                                'baseline': base['peak_rss_mb'], 'current': result['peak_rss_mb']})
+    return regressions
+
+
+def main():
+    """メイン関数"""
+    parser = argparse.ArgumentParser(description='Tableau前処理ツールのベンチマーク')
+    parser.add_argument('--scales', type=int, nargs='+', default=DEFAULT_SCALES, help='計測する行数')
+    parser.add_argument('--only', nargs='+', help='名前にこの文字列を含むケースのみ実行')
+    parser.add_argument('--max-excel-rows', type=int, default=DEFAULT_MAX_EXCEL_ROWS)
+    parser.add_argument('--no-generator', action='store_true', help='kyaba_sales.py の計測を省略')
+    parser.add_argument('--no-startup', action='store_true', help='起動時間の計測を省略')
+    parser.add_argument('--history', default=DEFAULT_HISTORY_PATH)
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE_PATH)
+    parser.add_argument('--save-baseline', action='store_true', help='今回の結果をベースラインとして保存')
+    parser.add_argument('--time-tolerance', type=float, default=0.2)
+    parser.add_argument('--memory-tolerance', type=float, default=0.2)
+    parser.add_argument('--fail-on-regression', action='store_true', help='劣化検出時に終了コード1で終了')
+    args = parser.parse_args()
+
+    print("🚀 Tableau前処理ツール ベンチマーク")
+    print("=" * 50)
+
+    results = run_benchmarks(args.scales, args.max_excel_rows, not args.no_generator, args.only,
+                             not args.no_startup)
+    record = build_run_record(results)
+    append_history(record, args.history)
+    print(f"\n📝 履歴に追記しました: {args.history}")
+
+    if args.save_baseline:
+        _save_json(args.baseline, record)
+        print(f"📌 ベースラインを保存しました: {args.baseline}")
+        return
+
+    baseline = _load_json(args.baseline, None)
+    if baseline is None:
+        print("ℹ️ ベースラインがありません（--save-baseline で作成できます）")
+        return
+
+    regressions = find_regressions(results, baseline, args.time_tolerance, args.memory_tolerance)
+    if not regressions:
+        print(f"✅ 性能劣化なし (ベースライン: {baseline.get('commit')} {baseline.get('timestamp')})")
+        return
+
+    print(f"⚠️ {len(regressions)}件の性能劣化を検出:")
+    for r in regressions:
+        print(f"  {r['case']} ({r['rows']:,}行) {r['metric']}: {r['baseline']} -> {r['current']}")
+    if args.fail_on_regression:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
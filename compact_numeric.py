@@ -0,0 +1,145 @@
+"""
+省メモリ数値行列モジュール
+Description: 特徴量を一度だけ連続した float32 のNumPy行列に変換し、その行列をその場で正規化する。
+             途中でDataFrameのコピーを作らず、モデルにはそのまま使える配列（C順序の float32）を渡すため、
+             float64 のDataFrameで処理する場合に比べてメモリは約半分になる
+
+使用例:
+    X = to_compact_matrix(features_df, feature_columns)
+    scaler = CompactScaler('standard').fit(X)
+    scaler.transform(X)                     # X をその場で正規化
+    model.fit(X, y)
+"""
+
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from streaming_scaler import SCALING_METHODS, ColumnStatistics, apply_scaling
+
+COMPACT_DTYPE = np.float32
+DEFAULT_BLOCK_ROWS = 65_536
+
+
+def to_compact_matrix(frame: pd.DataFrame, columns: List[str] = None, dtype=COMPACT_DTYPE,
+                      out: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    DataFrameの列を連続した1つの行列に変換（列ごとに直接書き込み、中間のDataFrameを作らない）
+
+    Args:
+        frame (pd.DataFrame): 元データ
+        columns (List[str]): 対象列（None=数値列すべて）
+        dtype: 行列の型（既定は float32）
+        out (Optional[np.ndarray]): 書き込み先の行列（同じ形・型なら再利用する）
+
+    Returns:
+        np.ndarray: C順序の行列（行 × 列）
+    """
+    if columns is None:
+        columns = frame.select_dtypes(include=[np.number]).columns.tolist()
+    shape = (len(frame), len(columns))
+    if out is None or out.shape != shape or out.dtype != np.dtype(dtype) or not out.flags['C_CONTIGUOUS']:
+        out = np.empty(shape, dtype=dtype)
+    for i, col in enumerate(columns):
+        out[:, i] = frame[col].to_numpy(dtype=dtype, na_value=np.nan)
+    return out
+
+
+def _matrix_statistics(X: np.ndarray, block_rows: int = DEFAULT_BLOCK_ROWS) -> ColumnStatistics:
+    """行ブロックごとに float64 で集計（一時配列はブロックの大きさだけ）"""
+    stats = ColumnStatistics(X.shape[1])
+    for start in range(0, len(X), block_rows):
+        stats.update(X[start:start + block_rows].astype(np.float64))
+    return stats
+
+
+class CompactScaler:
+    """
+    float32 行列をその場で正規化するスケーラー
+
+    統計値は float64 で計算し、変換は行列の型のまま (x - offset_) / scale_ で上書きする。
+    transform() は入力配列を書き換えて同じ配列を返す（copy=True の場合のみ複製）。
+    """
+
+    def __init__(self, method: str = 'standard', dtype=COMPACT_DTYPE):
+        if method not in SCALING_METHODS:
+            raise ValueError(f"サポートされていない正規化方法: {method}")
+        self.method = method
+        self.dtype = np.dtype(dtype)
+        self.offset_ = None
+        self.scale_ = None
+        self.n_features_in_ = None
+
+    def fit(self, X: np.ndarray) -> 'CompactScaler':
+        """学習（X は変更しない）"""
+        if self.method == 'robust':
+            # 1列ずつ分位点を求める（一時配列は1列分だけ）
+            quartiles = np.array([np.nanquantile(X[:, j], [0.25, 0.5, 0.75]) for j in range(X.shape[1])])
+            offset, scale = quartiles[:, 1], quartiles[:, 2] - quartiles[:, 0]
+        else:
+            stats = _matrix_statistics(X)
+            if self.method == 'standard':
+                offset, scale = stats.mean, stats.std
+            else:
+                offset, scale = stats.min, stats.max - stats.min
+
+        self.offset_ = np.asarray(offset, dtype=np.float64)
+        self.scale_ = np.where((scale == 0) | ~np.isfinite(scale), 1.0, scale)
+        self.n_features_in_ = X.shape[1]
+        return self
+
+    @property
+    def params(self) -> Dict[str, np.ndarray]:
+        """apply_scaling() 用のパラメータ"""
+        if self.offset_ is None:
+            raise ValueError("学習されていません")
+        return {'offset': self.offset_, 'scale': self.scale_}
+
+    def transform(self, X: Union[np.ndarray, pd.DataFrame], copy: bool = False) -> np.ndarray:
+        """
+        正規化（既定では X をその場で書き換える）
+
+        DataFrame は to_compact_matrix() で新しい行列にしてから正規化する（元のDataFrameは変更しない）。
+        """
+        if isinstance(X, pd.DataFrame):
+            X = to_compact_matrix(X, list(X.columns), dtype=self.dtype)
+        elif not np.issubdtype(X.dtype, np.floating):
+            X = X.astype(self.dtype)
+        elif copy:
+            X = X.copy()
+        return apply_scaling(X, self.params)
+
+    def fit_transform(self, X: np.ndarray, copy: bool = False) -> np.ndarray:
+        return self.fit(X).transform(X, copy=copy)
+
+    def inverse_transform(self, X: np.ndarray, copy: bool = False) -> np.ndarray:
+        """正規化を元に戻す（既定では X をその場で書き換える）"""
+        if copy:
+            X = X.copy()
+        X *= self.scale_.astype(X.dtype, copy=False)
+        X += self.offset_.astype(X.dtype, copy=False)
+        return X
+
+
+def compact_fit(model: Any, frame: pd.DataFrame, feature_columns: List[str], target_column: str,
+                method: str = 'standard') -> Tuple[CompactScaler, Any]:
+    """
+    特徴量を float32 行列に1回だけ変換し、その場で正規化してモデルを学習
+
+    Args:
+        model (Any): 未学習のモデル
+        frame (pd.DataFrame): 学習データ
+        feature_columns (List[str]): 特徴量の列名
+        target_column (str): 目的変数の列名
+        method (str): 'minmax', 'standard', 'robust'
+
+    Returns:
+        Tuple[CompactScaler, Any]: 学習済みスケーラー, 学習済みモデル
+    """
+    X = to_compact_matrix(frame, feature_columns)
+    y = frame[target_column].to_numpy(dtype=COMPACT_DTYPE)
+    scaler = CompactScaler(method).fit(X)
+    model.fit(scaler.transform(X), y)
+    return scaler, model
+
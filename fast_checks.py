@@ -0,0 +1,304 @@
+"""
+正規化前後の高速チェックモジュール
+Description: 欠損値・非有限値・平均・標準偏差・最小値・最大値を、データを1回読むだけで列ごとに計算する。
+             行ブロック単位でまとめて集計するため、チャンクに分けたデータ（read_csv の chunksize など）
+             にも使え、部分結果はマージできる。
+             列の平均を全列でさらに平均しないので、打ち消し合う列の異常も見逃さない
+
+使用例:
+    report = pre_implementation_check(X_train, X_test, y_train, y_test)
+    report = post_implementation_check(scaler, X_train_scaled, X_test_scaled)
+    if not report:
+        print(report.violations)
+"""
+
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from streaming_scaler import ColumnStatistics
+
+DEFAULT_BLOCK_ROWS = 65_536
+DEFAULT_TOLERANCE = 0.1
+
+
+# =========================================
+# 1. 列ごとの統計値（1回の読み込み）
+# =========================================
+
+class ColumnCheckStats:
+    """
+    列ごとの行数・欠損値数・非有限値（inf）数・平均・標準偏差・最小値・最大値
+
+    行ブロックごとに有限値のマスクを1回だけ作り、全統計値をそのブロックから求める。
+    """
+
+    def __init__(self, columns: List[str], dtypes: Optional[List[str]] = None):
+        self.columns = list(columns)
+        self.dtypes = list(dtypes) if dtypes is not None else None
+        self.rows = 0
+        self.nulls = np.zeros(len(self.columns), dtype=np.int64)
+        self.nonfinite = np.zeros(len(self.columns), dtype=np.int64)
+        self.moments = ColumnStatistics(len(self.columns))
+
+    def update(self, values: np.ndarray, block_rows: int = DEFAULT_BLOCK_ROWS) -> 'ColumnCheckStats':
+        """
+        2次元配列（行 × 列）を集計に加える
+
+        Args:
+            values (np.ndarray): 数値配列
+            block_rows (int): 1回に処理する行数（キャッシュに収まる大きさ）
+
+        Returns:
+            ColumnCheckStats: 自身
+        """
+        values = np.asarray(values, dtype=np.float64)
+        for start in range(0, len(values), block_rows):
+            block = values[start:start + block_rows]
+            finite = np.isfinite(block)
+            nulls = np.isnan(block).sum(axis=0)
+            self.nulls += nulls
+            self.nonfinite += (~finite).sum(axis=0) - nulls
+            self.moments.update(np.where(finite, block, np.nan))
+        self.rows += len(values)
+        return self
+
+    def merge(self, other: 'ColumnCheckStats') -> 'ColumnCheckStats':
+        """別チャンクの集計結果をマージ"""
+        if other.columns != self.columns:
+            raise ValueError(f"列構成が一致しません: {self.columns} / {other.columns}")
+        self.rows += other.rows
+        self.nulls += other.nulls
+        self.nonfinite += other.nonfinite
+        self.moments.merge(other.moments)
+        return self
+
+    def table(self) -> pd.DataFrame:
+        """列ごとの統計値を表で取得（標準偏差は ddof=0）"""
+        return pd.DataFrame({
+            'rows': self.rows,
+            'nulls': self.nulls,
+            'nonfinite': self.nonfinite,
+            'mean': self.moments.mean,
+            'std': self.moments.std,
+            'min': self.moments.min,
+            'max': self.moments.max,
+        }, index=pd.Index(self.columns, name='column'))
+
+
+def _iter_chunks(data) -> Iterable[pd.DataFrame]:
+    """DataFrame / Series / 配列 / それらのイテレーターを DataFrame のチャンクとして返す"""
+    if isinstance(data, (pd.DataFrame, pd.Series, np.ndarray)):
+        data = [data]
+    for chunk in data:
+        if isinstance(chunk, pd.Series):
+            chunk = chunk.to_frame()
+        elif isinstance(chunk, np.ndarray):
+            chunk = chunk.reshape(len(chunk), -1)
+            chunk = pd.DataFrame(chunk, columns=[f"col_{i}" for i in range(chunk.shape[1])])
+        yield chunk
+
+
+def profile_columns(data, columns: List[str] = None, block_rows: int = DEFAULT_BLOCK_ROWS) -> ColumnCheckStats:
+    """
+    データ（またはチャンクのイテレーター）の数値列を1回読んで集計
+
+    数値以外の列は欠損値数だけを数える（平均などは NaN）。
+
+    Args:
+        data: DataFrame / Series / 配列、またはそれらのイテレーター
+        columns (List[str]): 対象列（None=最初のチャンクの全列）
+        block_rows (int): 1回に処理する行数
+
+    Returns:
+        ColumnCheckStats: 集計結果
+    """
+    stats = None
+    numeric = set()
+    for chunk in _iter_chunks(data):
+        names = [str(col) for col in chunk.columns]
+        if stats is None:
+            columns = [str(col) for col in columns] if columns is not None else names
+        positions = [names.index(col) for col in columns]
+        if stats is None:
+            stats = ColumnCheckStats(columns, [str(chunk.dtypes.iloc[p]) for p in positions])
+            numeric = {i for i, p in enumerate(positions) if pd.api.types.is_numeric_dtype(chunk.dtypes.iloc[p])}
+
+        values = np.full((len(chunk), len(columns)), np.nan)
+        if numeric:
+            targets = sorted(numeric)
+            values[:, targets] = chunk.iloc[:, [positions[i] for i in targets]].to_numpy(dtype=np.float64,
+                                                                                        na_value=np.nan)
+        stats.update(values, block_rows)
+
+        # 数値以外の列は上の集計ですべて欠損扱いになっているので、実際の欠損値数に差し替える
+        for i, position in enumerate(positions):
+            if i not in numeric:
+                stats.nulls[i] += int(chunk.iloc[:, position].isna().sum()) - len(chunk)
+    if stats is None:
+        raise ValueError("データが空です")
+    return stats
+
+
+# =========================================
+# 2. チェック結果
+# =========================================
+
+class CheckReport:
+    """
+    チェック結果
+
+    bool() で全チェックの合否を返すため、従来の関数と同じく if 文で使える。
+    violations には列単位の違反（check, column, value, threshold）が入る。
+    """
+
+    def __init__(self, title: str):
+        self.title = title
+        self.checks: List[Tuple[str, bool]] = []
+        self._violations: List[Dict[str, Any]] = []
+        self.statistics = {}
+
+    def add(self, name: str, passed: bool):
+        self.checks.append((name, bool(passed)))
+
+    def add_column_check(self, name: str, values: pd.Series, failed: pd.Series, threshold: Any):
+        """列ごとの判定を追加（1列でも違反があれば不合格）"""
+        self.add(name, not failed.any())
+        for column, value in values[failed].items():
+            self._violations.append({'check': name, 'column': column, 'value': value, 'threshold': threshold})
+
+    @property
+    def violations(self) -> pd.DataFrame:
+        return pd.DataFrame(self._violations, columns=['check', 'column', 'value', 'threshold'])
+
+    @property
+    def passed(self) -> bool:
+        return all(result for _, result in self.checks)
+
+    def __bool__(self) -> bool:
+        return self.passed
+
+    def print(self):
+        """チェック結果を表示"""
+        print(f"=== {self.title} ===")
+        for name, result in self.checks:
+            print(f"{'✅' if result else '❌'} {name}")
+        if self._violations:
+            print("\n⚠️ 違反のある列:")
+            print(self.violations.to_string(index=False))
+
+
+def _schema(data) -> Tuple[List[str], List[str]]:
+    """先頭チャンクの列名と型（イテレーターは消費しないよう DataFrame / 配列のみ対象）"""
+    chunk = next(iter(_iter_chunks(data)))
+    return [str(col) for col in chunk.columns], [str(dtype) for dtype in chunk.dtypes]
+
+
+# =========================================
+# 3. 正規化前後のチェック
+# =========================================
+
+def pre_implementation_check(X_train, X_test, y_train, y_test, verbose: bool = True) -> CheckReport:
+    """
+    実装前のデータ状態確認（列ごと・1回の読み込み）
+
+    Args:
+        X_train, X_test: 特徴量（DataFrame / 配列、またはチャンクのイテレーター）
+        y_train, y_test: 目的変数
+        verbose (bool): 結果を表示するか
+
+    Returns:
+        CheckReport: チェック結果
+    """
+    report = CheckReport("実装前チェックリスト")
+    report.add("データ分割済み", X_train is not None and X_test is not None)
+    report.add("ターゲット変数分割済み", y_train is not None and y_test is not None)
+    if not report:
+        if verbose:
+            report.print()
+        return report
+
+    if isinstance(X_train, (pd.DataFrame, np.ndarray)) and isinstance(X_test, (pd.DataFrame, np.ndarray)):
+        train_columns, train_dtypes = _schema(X_train)
+        test_columns, test_dtypes = _schema(X_test)
+        report.add("列構成一致（訓練・テスト）", train_columns == test_columns)
+        report.add("データ型一致（訓練・テスト）", train_dtypes == test_dtypes)
+
+    train_stats, test_stats = profile_columns(X_train), profile_columns(X_test)
+    y_train_stats, y_test_stats = profile_columns(y_train), profile_columns(y_test)
+    report.add("訓練データサイズ適切", train_stats.rows > test_stats.rows)
+    report.add("行数一致（特徴量・ターゲット）",
+               train_stats.rows == y_train_stats.rows and test_stats.rows == y_test_stats.rows)
+
+    for label, stats in [("訓練", train_stats), ("テスト", test_stats)]:
+        table = stats.table()
+        report.add_column_check(f"欠損値なし（{label}）", table['nulls'], table['nulls'] > 0, 0)
+        report.add_column_check(f"無限大なし（{label}）", table['nonfinite'], table['nonfinite'] > 0, 0)
+        report.statistics[label] = table
+    for label, stats in [("訓練", y_train_stats), ("テスト", y_test_stats)]:
+        table = stats.table()
+        report.add_column_check(f"ターゲット欠損値なし（{label}）", table['nulls'],
+                                (table['nulls'] + table['nonfinite']) > 0, 0)
+
+    if verbose:
+        report.print()
+    return report
+
+
+def _scaler_fitted(scaler) -> bool:
+    if isinstance(scaler, dict):
+        return 'offset' in scaler and 'scale' in scaler
+    return any(hasattr(scaler, attr) for attr in ['mean_', 'scale_', 'min_', 'center_'])
+
+
+def post_implementation_check(scaler, X_train_scaled, X_test_scaled, method: str = 'standard',
+                              tolerance: float = DEFAULT_TOLERANCE, verbose: bool = True) -> CheckReport:
+    """
+    正規化実装後の確認（列ごとに判定し、全列平均で打ち消し合う異常も検出）
+
+    Args:
+        scaler: 学習済みスケーラー（sklearn、または apply_scaling() 用のパラメータ辞書）
+        X_train_scaled, X_test_scaled: 正規化済みデータ（DataFrame / 配列、またはチャンクのイテレーター）
+        method (str): 'standard'（平均≈0, 標準偏差≈1）, 'minmax'（最小≈0, 最大≈1）
+        tolerance (float): 許容誤差
+        verbose (bool): 結果を表示するか
+
+    Returns:
+        CheckReport: チェック結果
+    """
+    if method not in ('standard', 'minmax'):
+        raise ValueError(f"サポートされていない正規化方法: {method}")
+
+    report = CheckReport("実装後チェックリスト")
+    report.add("スケーラーが学習済み", _scaler_fitted(scaler))
+
+    train_stats, test_stats = profile_columns(X_train_scaled), profile_columns(X_test_scaled)
+    train, test = train_stats.table(), test_stats.table()
+    report.add("テストデータ形状一致", train_stats.columns == test_stats.columns)
+    if train_stats.dtypes is not None and test_stats.dtypes is not None:
+        report.add("テストデータ型一致", train_stats.dtypes == test_stats.dtypes)
+
+    report.add_column_check("有限値のみ（訓練）", train['nulls'] + train['nonfinite'],
+                            (train['nulls'] + train['nonfinite']) > 0, 0)
+    report.add_column_check("有限値のみ（テスト）", test['nulls'] + test['nonfinite'],
+                            (test['nulls'] + test['nonfinite']) > 0, 0)
+
+    if method == 'standard':
+        report.add_column_check("訓練データ平均≈0", train['mean'], train['mean'].abs() >= tolerance, tolerance)
+        # 定数列は StandardScaler でも標準偏差0になるので除く
+        deviation = (train['std'] - 1).abs()
+        report.add_column_check("訓練データ標準偏差≈1", train['std'],
+                                (deviation >= tolerance) & (train['std'] > 0), tolerance)
+    else:
+        report.add_column_check("訓練データ最小値≈0", train['min'], train['min'].abs() >= tolerance, tolerance)
+        report.add_column_check("訓練データ最大値≈1", train['max'],
+                                ((train['max'] - 1).abs() >= tolerance) & (train['max'] != train['min']), tolerance)
+
+    report.statistics = {'訓練': train, 'テスト': test}
+    if verbose:
+        report.print()
+        print("\n📊 正規化後統計値（列ごと）:")
+        print(pd.concat({'訓練': train[['mean', 'std', 'min', 'max']],
+                         'テスト': test[['mean', 'std', 'min', 'max']]}, axis=1).round(4).to_string())
+    return report
@@ -0,0 +1,312 @@
+# -*- coding: utf-8 -*-
+"""
+Rose Garden 売上予測のウォークフォワード検証・ハイパーパラメータ探索
+Description: 日別売上を時系列順に「過去で学習 → 直後の期間で評価」する拡張ウィンドウで分割し、
+             モデル候補 × 分割をプロセスプールで並列評価する。
+             正規化の統計値は分割ごとに1回だけ計算して各ワーカーで使い回し、
+             成績の悪い候補は段階的に打ち切る（Successive Halving）
+
+使用例:
+    python forecast_cv.py rose_garden_sales.csv --folds 6 --test-days 28 --save models/sales_forecast
+"""
+
+import argparse
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from compact_numeric import COMPACT_DTYPE, compact_fit, to_compact_matrix
+from kyaba_features import SalesFeatureBuilder
+from streaming_scaler import apply_scaling
+
+DEFAULT_FOLDS = 5
+DEFAULT_TEST_DAYS = 28
+DEFAULT_ETA = 3
+
+# 探索するモデル候補: (モデル名, パラメータ)
+DEFAULT_SEARCH_SPACE = (
+    [('ridge', {'alpha': alpha}) for alpha in [0.1, 1.0, 10.0, 100.0]]
+    + [('random_forest', {'n_estimators': n, 'max_depth': depth, 'min_samples_leaf': leaf, 'random_state': 42})
+       for n in [100, 300] for depth in [4, 8, None] for leaf in [1, 5]]
+    + [('gradient_boosting', {'n_estimators': n, 'learning_rate': lr, 'max_depth': 3, 'random_state': 42})
+       for n in [100, 300] for lr in [0.03, 0.1]]
+)
+
+
+# =========================================
+# 1. 日別データの準備
+# =========================================
+
+def build_daily_frame(sales_df: pd.DataFrame, customers_df: pd.DataFrame,
+                      target_column: str = 'revenue') -> pd.DataFrame:
+    """
+    売上明細から日別の目的変数と特徴量を作成（kyaba_features.SalesFeatureBuilder）
+
+    特徴量はすべて前日までの値から作るため、その日の売上は含まれない。
+    ラグ・移動合計がそろわない最初の期間は除く。
+
+    Args:
+        sales_df (pd.DataFrame): 売上データ
+        customers_df (pd.DataFrame): 顧客データ（customer_id, customer_rank）
+        target_column (str): 目的変数の列名
+
+    Returns:
+        pd.DataFrame: 日付をインデックスとする日別データ
+    """
+    builder = SalesFeatureBuilder(customers_df)
+    daily = builder.fit_transform(sales_df, level='day').rename(columns={'revenue': target_column})
+    return daily.iloc[builder.history_days:]
+
+
+def walk_forward_splits(n_rows: int, n_folds: int = DEFAULT_FOLDS, test_size: int = DEFAULT_TEST_DAYS,
+                        gap: int = 0, min_train_size: int = None) -> List[Tuple[int, int, int]]:
+    """
+    拡張ウィンドウのウォークフォワード分割を作成
+
+    最後の分割のテスト期間がデータの末尾になるように、後ろから test_size ずつずらす。
+
+    Args:
+        n_rows (int): 時系列順に並んだ行数
+        n_folds (int): 分割数
+        test_size (int): 各分割のテスト行数
+        gap (int): 学習期間とテスト期間の間に空ける行数
+        min_train_size (int): 学習期間の最小行数（None=test_size）
+
+    Returns:
+        List[Tuple[int, int, int]]: (学習終了位置, テスト開始位置, テスト終了位置) のリスト（古い順）
+    """
+    min_train_size = min_train_size or test_size
+    splits = []
+    for k in range(n_folds):
+        test_end = n_rows - (n_folds - 1 - k) * test_size
+        test_start = test_end - test_size
+        train_end = test_start - gap
+        if train_end >= min_train_size:
+            splits.append((train_end, test_start, test_end))
+    if not splits:
+        raise ValueError(f"データが不足しています（{n_rows}行, 分割数{n_folds}, テスト{test_size}行）")
+    return splits
+
+
+# =========================================
+# 2. ワーカー処理
+# =========================================
+
+_worker_state: Dict[str, Any] = {}
+
+
+def make_model(name: str, params: Dict[str, Any]):
+    """モデル名とパラメータから未学習のモデルを作成"""
+    if name == 'ridge':
+        from sklearn.linear_model import Ridge
+        return Ridge(**params)
+    if name == 'random_forest':
+        from sklearn.ensemble import RandomForestRegressor
+        return RandomForestRegressor(n_jobs=1, **params)
+    if name == 'gradient_boosting':
+        from sklearn.ensemble import GradientBoostingRegressor
+        return GradientBoostingRegressor(**params)
+    raise ValueError(f"サポートされていないモデル: {name}")
+
+
+def standard_params(values: np.ndarray) -> Dict[str, np.ndarray]:
+    """StandardScaler と同じ平均・標準偏差（ddof=0）を apply_scaling() 用に計算"""
+    scale = values.std(axis=0, dtype=np.float64)
+    return {'offset': values.mean(axis=0, dtype=np.float64), 'scale': np.where(scale == 0, 1.0, scale)}
+
+
+def _init_worker(X: np.ndarray, y: np.ndarray, splits: List[Tuple[int, int, int]]):
+    """ワーカー起動時に特徴量・分割を受け取る（正規化済みの分割はワーカー内でキャッシュ）"""
+    _worker_state.update(X=X, y=y, splits=splits, cache={})
+
+
+def _fold_arrays(fold: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """分割ごとの正規化済み学習・テストデータ（学習期間の統計値で1回だけ正規化）"""
+    cache = _worker_state['cache']
+    if fold not in cache:
+        X, y = _worker_state['X'], _worker_state['y']
+        train_end, test_start, test_end = _worker_state['splits'][fold]
+        params = standard_params(X[:train_end])
+        cache[fold] = (apply_scaling(X[:train_end].copy(), params), y[:train_end],
+                       apply_scaling(X[test_start:test_end].copy(), params), y[test_start:test_end])
+    return cache[fold]
+
+
+def _evaluate(config_index: int, name: str, params: Dict[str, Any], fold: int) -> Tuple[int, int, float, float]:
+    """ワーカー内で1候補 × 1分割を学習・評価"""
+    X_train, y_train, X_test, y_test = _fold_arrays(fold)
+    start = time.perf_counter()
+    model = make_model(name, params)
+    model.fit(X_train, y_train)
+    rmse = float(np.sqrt(np.mean((model.predict(X_test) - y_test) ** 2)))
+    return config_index, fold, rmse, time.perf_counter() - start
+
+
+# =========================================
+# 3. 探索（Successive Halving）
+# =========================================
+
+def _rung_folds(n_folds: int, eta: int) -> List[int]:
+    """各段階で評価済みにする分割数（例: 5分割, eta=3 → [1, 3, 5]）"""
+    rungs, k = [], 1
+    while k < n_folds:
+        rungs.append(k)
+        k *= eta
+    return rungs + [n_folds]
+
+
+def walk_forward_search(daily: pd.DataFrame, target_column: str = 'revenue',
+                        search_space: List[Tuple[str, Dict[str, Any]]] = None, n_folds: int = DEFAULT_FOLDS,
+                        test_size: int = DEFAULT_TEST_DAYS, gap: int = 0, eta: int = DEFAULT_ETA,
+                        max_workers: int = None, compact: bool = False) -> pd.DataFrame:
+    """
+    ウォークフォワード検証でモデル候補を並列に評価し、成績の悪い候補を打ち切る
+
+    段階ごとに古い分割から順に評価を増やし、平均RMSEの上位 1/eta だけを次の段階へ残す。
+    学習期間の短い古い分割ほど学習が速いため、悪い候補は安い評価だけで除外される。
+
+    Args:
+        daily (pd.DataFrame): build_daily_frame() の結果
+        target_column (str): 目的変数の列名
+        search_space (List): (モデル名, パラメータ) のリスト（None=DEFAULT_SEARCH_SPACE）
+        n_folds (int): 分割数
+        test_size (int): 各分割のテスト日数
+        gap (int): 学習期間とテスト期間の間に空ける日数
+        eta (int): 各段階で残す割合の逆数
+        max_workers (int): プロセス数（None=CPU数）
+        compact (bool): 特徴量を float32 の行列で扱う（compact_numeric）
+
+    Returns:
+        pd.DataFrame: 候補ごとの評価結果（mean_rmse の昇順）
+    """
+    search_space = list(search_space or DEFAULT_SEARCH_SPACE)
+    feature_columns = [col for col in daily.columns if col != target_column]
+    dtype = COMPACT_DTYPE if compact else np.float64
+    X = to_compact_matrix(daily, feature_columns, dtype=dtype)
+    y = daily[target_column].to_numpy(dtype=dtype)
+    splits = walk_forward_splits(len(daily), n_folds, test_size, gap)
+    n_folds = len(splits)
+
+    scores = {i: {} for i in range(len(search_space))}
+    fit_seconds = {i: 0.0 for i in range(len(search_space))}
+    pruned_at = {}
+    survivors = list(range(len(search_space)))
+
+    with ProcessPoolExecutor(max_workers=max_workers or os.cpu_count() or 1,
+                             initializer=_init_worker, initargs=(X, y, splits)) as executor:
+        rungs = _rung_folds(n_folds, eta)
+        for rung, fold_count in enumerate(rungs):
+            futures = [executor.submit(_evaluate, i, *search_space[i], fold)
+                       for i in survivors for fold in range(fold_count) if fold not in scores[i]]
+            for future in as_completed(futures):
+                config_index, fold, rmse, seconds = future.result()
+                scores[config_index][fold] = rmse
+                fit_seconds[config_index] += seconds
+
+            ranked = sorted(survivors, key=lambda i: np.mean(list(scores[i].values())))
+            print(f"🔎 段階{rung + 1}: {len(survivors)}候補 × {fold_count}分割 "
+                  f"→ 最良RMSE {np.mean(list(scores[ranked[0]].values())):,.0f}")
+            if fold_count < n_folds:
+                keep = max(1, math.ceil(len(ranked) / eta))
+                for i in ranked[keep:]:
+                    pruned_at[i] = fold_count
+                survivors = ranked[:keep]
+
+    rows = []
+    for i, (name, params) in enumerate(search_space):
+        fold_scores = [scores[i][fold] for fold in sorted(scores[i])]
+        rows.append({
+            'model': name,
+            'params': params,
+            'mean_rmse': float(np.mean(fold_scores)),
+            'std_rmse': float(np.std(fold_scores)),
+            'folds_evaluated': len(fold_scores),
+            'status': 'pruned' if i in pruned_at else 'completed',
+            'fit_seconds': round(fit_seconds[i], 3),
+        })
+    # 全分割を評価した候補を先に、その中でRMSEの小さい順
+    return (pd.DataFrame(rows)
+            .sort_values(['folds_evaluated', 'mean_rmse'], ascending=[False, True])
+            .reset_index(drop=True))
+
+
+def baseline_rmse(daily: pd.DataFrame, target_column: str = 'revenue', n_folds: int = DEFAULT_FOLDS,
+                  test_size: int = DEFAULT_TEST_DAYS, gap: int = 0) -> float:
+    """比較用: 「1週間前と同じ売上」と予測した場合のRMSE（同じ分割の平均）"""
+    y = daily[target_column].to_numpy(dtype=np.float64)
+    naive = daily['total_revenue_lag_7'].to_numpy(dtype=np.float64)
+    return float(np.mean([np.sqrt(np.mean((naive[start:end] - y[start:end]) ** 2))
+                          for _, start, end in walk_forward_splits(len(daily), n_folds, test_size, gap)]))
+
+
+def fit_best_model(daily: pd.DataFrame, results: pd.DataFrame, target_column: str = 'revenue',
+                   save_path: str = None, compact: bool = False):
+    """
+    最良の候補を全期間で学習し、必要なら pipeline_artifacts で保存
+
+    Returns:
+        Tuple[Any, Any]: 学習済みスケーラー（compact=True なら CompactScaler）, 学習済みモデル
+    """
+    best = results.iloc[0]
+    feature_columns = [col for col in daily.columns if col != target_column]
+    model = make_model(best['model'], best['params'])
+
+    if compact:
+        scaler, model = compact_fit(model, daily, feature_columns, target_column)
+    else:
+        from sklearn.preprocessing import StandardScaler
+        X = daily[feature_columns].to_numpy(dtype=np.float64)
+        scaler = StandardScaler().fit(X)
+        model.fit(scaler.transform(X), daily[target_column].to_numpy(dtype=np.float64))
+
+    if save_path:
+        from pipeline_artifacts import save_pipeline
+        save_pipeline(save_path, model, scaler, feature_columns=feature_columns,
+                      feature_dtypes={col: str(daily[col].dtype) for col in feature_columns},
+                      target_column=target_column,
+                      extra_metadata={'cv_mean_rmse': float(best['mean_rmse']), 'model': best['model'],
+                                      'params': best['params'], 'trained_until': str(daily.index.max().date())})
+    return scaler, model
+
+
+def main():
+    """メイン関数"""
+    parser = argparse.ArgumentParser(description='売上予測のウォークフォワード検証・ハイパーパラメータ探索')
+    parser.add_argument('sales', nargs='?', default='rose_garden_sales.csv', help='売上CSV')
+    parser.add_argument('--customers', default='rose_garden_customers.csv', help='顧客CSV')
+    parser.add_argument('--folds', type=int, default=DEFAULT_FOLDS)
+    parser.add_argument('--test-days', type=int, default=DEFAULT_TEST_DAYS)
+    parser.add_argument('--gap', type=int, default=0, help='学習期間とテスト期間の間の日数')
+    parser.add_argument('--eta', type=int, default=DEFAULT_ETA, help='各段階で残す割合の逆数')
+    parser.add_argument('--workers', type=int, help='プロセス数')
+    parser.add_argument('--save', help='最良モデルの保存先ディレクトリ')
+    parser.add_argument('--results', help='評価結果を保存するCSVのパス')
+    parser.add_argument('--compact', action='store_true', help='特徴量を float32 の行列で扱う（省メモリ）')
+    args = parser.parse_args()
+
+    sales_df = pd.read_csv(args.sales, encoding='utf-8-sig')
+    customers_df = pd.read_csv(args.customers, encoding='utf-8-sig')
+    daily = build_daily_frame(sales_df, customers_df)
+    print(f"📅 日別データ: {len(daily)}日 ({daily.index.min().date()} 〜 {daily.index.max().date()})")
+
+    start = time.perf_counter()
+    results = walk_forward_search(daily, n_folds=args.folds, test_size=args.test_days, gap=args.gap,
+                                  eta=args.eta, max_workers=args.workers, compact=args.compact)
+    print(f"\n⏱️ 探索時間: {time.perf_counter() - start:.1f}秒")
+    print(f"📏 ベースライン（1週間前と同じ）RMSE: {baseline_rmse(daily, n_folds=args.folds, test_size=args.test_days, gap=args.gap):,.0f}")
+    print("\n🏆 上位の候補:")
+    print(results.head(5).to_string(index=False))
+
+    if args.results:
+        results.to_csv(args.results, index=False, encoding='utf-8-sig')
+        print(f"📄 評価結果: {args.results}")
+    fit_best_model(daily, results, save_path=args.save, compact=args.compact)
+
+
+if __name__ == "__main__":
+    main()
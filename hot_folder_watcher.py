@@ -0,0 +1,462 @@
+"""
+ホットフォルダ監視モジュール
+Description: 店舗からのエクスポートが置かれるフォルダを監視し、新しいファイルが届いたら
+             保存済みのレシピ（TableauDataPreprocessor.save_recipe）を適用してTableau用ファイルを書き出す常駐プログラム。
+             書き込み途中のファイルはサイズと更新時刻が一定時間変わらなくなるまで待ち、
+             処理待ちのキューとワーカー数に上限を設けて（満杯の間は取り込みを止める）、
+             出力は一時ファイルに書いてから os.replace で置き換える（Tableauが書き込み途中のファイルを読まない）。
+             watchdog がインストールされていればファイルシステムの通知を使い、なければ定期的に一覧を取る
+
+使用例:
+    # 1回目: 手作業で前処理してレシピを保存
+    processor = TableauDataPreprocessor('store01_2025-01-31.xlsx')
+    processor.remove_duplicates()
+    processor.clean_text_data()
+    processor.save_recipe('daily_recipe.json')
+
+    # 常駐: 届いたファイルを自動で処理
+    python hot_folder_watcher.py inbox/ tableau_ready/ --recipe daily_recipe.json --metrics-port 8090
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import queue
+import shutil
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+DEFAULT_EXTENSIONS = ('.csv', '.xlsx', '.xls')
+# 書き込み途中・一時ファイルとして無視する名前
+IGNORED_PREFIXES = ('.', '~$')
+IGNORED_SUFFIXES = ('.tmp', '.part', '.crdownload', '.partial')
+OUTPUT_EXTENSIONS = {'csv': '.csv', 'excel': '.xlsx'}
+
+
+# =========================================
+# 1. 1ファイルの処理（ワーカープロセス内）
+# =========================================
+
+def output_path_for(path: str, output_dir: str, file_format: str) -> str:
+    """入力ファイルに対応する出力ファイルのパス"""
+    stem = os.path.splitext(os.path.basename(path))[0]
+    return os.path.join(output_dir, f"{stem}_tableau{OUTPUT_EXTENSIONS[file_format]}")
+
+
+def process_file(path: str, steps: List[Dict[str, Any]], output_dir: str, file_format: str = 'csv') -> Dict[str, Any]:
+    """
+    1ファイルを読み込み、レシピを適用して出力（出力先と同じフォルダの一時ファイルに書いてから置き換える）
+
+    プロセスプールから呼べるようモジュールの関数にしている。
+
+    Returns:
+        Dict[str, Any]: 出力パス・行数・列数・処理時間
+    """
+    from tableau_preprocessor import TableauDataPreprocessor
+
+    start = time.perf_counter()
+    final_path = output_path_for(path, output_dir, file_format)
+    stem, extension = os.path.splitext(os.path.basename(final_path))
+    temp_path = os.path.join(output_dir, f".{stem}.{uuid.uuid4().hex}.tmp{extension}")
+
+    try:
+        with open(os.devnull, 'w', encoding='utf-8') as devnull, contextlib.redirect_stdout(devnull):
+            processor = TableauDataPreprocessor(path)
+            processor.apply_recipe(steps)
+            processor.create_tableau_extract(temp_path, file_format)
+        os.replace(temp_path, final_path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+    return {
+        'output': final_path,
+        'rows': int(len(processor.data)),
+        'columns': int(len(processor.data.columns)),
+        'process_s': time.perf_counter() - start,
+    }
+
+
+# =========================================
+# 2. 計測値
+# =========================================
+
+class WatcherMetrics:
+    """処理件数・待ち行列の長さ・ファイルごとの遅延（検出から出力完了まで）を記録する"""
+
+    def __init__(self, window: int = 1000):
+        self._lock = threading.Lock()
+        self.started_at = time.time()
+        self.detected = 0
+        self.processed = 0
+        self.failed = 0
+        self.backpressure_waits = 0
+        self.in_flight = 0
+        self.max_queue_depth = 0
+        self.latencies = deque(maxlen=window)
+        self.process_times = deque(maxlen=window)
+        self.last_file: Optional[Dict[str, Any]] = None
+
+    def add(self, name: str, value: int = 1):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + value)
+
+    def observe_queue(self, depth: int):
+        with self._lock:
+            self.max_queue_depth = max(self.max_queue_depth, depth)
+
+    def record(self, path: str, latency_s: float, result: Dict[str, Any] = None, error: str = None):
+        with self._lock:
+            if error is None:
+                self.processed += 1
+                self.latencies.append(latency_s)
+                self.process_times.append(result['process_s'])
+            else:
+                self.failed += 1
+            self.last_file = {'path': path, 'latency_s': round(latency_s, 3), 'error': error,
+                              'finished_at': time.strftime("%Y-%m-%d %H:%M:%S")}
+
+    def snapshot(self, queue_depth: int = 0, pending: int = 0) -> Dict[str, Any]:
+        """現在の計測値（遅延は直近 window 件の分位点）"""
+        with self._lock:
+            latencies = np.array(self.latencies, dtype=float)
+            process_times = np.array(self.process_times, dtype=float)
+            summary = {
+                'uptime_s': round(time.time() - self.started_at, 1),
+                'detected': self.detected,
+                'processed': self.processed,
+                'failed': self.failed,
+                'pending_settle': pending,
+                'queue_depth': queue_depth,
+                'max_queue_depth': self.max_queue_depth,
+                'in_flight': self.in_flight,
+                'backpressure_waits': self.backpressure_waits,
+                'last_file': self.last_file,
+            }
+        for name, values in [('latency', latencies), ('process', process_times)]:
+            if len(values):
+                summary[f'{name}_p50_s'] = round(float(np.percentile(values, 50)), 3)
+                summary[f'{name}_p95_s'] = round(float(np.percentile(values, 95)), 3)
+                summary[f'{name}_max_s'] = round(float(values.max()), 3)
+        return summary
+
+
+# =========================================
+# 3. 監視
+# =========================================
+
+class HotFolderWatcher:
+    """
+    フォルダを監視して新しいファイルを前処理する
+
+    スキャン用のスレッドがファイルの書き込み完了を待ってキューに入れ、
+    workers 個のワーカースレッドがキューから取り出してプロセスプールで process_file を実行する。
+    キューが満杯の間は新しいファイルを待機のまま残す（処理が追いつくまで取り込まない）。
+    """
+
+    def __init__(self, watch_dir: str, output_dir: str, recipe: str, file_format: str = 'csv',
+                 workers: int = 2, queue_size: int = 8, settle_seconds: float = 2.0,
+                 poll_interval: float = 1.0, archive_dir: str = None, error_dir: str = None,
+                 use_processes: bool = True, use_watchdog: bool = True,
+                 extensions: Tuple[str, ...] = DEFAULT_EXTENSIONS):
+        """
+        初期化
+
+        Args:
+            watch_dir (str): 監視するフォルダ
+            output_dir (str): Tableau用ファイルの出力先
+            recipe (str): save_recipe() で保存したレシピ
+            file_format (str): 出力形式 ('csv', 'excel')
+            workers (int): 同時に処理するファイル数
+            queue_size (int): 処理待ちキューの上限
+            settle_seconds (float): サイズと更新時刻がこの秒数変わらなければ書き込み完了とみなす
+            poll_interval (float): フォルダを確認する間隔（秒）
+            archive_dir (str): 処理済みの入力ファイルの移動先（None=移動しない）
+            error_dir (str): 処理に失敗した入力ファイルの移動先（None=移動しない）
+            use_processes (bool): プロセスプールで処理するか（False=スレッド）
+            use_watchdog (bool): watchdog がインストールされていれば通知を使うか
+            extensions: 対象の拡張子
+        """
+        from tableau_preprocessor import TableauDataPreprocessor
+
+        if file_format not in OUTPUT_EXTENSIONS:
+            raise ValueError(f"サポートされていない出力形式: {file_format}")
+        if os.path.abspath(watch_dir) == os.path.abspath(output_dir):
+            raise ValueError("出力先は監視するフォルダと別にしてください（出力ファイルを再処理してしまうため）")
+        self.watch_dir = watch_dir
+        self.output_dir = output_dir
+        self.steps = TableauDataPreprocessor.load_recipe(recipe)
+        self.file_format = file_format
+        self.workers = workers
+        self.settle_seconds = settle_seconds
+        self.poll_interval = poll_interval
+        self.archive_dir = archive_dir
+        self.error_dir = error_dir
+        self.use_processes = use_processes
+        self.use_watchdog = use_watchdog
+        self.extensions = tuple(ext.lower() for ext in extensions)
+
+        self.queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self.metrics = WatcherMetrics()
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        # パス -> (サイズ, 更新時刻, 変化が止まった時刻, 最初に検出した時刻)
+        self._pending: Dict[str, Tuple[int, int, float, float]] = {}
+        self._queued = set()
+        # 処理済みのファイル（同じパスでも中身が更新されたら再処理する）
+        self._done: Dict[str, Tuple[int, int]] = {}
+        self._notified = set()
+        self._threads: List[threading.Thread] = []
+        self._executor: Optional[Executor] = None
+        self._observer = None
+
+        for folder in [output_dir, archive_dir, error_dir]:
+            if folder:
+                os.makedirs(folder, exist_ok=True)
+
+    # -----------------------------------------
+    # ファイルの検出
+    # -----------------------------------------
+
+    def _is_candidate(self, name: str) -> bool:
+        lower = name.lower()
+        return (lower.endswith(self.extensions) and not name.startswith(IGNORED_PREFIXES)
+                and not lower.endswith(IGNORED_SUFFIXES))
+
+    def _notify(self, path: str):
+        """watchdog の通知を受け取る"""
+        if self._is_candidate(os.path.basename(path)):
+            with self._lock:
+                self._notified.add(os.path.abspath(path))
+
+    def _start_watchdog(self) -> bool:
+        if not self.use_watchdog:
+            return False
+        try:
+            from watchdog.events import FileSystemEventHandler
+            from watchdog.observers import Observer
+        except ImportError:
+            return False
+
+        watcher = self
+
+        class Handler(FileSystemEventHandler):
+            def on_any_event(self, event):
+                if not event.is_directory:
+                    watcher._notify(getattr(event, 'dest_path', None) or event.src_path)
+
+        self._observer = Observer()
+        self._observer.schedule(Handler(), self.watch_dir, recursive=False)
+        self._observer.start()
+        return True
+
+    def _list_directory(self) -> List[str]:
+        with os.scandir(self.watch_dir) as entries:
+            return [os.path.abspath(entry.path) for entry in entries
+                    if entry.is_file() and self._is_candidate(entry.name)]
+
+    @staticmethod
+    def _readable(path: str) -> bool:
+        """他のプロセスが書き込み中でないか（Windowsでは書き込み中のファイルは開けない）"""
+        try:
+            with open(path, 'rb'):
+                return True
+        except OSError:
+            return False
+
+    def _scan(self, paths: List[str]):
+        """候補ファイルの状態を確認し、書き込みが終わったものをキューに入れる"""
+        now = time.time()
+        for path in paths:
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                self._pending.pop(path, None)
+                continue
+            signature = (stat.st_size, stat.st_mtime_ns)
+            if path in self._queued or self._done.get(path) == signature:
+                continue
+
+            previous = self._pending.get(path)
+            if previous is None:
+                self.metrics.add('detected')
+                self._pending[path] = (*signature, now, now)
+            elif previous[:2] != signature:
+                self._pending[path] = (*signature, now, previous[3])
+
+        for path, (size, mtime, stable_since, detected_at) in list(self._pending.items()):
+            if size == 0 or now - stable_since < self.settle_seconds or not self._readable(path):
+                continue
+            try:
+                self.queue.put_nowait((path, (size, mtime), detected_at))
+            except queue.Full:
+                # 処理が追いつくまで待機のまま残す
+                self.metrics.add('backpressure_waits')
+                break
+            del self._pending[path]
+            self._queued.add(path)
+        self.metrics.observe_queue(self.queue.qsize())
+
+    def _scan_loop(self):
+        watching = self._start_watchdog()
+        mode = 'watchdog' if watching else 'ポーリング'
+        print(f"👀 監視を開始しました: {self.watch_dir} ({mode}, ワーカー{self.workers}, キュー上限{self.queue.maxsize})")
+
+        # 通知を使う場合も取りこぼしに備えて時々フォルダ全体を確認する
+        full_scan_every = 30.0 if watching else 0.0
+        last_full_scan = 0.0
+        while not self._stop.is_set():
+            now = time.time()
+            with self._lock:
+                paths = self._notified | set(self._pending)
+                self._notified = set()
+            if now - last_full_scan >= full_scan_every:
+                paths |= set(self._list_directory())
+                last_full_scan = now
+            with self._lock:
+                self._scan(sorted(paths))
+            self._stop.wait(self.poll_interval)
+
+    # -----------------------------------------
+    # 処理
+    # -----------------------------------------
+
+    def _move(self, path: str, folder: Optional[str]):
+        if folder and os.path.exists(path):
+            shutil.move(path, os.path.join(folder, os.path.basename(path)))
+
+    def _worker_loop(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                break
+            path, signature, detected_at = item
+            self.metrics.add('in_flight')
+            try:
+                future = self._executor.submit(process_file, path, self.steps, self.output_dir, self.file_format)
+                result = future.result()
+                latency = time.time() - detected_at
+                self.metrics.record(path, latency, result)
+                self._move(path, self.archive_dir)
+                print(f"✅ {os.path.basename(path)} -> {os.path.basename(result['output'])} "
+                      f"({result['rows']:,}行, 検出から{latency:.1f}秒)")
+            except Exception as e:
+                self.metrics.record(path, time.time() - detected_at, error=str(e))
+                self._move(path, self.error_dir)
+                print(f"❌ {os.path.basename(path)} の処理に失敗: {e}")
+            finally:
+                self.metrics.add('in_flight', -1)
+                with self._lock:
+                    self._queued.discard(path)
+                    if os.path.exists(path):
+                        # 移動しなかったファイルは、中身が更新されるまで再処理しない
+                        self._done[path] = signature
+                self.queue.task_done()
+
+    def status(self) -> Dict[str, Any]:
+        """現在の計測値"""
+        with self._lock:
+            pending = len(self._pending)
+        return self.metrics.snapshot(self.queue.qsize(), pending)
+
+    def start(self) -> 'HotFolderWatcher':
+        """監視とワーカーを開始（すぐに戻る）"""
+        self._executor = (ProcessPoolExecutor(max_workers=self.workers) if self.use_processes
+                          else ThreadPoolExecutor(max_workers=self.workers))
+        self._threads = [threading.Thread(target=self._worker_loop, daemon=True) for _ in range(self.workers)]
+        self._threads.append(threading.Thread(target=self._scan_loop, daemon=True))
+        for thread in self._threads:
+            thread.start()
+        return self
+
+    def stop(self):
+        """監視を止め、処理中のファイルが終わるのを待つ"""
+        self._stop.set()
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join()
+        for _ in range(self.workers):
+            self.queue.put(None)
+        for thread in self._threads:
+            thread.join()
+        self._executor.shutdown(wait=True)
+        print(f"🛑 停止しました ({self.metrics.processed:,}件処理, 失敗{self.metrics.failed:,}件)")
+
+
+def serve_metrics(watcher: HotFolderWatcher, host: str = '127.0.0.1', port: int = 8090) -> ThreadingHTTPServer:
+    """
+    計測値をHTTPで公開（バックグラウンドスレッドで動かす）
+
+    GET /metrics  応答: HotFolderWatcher.status() のJSON
+    """
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path != '/metrics':
+                self.send_response(404)
+                self.end_headers()
+                return
+            body = json.dumps(watcher.status(), ensure_ascii=False, default=str).encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"📈 計測値: http://{host}:{port}/metrics")
+    return server
+
+
+def main():
+    """メイン関数"""
+    parser = argparse.ArgumentParser(description='フォルダを監視して届いたファイルを自動で前処理')
+    parser.add_argument('watch_dir', help='監視するフォルダ')
+    parser.add_argument('output_dir', help='Tableau用ファイルの出力先')
+    parser.add_argument('--recipe', required=True, help='save_recipe() で保存したレシピ（JSON）')
+    parser.add_argument('--format', choices=list(OUTPUT_EXTENSIONS), default='csv', help='出力形式')
+    parser.add_argument('--workers', type=int, default=2, help='同時に処理するファイル数')
+    parser.add_argument('--queue-size', type=int, default=8, help='処理待ちキューの上限')
+    parser.add_argument('--settle', type=float, default=2.0, help='書き込み完了とみなすまでの秒数')
+    parser.add_argument('--poll', type=float, default=1.0, help='フォルダを確認する間隔（秒）')
+    parser.add_argument('--archive-dir', help='処理済みの入力ファイルの移動先')
+    parser.add_argument('--error-dir', help='失敗した入力ファイルの移動先')
+    parser.add_argument('--threads', action='store_true', help='プロセスではなくスレッドで処理')
+    parser.add_argument('--no-watchdog', action='store_true', help='watchdog を使わずポーリングする')
+    parser.add_argument('--metrics-port', type=int, help='計測値をHTTPで公開するポート')
+    parser.add_argument('--report-interval', type=float, default=60.0, help='計測値を表示する間隔（秒、0=表示しない）')
+    args = parser.parse_args()
+
+    watcher = HotFolderWatcher(args.watch_dir, args.output_dir, args.recipe, args.format, args.workers,
+                               args.queue_size, args.settle, args.poll, args.archive_dir, args.error_dir,
+                               use_processes=not args.threads, use_watchdog=not args.no_watchdog).start()
+    server = serve_metrics(watcher, port=args.metrics_port) if args.metrics_port else None
+    try:
+        while True:
+            time.sleep(args.report_interval or 3600)
+            if args.report_interval:
+                status = watcher.status()
+                print(f"📊 処理{status['processed']:,}件 失敗{status['failed']:,}件 "
+                      f"待ち{status['queue_depth']}件 処理中{status['in_flight']}件 "
+                      f"遅延p95 {status.get('latency_p95_s', '-')}秒")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if server is not None:
+            server.shutdown()
+        watcher.stop()
+
+
+if __name__ == "__main__":
+    main()
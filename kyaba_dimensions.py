@@ -0,0 +1,311 @@
+# -*- coding: utf-8 -*-
+"""
+Rose Garden 顧客・キャスト ディメンション生成
+顧客数・キャスト数・店舗数を指定して、ベクトル演算で顧客/キャストデータを生成する。
+来店頻度・指名頻度に Pareto / Zipf の偏りを持たせ、エイリアス法で O(1) に抽選する
+"""
+
+import random
+from datetime import datetime
+from typing import Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+# =========================================
+# 1. 基本設定
+# =========================================
+
+# 日本語名前データ
+CUSTOMER_NAMES = [
+    "田中", "佐藤", "高橋", "渡辺", "伊藤", "山田", "中村", "小林", "加藤", "吉田",
+    "山本", "佐々木", "山口", "松本", "井上", "木村", "林", "斎藤", "清水", "森田"
+]
+
+CAST_NAMES = [
+    "美咲", "麗子", "優香", "愛美", "聖子", "真由美", "由美子", "智子", "恵子", "裕子",
+    "美香", "直子", "典子", "良子", "美穂", "千代子", "和子", "洋子", "京子", "幸子"
+]
+
+OCCUPATIONS = ['経営者', 'サラリーマン', '医師', 'IT関係', '金融関係']
+CAST_TYPES = ['知的系', '癒し系', 'ギャル系', 'お姉さん系', '妹系']
+
+# 顧客ランク: (ランク, 累積確率, 来店回数, 累計利用額, 年齢)
+RANK_PROFILES = [
+    ('VIP', 0.08, (8, 25), (800000, 3000000), (35, 55)),
+    ('優良', 0.30, (4, 12), (300000, 1200000), (30, 50)),
+    ('一般', 0.85, (1, 6), (80000, 400000), (25, 45)),
+    ('新規', 1.00, (1, 3), (30000, 150000), (23, 40)),
+]
+
+# キャスト経験: (経験月数の下限, 時給, 指名数, 評価)
+EXPERIENCE_PROFILES = [
+    (24, (5000, 8000), (200, 600), (4.2, 5.0)),
+    (12, (4000, 6000), (100, 400), (3.8, 4.8)),
+    (0, (3000, 4500), (20, 200), (3.5, 4.5)),
+]
+
+
+def _profile_values(rng: np.random.Generator, index: np.ndarray, ranges: list, integer: bool = True) -> np.ndarray:
+    """プロファイル番号ごとの範囲から乱数を引く（範囲の上限を含む）"""
+    low = np.take([r[0] for r in ranges], index)
+    high = np.take([r[1] for r in ranges], index)
+    if integer:
+        return rng.integers(low, high + 1)
+    return rng.uniform(low, high)
+
+
+def _days_ago_labels(days: np.ndarray, now: datetime) -> np.ndarray:
+    """「今日からN日前」の日付文字列を、取りうる日数分だけ作って引く"""
+    max_days = int(days.max()) if len(days) else 0
+    labels = (pd.Timestamp(now).normalize() - pd.to_timedelta(np.arange(max_days + 1), unit='D')).strftime('%Y-%m-%d')
+    return np.take(labels.to_numpy(), days)
+
+
+def _numbered_names(rng: np.random.Generator, names: list, ids: np.ndarray, width: int) -> pd.Series:
+    """「名前_連番」形式の名前を作成"""
+    base = pd.Series(np.take(names, rng.integers(0, len(names), len(ids))))
+    return base + '_' + pd.Series(ids).astype(str).str.zfill(width)
+
+
+def _assign_stores(rng: np.random.Generator, n: int, n_stores: int, every_store: bool) -> np.ndarray:
+    """店舗IDを割り当てる（every_store=Trueなら全店舗に最低1件）"""
+    if every_store:
+        return rng.permutation(np.arange(n) % n_stores) + 1
+    return rng.integers(1, n_stores + 1, n)
+
+
+# =========================================
+# 2. ディメンション生成
+# =========================================
+
+def generate_customers(n_customers: int = 500, n_stores: int = 1, seed: Optional[int] = None) -> pd.DataFrame:
+    """
+    顧客データを生成
+
+    Args:
+        n_customers (int): 顧客数
+        n_stores (int): 店舗数（2以上の場合は store_id 列を付与）
+        seed (Optional[int]): 乱数シード
+
+    Returns:
+        pd.DataFrame: 顧客データ
+    """
+    rng = np.random.default_rng(seed)
+    now = datetime.now()
+    ids = np.arange(1, n_customers + 1)
+
+    # 顧客ランクの決定
+    rank_index = np.searchsorted([p[1] for p in RANK_PROFILES], rng.random(n_customers), side='right')
+    rank_index = np.minimum(rank_index, len(RANK_PROFILES) - 1)
+    age = _profile_values(rng, rank_index, [p[4] for p in RANK_PROFILES])
+
+    # 登録日（新規は90日以内）
+    is_new = rank_index == len(RANK_PROFILES) - 1
+    reg_days = np.where(is_new, rng.integers(1, 91, n_customers), rng.integers(30, 731, n_customers))
+
+    customers = pd.DataFrame({
+        'customer_id': ids,
+        'customer_name': _numbered_names(rng, CUSTOMER_NAMES, ids, 3),
+        'customer_rank': np.take([p[0] for p in RANK_PROFILES], rank_index),
+        'registration_date': _days_ago_labels(reg_days, now),
+        'birth_year': now.year - age,
+        'age': age,
+        'occupation_category': np.take(OCCUPATIONS, rng.integers(0, len(OCCUPATIONS), n_customers)),
+        'total_visits': _profile_values(rng, rank_index, [p[2] for p in RANK_PROFILES]),
+        'total_spent': _profile_values(rng, rank_index, [p[3] for p in RANK_PROFILES]),
+        'last_visit_date': _days_ago_labels(rng.integers(1, 61, n_customers), now),
+        'status': 'active',
+    })
+    if n_stores > 1:
+        customers['store_id'] = _assign_stores(rng, n_customers, n_stores, every_store=False)
+    return customers
+
+
+def generate_casts(n_casts: int = 30, n_stores: int = 1, seed: Optional[int] = None) -> pd.DataFrame:
+    """
+    キャストデータを生成
+
+    Args:
+        n_casts (int): キャスト数（店舗数以上）
+        n_stores (int): 店舗数（2以上の場合は store_id 列を付与）
+        seed (Optional[int]): 乱数シード
+
+    Returns:
+        pd.DataFrame: キャストデータ
+    """
+    if n_casts < n_stores:
+        raise ValueError(f"キャスト数({n_casts})は店舗数({n_stores})以上にしてください")
+
+    rng = np.random.default_rng(seed)
+    now = datetime.now()
+    ids = np.arange(1, n_casts + 1)
+
+    hire_days = rng.integers(30, 1096, n_casts)
+    experience_months = np.maximum(1, hire_days // 30)
+
+    # 経験に応じた設定
+    profile_index = np.select([experience_months >= p[0] for p in EXPERIENCE_PROFILES],
+                              np.arange(len(EXPERIENCE_PROFILES)))
+
+    casts = pd.DataFrame({
+        'cast_id': ids,
+        'cast_name': _numbered_names(rng, CAST_NAMES, ids, 2),
+        'hire_date': _days_ago_labels(hire_days, now),
+        'cast_type': np.take(CAST_TYPES, rng.integers(0, len(CAST_TYPES), n_casts)),
+        'experience_months': experience_months,
+        'hourly_rate': _profile_values(rng, profile_index, [p[1] for p in EXPERIENCE_PROFILES]),
+        'total_nominations': _profile_values(rng, profile_index, [p[2] for p in EXPERIENCE_PROFILES]),
+        'average_rating': _profile_values(rng, profile_index, [p[3] for p in EXPERIENCE_PROFILES],
+                                          integer=False).round(2),
+        'status': 'active',
+    })
+    if n_stores > 1:
+        casts['store_id'] = _assign_stores(rng, n_casts, n_stores, every_store=True)
+    return casts
+
+
+# =========================================
+# 3. 偏りのある抽選
+# =========================================
+
+# これより件数が多い場合は、エイリアス表をPythonのループで作らず累積和の表で抽選する
+ALIAS_TABLE_MAX_SIZE = 10_000
+
+
+class AliasTable:
+    """
+    エイリアス法（Vose）による重み付き抽選テーブル
+
+    構築は O(n)、1回の抽選は O(1)。
+    件数が ALIAS_TABLE_MAX_SIZE を超える場合は構築をベクトル演算の累積和で行い、
+    抽選は searchsorted による O(log n) になる。
+    """
+
+    def __init__(self, weights):
+        weights = np.asarray(weights, dtype=float)
+        n = len(weights)
+        if n == 0 or not np.isfinite(weights).all() or (weights < 0).any() or weights.sum() <= 0:
+            raise ValueError("重みは1件以上の非負の有限値で、合計が正である必要があります")
+
+        self.n = n
+        self.prob = None
+        self.alias = None
+        self.cumulative = None
+        if n > ALIAS_TABLE_MAX_SIZE:
+            self.cumulative = np.cumsum(weights)
+            return
+
+        scaled = weights * n / weights.sum()
+        small = np.flatnonzero(scaled < 1.0).tolist()
+        large = np.flatnonzero(scaled >= 1.0).tolist()
+        scaled = scaled.tolist()
+        prob = [1.0] * n
+        alias = list(range(n))
+
+        while small and large:
+            s, l = small.pop(), large.pop()
+            prob[s] = scaled[s]
+            alias[s] = l
+            scaled[l] = scaled[l] + scaled[s] - 1.0
+            (small if scaled[l] < 1.0 else large).append(l)
+
+        self.prob = np.array(prob)
+        self.alias = np.array(alias, dtype=np.int64)
+
+    def _search(self, points) -> np.ndarray:
+        """累積和の表で [0, 合計) の点に対応する位置を求める（重み0の位置は選ばれない）"""
+        return np.minimum(np.searchsorted(self.cumulative, points, side='right'), self.n - 1)
+
+    def sample(self, size: int, rng: np.random.Generator) -> np.ndarray:
+        """size件を一括抽選して位置（0始まり）を返す"""
+        if self.cumulative is not None:
+            return self._search(rng.random(size) * self.cumulative[-1])
+        column = rng.integers(0, self.n, size)
+        accept = rng.random(size) < self.prob[column]
+        return np.where(accept, column, self.alias[column])
+
+    def sample_one(self, rand: random.Random = random) -> int:
+        """1件を抽選して位置（0始まり）を返す"""
+        if self.cumulative is not None:
+            return int(self._search(rand.random() * self.cumulative[-1]))
+        column = int(rand.random() * self.n)
+        return column if rand.random() < self.prob[column] else int(self.alias[column])
+
+
+def skew_factors(n: int, rng: np.random.Generator, skew: str = 'pareto', param: float = 1.5) -> np.ndarray:
+    """
+    人気の偏りを表す倍率を生成
+
+    Args:
+        n (int): 件数
+        rng (np.random.Generator): 乱数生成器
+        skew (str): 'pareto'（裾の重い分布）, 'zipf'（順位の-param乗）, 'uniform'（偏りなし）
+        param (float): Paretoの形状パラメータ / Zipfの指数
+
+    Returns:
+        np.ndarray: 倍率
+    """
+    if skew == 'pareto':
+        return rng.pareto(param, n) + 1.0
+    if skew == 'zipf':
+        return 1.0 / rng.permutation(np.arange(1, n + 1)) ** param
+    if skew == 'uniform':
+        return np.ones(n)
+    raise ValueError(f"サポートされていない偏り: {skew}")
+
+
+class DimensionSampler:
+    """
+    売上行に対応する顧客・キャストを抽選するクラス
+
+    顧客は total_visits、キャストは total_nominations に偏り倍率を掛けた重みで選ばれるため、
+    VIP・人気キャストほど多く登場する。店舗がある場合は顧客と同じ店舗のキャストから選ぶ。
+    """
+
+    def __init__(self, customers_df: pd.DataFrame, casts_df: pd.DataFrame, skew: str = 'pareto',
+                 param: float = 1.5, seed: Optional[int] = None):
+        self.rng = np.random.default_rng(seed)
+
+        customer_weights = customers_df['total_visits'].to_numpy() * skew_factors(
+            len(customers_df), self.rng, skew, param)
+        cast_weights = casts_df['total_nominations'].to_numpy() * skew_factors(
+            len(casts_df), self.rng, skew, param)
+        self.customer_table = AliasTable(customer_weights)
+
+        self.customer_stores = None
+        self.cast_tables = {}
+        if 'store_id' in customers_df.columns and 'store_id' in casts_df.columns:
+            self.customer_stores = customers_df['store_id'].to_numpy()
+            cast_stores = casts_df['store_id'].to_numpy()
+            for store in np.unique(cast_stores):
+                positions = np.flatnonzero(cast_stores == store)
+                self.cast_tables[store] = (positions, AliasTable(cast_weights[positions]))
+            missing = set(np.unique(self.customer_stores)) - set(self.cast_tables)
+            if missing:
+                raise ValueError(f"キャストのいない店舗があります: {sorted(missing)}")
+        else:
+            self.cast_tables[None] = (np.arange(len(casts_df)), AliasTable(cast_weights))
+
+    def sample(self, size: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        売上size件分の顧客・キャストを抽選
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: 顧客の行位置, キャストの行位置
+        """
+        customer_positions = self.customer_table.sample(size, self.rng)
+        cast_positions = np.empty(size, dtype=np.int64)
+
+        if self.customer_stores is None:
+            positions, table = self.cast_tables[None]
+            cast_positions[:] = positions[table.sample(size, self.rng)]
+            return customer_positions, cast_positions
+
+        sale_stores = self.customer_stores[customer_positions]
+        for store, (positions, table) in self.cast_tables.items():
+            mask = sale_stores == store
+            count = int(mask.sum())
+            if count:
+                cast_positions[mask] = positions[table.sample(count, self.rng)]
+        return customer_positions, cast_positions
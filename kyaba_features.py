@@ -0,0 +1,315 @@
+# -*- coding: utf-8 -*-
+"""
+Rose Garden 売上データの特徴量作成
+rose_garden_sales.csv から機械学習用の特徴量を作成する。
+カレンダー特徴量（曜日・時間帯・月末・祝日）、キャスト別・顧客別の売上ラグと移動合計、
+顧客ランクを付与し、前回までの状態を保存しておけば新しい日の分だけを計算できる
+
+使用例:
+    builder = SalesFeatureBuilder(customers_df, casts_df)
+    features = builder.update(sales_df)                  # 売上1行ごとの特徴量
+    builder.save_state('rose_garden_feature_state.json')
+
+    # 翌日: 新しい日の売上だけを渡す
+    builder = SalesFeatureBuilder(customers_df, casts_df).load_state('rose_garden_feature_state.json')
+    new_features = builder.update(new_sales_df)
+
+    # 学習（pipeline_artifacts.complete_ml_pipeline）
+    pipeline, rmse = complete_ml_pipeline(features.drop(columns=['sale_date', 'sale_id']), 'total_amount')
+"""
+
+import json
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from kyaba_star_schema import RANK_ORDER, lookup_attributes
+
+# 売上行の特徴量を作るエンティティ（名前 -> キー列）
+ENTITY_KEYS = {'cast': 'cast_id', 'customer': 'customer_id'}
+
+DEFAULT_LAGS = (1, 7, 14)
+DEFAULT_WINDOWS = (7, 28)
+
+# 祝日（jpholiday がない場合に使う固定日の祝日: (月, 日)）
+JP_FIXED_HOLIDAYS = {
+    (1, 1), (2, 11), (2, 23), (4, 29), (5, 3), (5, 4), (5, 5),
+    (8, 11), (11, 3), (11, 23),
+}
+
+CAST_FEATURES = ['experience_months', 'hourly_rate', 'average_rating']
+
+# 日番号とキーを1つの整数にまとめる時の日番号のビット数
+_DAY_BITS = 20
+
+
+# =========================================
+# 1. カレンダー特徴量
+# =========================================
+
+def _day_numbers(dates: pd.Series) -> np.ndarray:
+    """日付を1970-01-01からの日数に変換"""
+    return dates.to_numpy().astype('datetime64[D]').astype(np.int64)
+
+
+def holiday_flags(dates: pd.Series) -> np.ndarray:
+    """
+    祝日フラグ（jpholiday があれば振替休日なども含めて判定）
+
+    判定は一意の日付だけで行い、結果を各行に展開する。
+    """
+    unique = pd.DatetimeIndex(pd.unique(dates))
+    try:
+        import jpholiday
+        flags = [jpholiday.is_holiday(d.date()) for d in unique]
+    except ImportError:
+        flags = [(d.month, d.day) in JP_FIXED_HOLIDAYS for d in unique]
+    return pd.Series(flags, index=unique).reindex(dates).to_numpy(dtype=np.int8)
+
+
+def calendar_features(dates: pd.Series) -> Dict[str, np.ndarray]:
+    """曜日・日・月末・週末・祝日の特徴量"""
+    dates = pd.Series(dates)
+    return {
+        'weekday': dates.dt.weekday.to_numpy(dtype=np.int8),
+        'day': dates.dt.day.to_numpy(dtype=np.int8),
+        'month_end': dates.dt.is_month_end.to_numpy(dtype=np.int8),
+        'is_weekend': (dates.dt.weekday >= 5).to_numpy(dtype=np.int8),
+        'is_holiday': holiday_flags(dates),
+    }
+
+
+# =========================================
+# 2. エンティティ別の売上履歴
+# =========================================
+
+class _EntityHistory:
+    """
+    1種類のエンティティ（キャスト・顧客など）の日別売上
+
+    (キー, 日番号) を1つの整数にまとめて並べ、累積和を持っておくことで、
+    任意の (キー, 日) に対するラグや「前日までN日間の合計」を二分探索でまとめて求める。
+    """
+
+    def __init__(self, panel: pd.DataFrame):
+        composite = (panel['key'].to_numpy(dtype=np.int64) << _DAY_BITS) + panel['day'].to_numpy(dtype=np.int64)
+        order = np.argsort(composite, kind='stable')
+        self.composite = composite[order]
+        self.revenue = panel['revenue'].to_numpy(dtype=np.float64)[order]
+        self.cumulative = {
+            'revenue': np.concatenate([[0.0], np.cumsum(self.revenue)]),
+            'visits': np.concatenate([[0], np.cumsum(panel['visits'].to_numpy(dtype=np.int64)[order])]),
+        }
+
+    def lag(self, keys: np.ndarray, days: np.ndarray, lag: int) -> np.ndarray:
+        """lag日前の売上（売上がない日は0）"""
+        if len(self.composite) == 0:
+            return np.zeros(len(keys))
+        query = (keys << _DAY_BITS) + (days - lag)
+        positions = np.minimum(np.searchsorted(self.composite, query), len(self.composite) - 1)
+        return np.where(self.composite[positions] == query, self.revenue[positions], 0.0)
+
+    def window_sum(self, keys: np.ndarray, days: np.ndarray, window: int, value: str = 'revenue') -> np.ndarray:
+        """前日までwindow日間（当日を含まない）の合計"""
+        cumulative = self.cumulative[value]
+        high = np.searchsorted(self.composite, (keys << _DAY_BITS) + days)
+        low = np.searchsorted(self.composite, (keys << _DAY_BITS) + (days - window))
+        return cumulative[high] - cumulative[low]
+
+
+# =========================================
+# 3. 特徴量作成
+# =========================================
+
+class SalesFeatureBuilder:
+    """
+    売上データから特徴量を作成するクラス
+
+    update() には日単位でまとめて売上を渡す（同じ日の売上を2回に分けない）。
+    処理済みの最終日より前の売上は無視し、ラグ・移動合計に必要な日数分の日別売上だけを状態として保持する。
+    """
+
+    def __init__(self, customers_df: pd.DataFrame, casts_df: Optional[pd.DataFrame] = None,
+                 lags: Tuple[int, ...] = DEFAULT_LAGS, windows: Tuple[int, ...] = DEFAULT_WINDOWS):
+        """
+        初期化
+
+        Args:
+            customers_df (pd.DataFrame): 顧客データ（customer_id, customer_rank）
+            casts_df (Optional[pd.DataFrame]): キャストデータ（cast_id と CAST_FEATURES の列）
+            lags (Tuple[int, ...]): ラグの日数
+            windows (Tuple[int, ...]): 移動合計の日数
+        """
+        self.customers_df = customers_df[['customer_id', 'customer_rank']].assign(
+            customer_rank=pd.Categorical(customers_df['customer_rank'], categories=RANK_ORDER, ordered=True))
+        self.casts_df = casts_df
+        self.lags = tuple(lags)
+        self.windows = tuple(windows)
+        self.history: Optional[pd.DataFrame] = None
+        self.last_day: Optional[int] = None
+
+    @property
+    def history_days(self) -> int:
+        """状態として保持する日数（最大のラグ・移動合計の日数）"""
+        return max(self.lags + self.windows)
+
+    def _prepare(self, sales_df: pd.DataFrame) -> pd.DataFrame:
+        """日付・日番号・時間帯・顧客ランクのコードを付与"""
+        dates = pd.to_datetime(sales_df['sale_date'])
+        rank = lookup_attributes(self.customers_df, 'customer_id', sales_df['customer_id'],
+                                 ['customer_rank'])['customer_rank']
+        rank_code = rank.cat.codes.to_numpy().astype(np.int64)
+        return pd.DataFrame({
+            'sale_date': dates,
+            'day': _day_numbers(dates),
+            'hour': sales_df['sale_time'].astype(str).str.slice(0, 2).astype(np.int8).to_numpy(),
+            'customer_rank_code': np.where(rank_code < 0, len(RANK_ORDER), rank_code),
+            'cast_id': sales_df['cast_id'].to_numpy(dtype=np.int64),
+            'customer_id': sales_df['customer_id'].to_numpy(dtype=np.int64),
+            'total_amount': sales_df['total_amount'].to_numpy(dtype=np.float64),
+        }, index=sales_df.index)
+
+    def _panel(self, prepared: pd.DataFrame) -> pd.DataFrame:
+        """エンティティ別・日別の売上合計と件数（entity, key, day, revenue, visits）"""
+        keys = {
+            'cast': prepared['cast_id'].to_numpy(),
+            'customer': prepared['customer_id'].to_numpy(),
+            'rank': prepared['customer_rank_code'].to_numpy(),
+            'total': np.zeros(len(prepared), dtype=np.int64),
+        }
+        frames = []
+        for entity, entity_keys in keys.items():
+            daily = (pd.DataFrame({'key': entity_keys, 'day': prepared['day'].to_numpy(),
+                                   'revenue': prepared['total_amount'].to_numpy()})
+                     .groupby(['key', 'day'], sort=False)['revenue'].agg(['sum', 'count'])
+                     .reset_index()
+                     .rename(columns={'sum': 'revenue', 'count': 'visits'}))
+            frames.append(daily.assign(entity=entity))
+        return pd.concat(frames, ignore_index=True)[['entity', 'key', 'day', 'revenue', 'visits']]
+
+    def _history_features(self, histories: Dict[str, _EntityHistory], entity: str, keys: np.ndarray,
+                          days: np.ndarray, prefix: str, lags: bool = True) -> Dict[str, np.ndarray]:
+        """エンティティのラグ・移動合計の特徴量"""
+        history = histories[entity]
+        features = {}
+        if lags:
+            for lag in self.lags:
+                features[f"{prefix}_revenue_lag_{lag}"] = history.lag(keys, days, lag)
+        for window in self.windows:
+            features[f"{prefix}_revenue_sum_{window}d"] = history.window_sum(keys, days, window)
+            features[f"{prefix}_visits_sum_{window}d"] = history.window_sum(keys, days, window, 'visits')
+        return features
+
+    def _sale_features(self, prepared: pd.DataFrame, histories: Dict[str, _EntityHistory],
+                       sales_df: pd.DataFrame) -> pd.DataFrame:
+        """売上1行ごとの特徴量"""
+        days = prepared['day'].to_numpy()
+        features = {'sale_date': prepared['sale_date']}
+        if 'sale_id' in sales_df.columns:
+            features['sale_id'] = sales_df['sale_id']
+        features.update(calendar_features(prepared['sale_date']))
+        features['hour'] = prepared['hour']
+        features['customer_rank_code'] = prepared['customer_rank_code'].astype(np.int8)
+
+        if self.casts_df is not None:
+            features.update(lookup_attributes(self.casts_df, 'cast_id', sales_df['cast_id'], CAST_FEATURES))
+
+        for entity, key in ENTITY_KEYS.items():
+            features.update(self._history_features(histories, entity, prepared[key].to_numpy(), days, entity))
+        features['total_amount'] = prepared['total_amount']
+        return pd.DataFrame(features, index=prepared.index)
+
+    def _daily_features(self, prepared: pd.DataFrame, histories: Dict[str, _EntityHistory]) -> pd.DataFrame:
+        """日別（店全体）の特徴量。売上のない日も0として並べる"""
+        if prepared.empty:
+            return pd.DataFrame()
+        first_day = int(prepared['day'].min())
+        days = np.arange(first_day, int(prepared['day'].max()) + 1)
+        offsets = prepared['day'].to_numpy() - first_day
+        dates = pd.Series(days.astype('datetime64[D]').astype('datetime64[ns]'))
+
+        features = {'revenue': np.bincount(offsets, weights=prepared['total_amount'].to_numpy(),
+                                           minlength=len(days))}
+        features.update(calendar_features(dates))
+        features.update(self._history_features(histories, 'total', np.zeros(len(days), dtype=np.int64),
+                                               days, 'total'))
+        # 顧客ランク別の売上構成
+        for code, rank in enumerate(RANK_ORDER):
+            rank_features = self._history_features(histories, 'rank', np.full(len(days), code, dtype=np.int64),
+                                                    days, f"rank_{rank}", lags=False)
+            features.update({name: values for name, values in rank_features.items() if 'revenue' in name})
+
+        return pd.DataFrame(features, index=pd.DatetimeIndex(dates, name='sale_date'))
+
+    def update(self, sales_df: pd.DataFrame, level: str = 'sale') -> pd.DataFrame:
+        """
+        新しい日の売上から特徴量を作成し、状態を更新
+
+        Args:
+            sales_df (pd.DataFrame): 売上データ（処理済みの最終日より後の日の売上）
+            level (str): 'sale'（売上1行ごと、目的変数 total_amount）
+                         'day'（日別の店全体、目的変数 revenue）
+
+        Returns:
+            pd.DataFrame: 特徴量
+        """
+        if level not in ('sale', 'day'):
+            raise ValueError(f"サポートされていない粒度: {level}")
+
+        prepared = self._prepare(sales_df)
+        if self.last_day is not None:
+            is_new = prepared['day'].to_numpy() > self.last_day
+            if not is_new.all():
+                print(f"⚠️ 処理済みの日の売上 {int((~is_new).sum()):,}件をスキップしました")
+            prepared = prepared[is_new]
+            sales_df = sales_df[is_new]
+
+        panel = self._panel(prepared)
+        if self.history is not None:
+            panel = pd.concat([self.history, panel], ignore_index=True)
+        histories = {entity: _EntityHistory(panel[panel['entity'] == entity])
+                     for entity in ['cast', 'customer', 'rank', 'total']}
+
+        if level == 'sale':
+            features = self._sale_features(prepared, histories, sales_df)
+        else:
+            features = self._daily_features(prepared, histories)
+
+        if not prepared.empty:
+            self.last_day = int(prepared['day'].max())
+            self.history = panel[panel['day'] > self.last_day - self.history_days].reset_index(drop=True)
+        return features
+
+    def fit_transform(self, sales_df: pd.DataFrame, level: str = 'sale') -> pd.DataFrame:
+        """状態を初期化して売上データ全体から特徴量を作成"""
+        self.history = None
+        self.last_day = None
+        return self.update(sales_df, level)
+
+    def save_state(self, path: str) -> str:
+        """ラグ・移動合計の計算に必要な日別売上と最終日をJSONで保存"""
+        history = self.history
+        if history is None:
+            history = pd.DataFrame(columns=['entity', 'key', 'day', 'revenue', 'visits'])
+        state = {
+            'saved_at': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            'last_day': self.last_day,
+            'lags': list(self.lags),
+            'windows': list(self.windows),
+            'history': {col: history[col].tolist() for col in history.columns},
+        }
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(state, f, ensure_ascii=False)
+        return path
+
+    def load_state(self, path: str) -> 'SalesFeatureBuilder':
+        """save_state() で保存した状態を読み込む"""
+        with open(path, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+        if tuple(state['lags']) != self.lags or tuple(state['windows']) != self.windows:
+            raise ValueError("保存時とラグ・移動合計の日数が異なります")
+        self.last_day = state['last_day']
+        self.history = pd.DataFrame(state['history'])
+        return self
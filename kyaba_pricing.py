@@ -0,0 +1,116 @@
+"""
+キャバクラ売上の料金モデル
+Description: kyaba_sales.py（年間の売上バッチ）と pos_stream_simulator.py（リアルタイムの売上イベント）で共通の
+             営業時間・曜日の重み、顧客ランク別のサービス選択・料金倍率、追加料金の確率と範囲を定義する。
+             price_sales() は顧客ランクの配列から売上の金額をまとめてベクトル演算で生成する
+"""
+
+from typing import Dict, Optional
+
+import numpy as np
+
+SERVICE_TYPES = ['通常セット', 'プレミアムセット', 'VIPコース', '延長コース', 'ボトルキープ']
+SERVICE_BASE_PRICES = {
+    '通常セット': 8000,
+    'プレミアムセット': 15000,
+    'VIPコース': 25000,
+    '延長コース': 10000,
+    'ボトルキープ': 30000
+}
+PAYMENT_METHODS = ['現金', 'カード', '掛け', '電子マネー']
+
+# 営業時間（19:00-26:00、22-24時がピーク）
+OPEN_HOUR = 19
+HOUR_WEIGHTS = [5, 8, 12, 15, 18, 20, 15, 7]  # 19-26時の重み
+
+# 曜日の重み（月=0 … 日=6、週末に偏重）。売上は 重み/6 の確率で残る
+WEEKDAY_WEIGHTS = [1, 1, 1, 1, 2, 3, 3]
+
+# 顧客ランク別のサービスの選びやすさ（SERVICE_TYPES の順、該当しないランクは 'default'）
+SERVICE_WEIGHTS_BY_RANK = {
+    'VIP': [1, 3, 4, 1.5, 0.5],
+    '優良': [2, 4, 2.5, 1, 0.5],
+    'default': [5, 3, 1, 0.8, 0.2],
+}
+
+# 顧客ランク別の料金倍率の範囲
+MULTIPLIER_BY_RANK = {
+    'VIP': (2.5, 4.0),
+    '優良': (1.5, 2.8),
+    '一般': (0.8, 1.5),
+    '新規': (0.6, 1.2),
+}
+
+DRINK_CHARGE_RANGE = (3000, 20000)
+NOMINATION_PROBABILITY = 0.3
+NOMINATION_FEE_RANGE = (2000, 8000)
+EXTENSION_PROBABILITY = 0.2
+EXTENSION_FEE_RANGE = (5000, 20000)
+DURATION_RANGE = (60, 180)
+EXTENDED_DURATION_RANGE = (120, 360)
+
+
+def hour_weight(hour: int) -> float:
+    """時刻（0-23時）の来店の重み（営業時間外は0）"""
+    offset = (hour - OPEN_HOUR) % 24
+    return float(HOUR_WEIGHTS[offset]) if offset < len(HOUR_WEIGHTS) else 0.0
+
+
+def _integers(rng: np.random.Generator, bounds, size: int) -> np.ndarray:
+    """random.randint と同じく上限を含む整数"""
+    return rng.integers(bounds[0], bounds[1] + 1, size)
+
+
+def price_sales(ranks: np.ndarray, rng: Optional[np.random.Generator] = None) -> Dict[str, np.ndarray]:
+    """
+    顧客ランクの配列から売上の金額をまとめて生成（kyaba_sales.py の1件ずつの計算と同じ分布）
+
+    Args:
+        ranks (np.ndarray): 売上ごとの顧客ランク
+        rng (np.random.Generator): 乱数生成器
+
+    Returns:
+        Dict[str, np.ndarray]: service_type, base_charge, drink_charge, nomination_fee,
+                               extension_fee, total_amount, payment_method, duration_minutes
+    """
+    rng = rng or np.random.default_rng()
+    ranks = np.asarray(ranks)
+    n = len(ranks)
+    base_prices = np.array([SERVICE_BASE_PRICES[name] for name in SERVICE_TYPES], dtype=np.float64)
+
+    service_index = np.empty(n, dtype=np.int64)
+    multiplier = np.empty(n, dtype=np.float64)
+    special_ranks = [rank for rank in SERVICE_WEIGHTS_BY_RANK if rank != 'default']
+    default_mask = ~np.isin(ranks, special_ranks)
+    for rank, weights in SERVICE_WEIGHTS_BY_RANK.items():
+        mask = default_mask if rank == 'default' else ranks == rank
+        count = int(mask.sum())
+        if count:
+            p = np.asarray(weights, dtype=np.float64) / sum(weights)
+            service_index[mask] = rng.choice(len(SERVICE_TYPES), count, p=p)
+
+    low, high = MULTIPLIER_BY_RANK['新規']  # 不明なランクは新規扱い
+    multiplier[:] = rng.uniform(low, high, n)
+    for rank, (low, high) in MULTIPLIER_BY_RANK.items():
+        mask = ranks == rank
+        count = int(mask.sum())
+        if count:
+            multiplier[mask] = rng.uniform(low, high, count)
+
+    base_charge = (base_prices[service_index] * multiplier).astype(np.int64)
+    drink_charge = _integers(rng, DRINK_CHARGE_RANGE, n)
+    nomination_fee = np.where(rng.random(n) < NOMINATION_PROBABILITY, _integers(rng, NOMINATION_FEE_RANGE, n), 0)
+    extended = rng.random(n) < EXTENSION_PROBABILITY
+    extension_fee = np.where(extended, _integers(rng, EXTENSION_FEE_RANGE, n), 0)
+    duration = np.where(extended, _integers(rng, EXTENDED_DURATION_RANGE, n), _integers(rng, DURATION_RANGE, n))
+
+    return {
+        'service_type': np.asarray(SERVICE_TYPES, dtype=object)[service_index],
+        'base_charge': base_charge,
+        'drink_charge': drink_charge,
+        'nomination_fee': nomination_fee,
+        'extension_fee': extension_fee,
+        'total_amount': base_charge + drink_charge + nomination_fee + extension_fee,
+        'payment_method': np.asarray(PAYMENT_METHODS, dtype=object)[rng.integers(0, len(PAYMENT_METHODS), n)],
+        'duration_minutes': duration,
+    }
@@ -0,0 +1,194 @@
+# -*- coding: utf-8 -*-
+"""
+Rose Garden 売上統計レポート
+売上データをチャンク単位で受け取りながら集計し、
+ランク別・サービス別・時間帯別・キャスト別の統計をJSON/Parquetで出力する
+"""
+
+import json
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+# 集計する切り口（レポート上の名前 -> 表示名）
+SALES_DIMENSIONS = {
+    'by_rank': '顧客ランク別',
+    'by_service': 'サービス別',
+    'by_hour': '時間帯別',
+    'by_cast': 'キャスト別',
+    'by_payment': '支払方法別',
+}
+
+
+class SalesReportAccumulator:
+    """
+    売上統計を逐次集計するクラス
+
+    集計値は件数と合計のみを保持するため、チャンクごとに update() を呼べば
+    売上データ全体を再読み込みせずに最終統計が得られる。
+    """
+
+    def __init__(self, customers_df: pd.DataFrame, casts_df: pd.DataFrame):
+        """
+        初期化
+
+        Args:
+            customers_df (pd.DataFrame): 顧客データ（customer_id, customer_rank）
+            casts_df (pd.DataFrame): キャストデータ（cast_id, cast_name）
+        """
+        self.customers_df = customers_df
+        self.casts_df = casts_df
+        self._customer_index = pd.Index(customers_df['customer_id'])
+        self._customer_ranks = customers_df['customer_rank'].astype('category')
+        self.sales_count = 0
+        self.total_amount = 0
+        self._groups = {name: None for name in SALES_DIMENSIONS}
+
+    def _dimension_codes(self, sales_chunk: pd.DataFrame) -> Dict[str, Any]:
+        """チャンクの各行の集計キーを (コード, キーの値) に変換（コード -1 は集計しない）"""
+        positions = self._customer_index.get_indexer(sales_chunk['customer_id'].to_numpy())
+        rank_codes = self._customer_ranks.cat.codes.to_numpy()[np.where(positions < 0, 0, positions)]
+        rank_codes[positions < 0] = -1
+        rank_labels = pd.CategoricalIndex(self._customer_ranks.cat.categories, dtype=self._customer_ranks.dtype)
+        hours = sales_chunk['sale_time'].astype(str).str.slice(0, 2).astype(np.int8)
+        dimensions = {'by_rank': (rank_codes.astype(np.int64), rank_labels)}
+        for name, values in [('by_service', sales_chunk['service_type']), ('by_hour', hours),
+                             ('by_cast', sales_chunk['cast_id']), ('by_payment', sales_chunk['payment_method'])]:
+            codes, uniques = pd.factorize(values)
+            dimensions[name] = (codes.astype(np.int64), pd.Index(uniques))
+        return dimensions
+
+    def update(self, sales_chunk: pd.DataFrame) -> 'SalesReportAccumulator':
+        """
+        売上データのチャンクを集計に加える
+
+        切り口ごとのコードを1つの整数キーにまとめて1回だけ groupby し、
+        各切り口の集計はその結果（キーの組み合わせ数の行だけ）から求める。
+
+        Args:
+            sales_chunk (pd.DataFrame): 売上データの一部（または全体）
+
+        Returns:
+            SalesReportAccumulator: 自身（メソッドチェーン用）
+        """
+        if sales_chunk.empty:
+            return self
+
+        amount = sales_chunk['total_amount'].to_numpy()
+        self.sales_count += len(sales_chunk)
+        self.total_amount += int(amount.sum())
+
+        # コード -1（欠損・未登録の顧客）は 0 にずらし、各切り口の集計で除く
+        dimensions = self._dimension_codes(sales_chunk)
+        shifted = [codes + 1 for codes, _ in dimensions.values()]
+        sizes = [len(labels) + 1 for _, labels in dimensions.values()]
+        combined = np.ravel_multi_index(shifted, sizes)
+        totals = (pd.DataFrame({'key': combined, 'amount': amount})
+                  .groupby('key', sort=False)['amount']
+                  .agg(['count', 'sum']))
+        combos = np.unravel_index(totals.index.to_numpy(), sizes)
+
+        for (name, (_, labels)), codes in zip(dimensions.items(), combos):
+            present = codes > 0
+            partial = totals[present].groupby(codes[present] - 1, sort=False).sum()
+            partial.index = labels.take(partial.index.to_numpy())
+            previous = self._groups[name]
+            self._groups[name] = partial if previous is None else previous.add(partial, fill_value=0)
+        return self
+
+    def _group_table(self, name: str) -> pd.DataFrame:
+        """集計済みの切り口を count/sum/mean の表にする"""
+        table = self._groups[name]
+        if table is None:
+            return pd.DataFrame(columns=['count', 'total_amount', 'avg_amount'])
+        table = table.astype(np.int64).rename(columns={'sum': 'total_amount'})
+        table['avg_amount'] = (table['total_amount'] / table['count']).round(0)
+        return table.sort_index()
+
+    def report(self) -> Dict[str, Any]:
+        """
+        集計結果をJSONに変換可能な辞書で取得
+
+        Returns:
+            Dict[str, Any]: 顧客・キャスト・売上の統計情報
+        """
+        rank_counts = self.customers_df['customer_rank'].value_counts()
+        cast_names = dict(zip(self.casts_df['cast_id'], self.casts_df['cast_name']))
+
+        sales = {
+            'count': self.sales_count,
+            'total_amount': self.total_amount,
+            'avg_amount': round(self.total_amount / self.sales_count, 0) if self.sales_count else 0,
+        }
+        for name in SALES_DIMENSIONS:
+            table = self._group_table(name)
+            if name == 'by_cast':
+                table.insert(0, 'cast_name', table.index.map(cast_names))
+            sales[name] = {str(key): row for key, row in table.to_dict(orient='index').items()}
+
+        return {
+            'generated_at': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            'customers': {
+                'count': len(self.customers_df),
+                'by_rank': {rank: {'count': int(count), 'ratio': round(count / len(self.customers_df), 4)}
+                            for rank, count in rank_counts.items()},
+            },
+            'casts': {
+                'count': len(self.casts_df),
+                'avg_hourly_rate': round(float(self.casts_df['hourly_rate'].mean()), 0),
+                'avg_rating': round(float(self.casts_df['average_rating'].mean()), 2),
+            },
+            'sales': sales,
+        }
+
+    def to_frame(self) -> pd.DataFrame:
+        """売上統計を縦持ち（dimension, key, count, total_amount, avg_amount）の表で取得"""
+        frames = []
+        for name in SALES_DIMENSIONS:
+            table = self._group_table(name)
+            table.index = table.index.astype(str)
+            frames.append(table.rename_axis('key').reset_index().assign(dimension=name))
+        frame = pd.concat(frames, ignore_index=True)
+        return frame[['dimension', 'key', 'count', 'total_amount', 'avg_amount']]
+
+    def write_json(self, path: str, report: Optional[Dict[str, Any]] = None) -> str:
+        """統計情報をJSONで保存"""
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(report or self.report(), f, ensure_ascii=False, indent=2, default=int)
+        return path
+
+    def write_parquet(self, path: str) -> str:
+        """売上統計をParquetで保存（pyarrow または fastparquet が必要）"""
+        self.to_frame().to_parquet(path, index=False)
+        return path
+
+
+def print_report(report: Dict[str, Any]):
+    """report() の結果をコンソールに表示"""
+    customers, casts, sales = report['customers'], report['casts'], report['sales']
+
+    print("\n" + "="*50)
+    print("📊 生成データの統計情報")
+    print("="*50)
+
+    print("\n👥 顧客統計:")
+    print(f"総顧客数: {customers['count']:,}名")
+    for rank, stats in customers['by_rank'].items():
+        print(f"  {rank}: {stats['count']:,}名 ({stats['ratio']*100:.1f}%)")
+
+    print("\n⭐ キャスト統計:")
+    print(f"総キャスト数: {casts['count']:,}名")
+    print(f"平均時給: ¥{casts['avg_hourly_rate']:,.0f}")
+    print(f"平均評価: {casts['avg_rating']:.2f}/5.0")
+
+    print("\n💰 売上統計:")
+    print(f"総取引数: {sales['count']:,}件")
+    print(f"総売上: ¥{sales['total_amount']:,}")
+    print(f"平均単価: ¥{sales['avg_amount']:,.0f}")
+
+    for name in ['by_service', 'by_rank']:
+        print(f"\n{SALES_DIMENSIONS[name]}売上:")
+        for key, stats in sales[name].items():
+            print(f"  {key}: {stats['count']:,}件, ¥{stats['total_amount']:,}")
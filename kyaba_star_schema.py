@@ -0,0 +1,174 @@
+# -*- coding: utf-8 -*-
+"""
+Rose Garden スタースキーマ生成
+売上・顧客・キャストの3テーブルを非正規化したファクトテーブルと、
+推奨チャート用の事前集計テーブル（キューブ）を作成する
+
+使用例:
+    python kyaba_star_schema.py            # カレントフォルダの3つのCSVから作成
+"""
+
+import os
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+# ファクトテーブルに持たせるディメンション属性
+CUSTOMER_ATTRIBUTES = ['customer_name', 'customer_rank', 'age', 'occupation_category']
+CAST_ATTRIBUTES = ['cast_name', 'cast_type', 'experience_months', 'average_rating']
+
+# 顧客ランクの表示順
+RANK_ORDER = ['VIP', '優良', '一般', '新規']
+
+WEEKDAY_LABELS = ['月', '火', '水', '木', '金', '土', '日']
+
+
+def _to_category(series: pd.Series) -> pd.Series:
+    """文字列列をカテゴリ型に変換（既にカテゴリ型ならそのまま）"""
+    if isinstance(series.dtype, pd.CategoricalDtype) or pd.api.types.is_numeric_dtype(series):
+        return series
+    return series.astype('category')
+
+
+def lookup_attributes(dimension: pd.DataFrame, key: str, keys: pd.Series,
+                      columns: List[str]) -> Dict[str, pd.Series]:
+    """
+    ディメンションの属性をキーで引いてファクト行に展開する（ハッシュ結合）
+
+    キー列のハッシュ索引で行位置を一度だけ求め、各属性は位置で取り出す。
+    文字列属性はカテゴリのコードだけを取り出すので object 型の結合は発生しない。
+
+    Args:
+        dimension (pd.DataFrame): ディメンションテーブル（キーは一意）
+        key (str): キー列名
+        keys (pd.Series): ファクト側のキー
+        columns (List[str]): 取り出す属性列
+
+    Returns:
+        Dict[str, pd.Series]: 列名 -> ファクト行に揃えた属性
+    """
+    index = pd.Index(dimension[key])
+    if not index.is_unique:
+        raise ValueError(f"{key} が一意ではありません")
+
+    positions = index.get_indexer(keys.to_numpy())
+    missing = positions < 0
+    safe_positions = np.where(missing, 0, positions)
+
+    result = {}
+    for col in columns:
+        if col not in dimension.columns:
+            continue
+        values = _to_category(dimension[col])
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            codes = values.cat.codes.to_numpy()[safe_positions]
+            codes[missing] = -1
+            taken = pd.Categorical.from_codes(codes, dtype=values.dtype)
+        else:
+            taken = values.to_numpy()[safe_positions]
+            if missing.any():
+                taken = np.where(missing, np.nan, taken.astype(float))
+        result[col] = pd.Series(taken, index=keys.index)
+    return result
+
+
+def build_fact_table(sales_df: pd.DataFrame, customers_df: pd.DataFrame,
+                     casts_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    売上に顧客・キャスト属性と日時の派生列を付与したファクトテーブルを作成
+
+    Args:
+        sales_df (pd.DataFrame): 売上データ
+        customers_df (pd.DataFrame): 顧客データ
+        casts_df (pd.DataFrame): キャストデータ
+
+    Returns:
+        pd.DataFrame: 非正規化ファクトテーブル
+    """
+    fact = sales_df.copy()
+    for col in ['service_type', 'payment_method']:
+        if col in fact.columns:
+            fact[col] = _to_category(fact[col])
+
+    fact = fact.assign(**lookup_attributes(customers_df, 'customer_id', fact['customer_id'],
+                                           CUSTOMER_ATTRIBUTES))
+    fact = fact.assign(**lookup_attributes(casts_df, 'cast_id', fact['cast_id'], CAST_ATTRIBUTES))
+    if 'customer_rank' in fact.columns:
+        fact['customer_rank'] = fact['customer_rank'].cat.set_categories(RANK_ORDER, ordered=True)
+
+    # 日時の派生列（チャートの軸として使う）
+    sale_date = pd.to_datetime(fact['sale_date'], format='%Y-%m-%d')
+    fact['sale_month'] = sale_date.dt.strftime('%Y-%m').astype('category')
+    fact['sale_weekday'] = pd.Categorical.from_codes(sale_date.dt.dayofweek.to_numpy(),
+                                                     categories=WEEKDAY_LABELS, ordered=True)
+    fact['sale_hour'] = fact['sale_time'].astype(str).str.slice(0, 2).astype(np.int8)
+
+    return fact
+
+
+def build_cubes(fact: pd.DataFrame) -> Dict[str, pd.DataFrame]:
+    """
+    推奨チャート用の事前集計テーブルを作成
+
+    Returns:
+        Dict[str, pd.DataFrame]:
+            month_rank   : 月 × 顧客ランク（月別売上推移・顧客ランク別売上）
+            hour_weekday : 時間帯 × 曜日（時間帯別来店数ヒートマップ）
+            cast_month   : キャスト × 月（キャスト別パフォーマンス）
+    """
+    source = fact.assign(nominated=(fact['nomination_fee'] > 0).astype(np.int32))
+
+    def aggregate(keys: List[str]) -> pd.DataFrame:
+        grouped = source.groupby(keys, observed=True, sort=True)
+        cube = grouped.agg(
+            sales_count=('sale_id', 'size'),
+            total_amount=('total_amount', 'sum'),
+            avg_amount=('total_amount', 'mean'),
+            customers=('customer_id', 'nunique'),
+            nominations=('nominated', 'sum'),
+        ).reset_index()
+        cube['avg_amount'] = cube['avg_amount'].round(0)
+        return cube
+
+    return {
+        'month_rank': aggregate(['sale_month', 'customer_rank']),
+        'hour_weekday': aggregate(['sale_hour', 'sale_weekday']),
+        'cast_month': aggregate(['cast_id', 'cast_name', 'sale_month']),
+    }
+
+
+def write_star_schema(fact: pd.DataFrame, cubes: Dict[str, pd.DataFrame],
+                      output_dir: str = '.', prefix: str = 'rose_garden') -> List[str]:
+    """
+    ファクトテーブルとキューブをCSVで保存
+
+    Returns:
+        List[str]: 保存したファイルパス
+    """
+    paths = []
+    fact_path = os.path.join(output_dir, f"{prefix}_sales_fact.csv")
+    fact.to_csv(fact_path, index=False, encoding='utf-8-sig')
+    paths.append(fact_path)
+    for name, cube in cubes.items():
+        path = os.path.join(output_dir, f"{prefix}_cube_{name}.csv")
+        cube.to_csv(path, index=False, encoding='utf-8-sig')
+        paths.append(path)
+    return paths
+
+
+def main():
+    """カレントフォルダの3つのCSVからスタースキーマを作成"""
+    print("⭐ スタースキーマを作成中...")
+    sales_df = pd.read_csv('rose_garden_sales.csv', encoding='utf-8-sig')
+    customers_df = pd.read_csv('rose_garden_customers.csv', encoding='utf-8-sig')
+    casts_df = pd.read_csv('rose_garden_casts.csv', encoding='utf-8-sig')
+
+    fact = build_fact_table(sales_df, customers_df, casts_df)
+    cubes = build_cubes(fact)
+    for path in write_star_schema(fact, cubes):
+        print(f"📄 {path}: {os.path.getsize(path):,} bytes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+遅延インポートモジュール
+Description: pandas / numpy などの重いライブラリを、最初に属性が使われた時点で読み込む代理オブジェクト。
+             GUIやライブラリの起動時に読み込みを済ませる必要がなくなるため、ウィンドウがすぐ表示される。
+             preload() でウィンドウ表示後にバックグラウンドで先に読み込んでおくこともできる
+
+使用例:
+    from lazy_imports import lazy_import
+    pd = lazy_import('pandas')      # この時点では pandas は読み込まれない
+    df = pd.DataFrame(...)          # 最初の属性アクセスで読み込む
+
+注意:
+    型注釈に pd.DataFrame などを使うモジュールでは `from __future__ import annotations` を付け、
+    関数定義の時点で読み込みが起きないようにすること。
+"""
+
+import importlib
+import sys
+import threading
+from types import ModuleType
+from typing import Dict
+
+_import_lock = threading.Lock()
+_proxies: Dict[str, 'LazyModule'] = {}
+
+
+class LazyModule:
+    """最初の属性アクセスで本物のモジュールを読み込む代理オブジェクト"""
+
+    def __init__(self, name: str):
+        self.__dict__['_name'] = name
+        self.__dict__['_module'] = None
+
+    def _load(self) -> ModuleType:
+        module = self.__dict__['_module']
+        if module is None:
+            # GUIの読み込みスレッドとメインスレッドから同時に使われても1回だけ読み込む
+            with _import_lock:
+                module = self.__dict__['_module']
+                if module is None:
+                    module = importlib.import_module(self.__dict__['_name'])
+                    self.__dict__['_module'] = module
+        return module
+
+    def __getattr__(self, attr: str):
+        return getattr(self._load(), attr)
+
+    def __setattr__(self, attr: str, value):
+        setattr(self._load(), attr, value)
+
+    def __dir__(self):
+        return dir(self._load())
+
+    def __repr__(self) -> str:
+        state = 'loaded' if self.__dict__['_module'] is not None else 'not loaded'
+        return f"<lazy module '{self.__dict__['_name']}' ({state})>"
+
+
+def lazy_import(name: str) -> LazyModule:
+    """モジュールの代理オブジェクトを返す（同じ名前には同じ代理を返す）"""
+    with _import_lock:
+        if name not in _proxies:
+            _proxies[name] = LazyModule(name)
+        return _proxies[name]
+
+
+def is_loaded(name: str) -> bool:
+    """モジュールが既に読み込まれているか"""
+    return name in sys.modules
+
+
+def preload(*names: str) -> threading.Thread:
+    """
+    モジュールをバックグラウンドスレッドで先に読み込む
+
+    GUIのウィンドウを表示した後に呼ぶと、ユーザーがファイルを選ぶまでの間に読み込みが終わる。
+    """
+    def worker():
+        for name in names:
+            try:
+                lazy_import(name)._load()
+            except ImportError:
+                pass
+
+    thread = threading.Thread(target=worker, daemon=True)
+    thread.start()
+    return thread
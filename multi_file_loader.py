@@ -0,0 +1,367 @@
+"""
+複数ファイル一括読み込みモジュール
+Description: フォルダまたはglobで指定した店舗別・日別のExcel/CSVを並列に読み込み、
+             列と型を揃えて1つのDataFrameに結合する（各行に読み込み元のファイル名を付ける）。
+             CSVはスレッドプール（I/O待ちが中心）、xlsxはプロセスプール（解析がCPU処理）で読む。
+             lazy=True の場合は結合せず、1ファイルずつ型を揃えて返す LazyDataset を返す
+
+使用例:
+    df = load_files('exports/2025-01/')                   # フォルダ内の *.csv, *.xlsx, *.xls
+    df = load_files('exports/2025-01/store_*.csv')        # globで指定
+    dataset = load_files('exports/2025-01/', lazy=True)   # 1ファイルずつ処理する場合
+    for frame in dataset.iter_frames():
+        ...
+"""
+
+from __future__ import annotations
+
+import argparse
+import glob
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Union
+
+from lazy_imports import lazy_import
+
+np = lazy_import('numpy')
+pd = lazy_import('pandas')
+
+CSV_ENCODINGS = ['utf-8', 'shift_jis', 'cp932', 'iso-2022-jp']
+DEFAULT_PATTERNS = ('*.csv', '*.xlsx', '*.xls')
+EXCEL_EXTENSIONS = ('.xlsx', '.xls')
+SOURCE_COLUMN = 'source_file'
+SCHEMA_SAMPLE_ROWS = 1_000
+
+
+# =========================================
+# 1. ファイルの列挙と読み込み
+# =========================================
+
+def discover_files(source: Union[str, Sequence[str]], patterns: Sequence[str] = DEFAULT_PATTERNS,
+                   recursive: bool = False) -> List[str]:
+    """
+    読み込むファイルを列挙（ファイル名順）
+
+    Args:
+        source: フォルダ、globパターン、またはファイルパスのリスト
+        patterns: フォルダ指定時に対象とするパターン
+        recursive (bool): フォルダ指定時にサブフォルダも探すか
+
+    Returns:
+        List[str]: ファイルパス
+    """
+    if not isinstance(source, str):
+        paths = list(source)
+    elif os.path.isdir(source):
+        prefix = os.path.join(source, '**') if recursive else source
+        paths = [path for pattern in patterns
+                 for path in glob.glob(os.path.join(prefix, pattern), recursive=recursive)]
+    else:
+        paths = glob.glob(source, recursive=recursive)
+
+    # Excelの一時ファイル（~$xxx.xlsx）は除く
+    paths = sorted({os.path.normpath(path) for path in paths
+                    if os.path.isfile(path) and not os.path.basename(path).startswith('~$')})
+    if not paths:
+        raise FileNotFoundError(f"読み込むファイルが見つかりません: {source}")
+    return paths
+
+
+def read_table(path: str, nrows: Optional[int] = None) -> pd.DataFrame:
+    """
+    1ファイルを読み込む（CSVは文字エンコーディングを自動判定）
+
+    プロセスプールからも呼べるようモジュールの関数にしている。
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension in EXCEL_EXTENSIONS:
+        return pd.read_excel(path, nrows=nrows)
+    if extension != '.csv':
+        raise ValueError(f"サポートされていないファイル形式: {extension}")
+
+    for encoding in CSV_ENCODINGS:
+        try:
+            return pd.read_csv(path, encoding=encoding, nrows=nrows)
+        except UnicodeDecodeError:
+            continue
+    return pd.read_csv(path, encoding='utf-8', encoding_errors='ignore', nrows=nrows)
+
+
+def _source_names(paths: List[str]) -> List[str]:
+    """source_file 列に入れる名前（共通の親フォルダからの相対パス）"""
+    if len(paths) == 1:
+        return [os.path.basename(paths[0])]
+    base = os.path.commonpath([os.path.dirname(os.path.abspath(path)) for path in paths])
+    return [os.path.relpath(os.path.abspath(path), base) for path in paths]
+
+
+def _read_all(paths: List[str], max_workers: Optional[int] = None, nrows: Optional[int] = None,
+              use_processes: bool = True) -> List[pd.DataFrame]:
+    """
+    すべてのファイルを並列に読み込む（結果はファイル順）
+
+    CSVはスレッドプール、xlsx/xlsはプロセスプールに投入し、両方を同時に進める。
+    """
+    max_workers = max_workers or os.cpu_count() or 1
+    excel = [path.lower().endswith(EXCEL_EXTENSIONS) for path in paths]
+
+    executors: List[Executor] = []
+    try:
+        threads = ThreadPoolExecutor(max_workers=min(max_workers * 2, 32))
+        executors.append(threads)
+        processes: Executor = threads
+        if use_processes and sum(excel) > 1 and max_workers > 1:
+            processes = ProcessPoolExecutor(max_workers=min(max_workers, sum(excel)))
+            executors.append(processes)
+
+        futures = [(processes if is_excel else threads).submit(read_table, path, nrows)
+                   for path, is_excel in zip(paths, excel)]
+        frames = []
+        for path, future in zip(paths, futures):
+            try:
+                frames.append(future.result())
+            except Exception as e:
+                raise Exception(f"ファイル読み込みエラー: {os.path.basename(path)}: {str(e)}")
+        return frames
+    finally:
+        for executor in executors:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+
+# =========================================
+# 2. 列と型の統一
+# =========================================
+
+def _common_dtype(dtypes: List[Any]) -> Any:
+    """複数ファイルでの列の型を1つに決める（数値同士は数値のまま、それ以外は object）"""
+    unique = list(dict.fromkeys(dtypes))
+    if len(unique) == 1:
+        return unique[0]
+    if all(pd.api.types.is_numeric_dtype(dtype) and not pd.api.types.is_bool_dtype(dtype) for dtype in unique):
+        return np.result_type(*unique)
+    return np.dtype(object)
+
+
+def reconcile_schemas(schemas: List[pd.Series]) -> Dict[str, Any]:
+    """
+    各ファイルの dtypes から共通のスキーマを作る
+
+    列は最初に現れた順に並べる。一部のファイルにしかない列は欠損を含むため、
+    整数・真偽値の列は float64 / object にする。
+
+    Args:
+        schemas (List[pd.Series]): 各ファイルの DataFrame.dtypes
+
+    Returns:
+        Dict[str, Any]: 列名 -> 型
+    """
+    columns: Dict[str, List[Any]] = {}
+    for dtypes in schemas:
+        for col, dtype in dtypes.items():
+            columns.setdefault(col, []).append(dtype)
+
+    schema = {}
+    for col, dtypes in columns.items():
+        dtype = _common_dtype(dtypes)
+        if len(dtypes) < len(schemas):
+            if pd.api.types.is_integer_dtype(dtype):
+                dtype = np.dtype(np.float64)
+            elif pd.api.types.is_bool_dtype(dtype):
+                dtype = np.dtype(object)
+        schema[col] = dtype
+    return schema
+
+
+def _to_boolean(series: pd.Series) -> pd.Series:
+    """
+    真偽値の列に変換（astype(bool) は欠損や任意の文字列を True にするため使わない）
+
+    欠損を含む場合は nullable の boolean 型にする。True / False 以外の値がある場合は ValueError。
+    """
+    if pd.api.types.is_bool_dtype(series):
+        return series
+    values = series.dropna()
+    if not all(isinstance(value, (bool, np.bool_)) for value in values.unique()):
+        raise ValueError(f"真偽値以外の値があります: {series.name}")
+    return series.astype('boolean' if len(values) < len(series) else bool)
+
+
+def conform_frame(frame: pd.DataFrame, schema: Dict[str, Any], widen: bool = False) -> pd.DataFrame:
+    """
+    DataFrameを共通のスキーマ（列の順序と型）に揃える（型が同じ列はコピーしない）
+
+    Args:
+        frame (pd.DataFrame): 元データ
+        schema (Dict[str, Any]): 列名 -> 型
+        widen (bool): 型を変換できない列（数値と決めた列に文字列があるなど）を object にし、
+                      schema もその場で object に書き換える（False の場合は例外）
+    """
+    columns = {}
+    for col, dtype in schema.items():
+        if col not in frame.columns:
+            columns[col] = pd.Series(np.nan if dtype != object else None, index=frame.index, dtype=dtype)
+        elif frame[col].dtype != dtype:
+            try:
+                if pd.api.types.is_bool_dtype(dtype):
+                    converted = _to_boolean(frame[col])
+                    if isinstance(dtype, pd.BooleanDtype) or converted.dtype != bool:
+                        converted = converted.astype('boolean')
+                        if widen:
+                            schema[col] = pd.BooleanDtype()
+                    columns[col] = converted
+                else:
+                    columns[col] = frame[col].astype(dtype)
+            except (ValueError, TypeError):
+                if not widen:
+                    raise
+                schema[col] = np.dtype(object)
+                columns[col] = frame[col].astype(object)
+        else:
+            columns[col] = frame[col]
+    return pd.DataFrame(columns, index=frame.index)
+
+
+def _source_column(names: List[str], lengths: List[int]) -> pd.Categorical:
+    """読み込み元の列（ファイル名はカテゴリとして1回だけ保持する）"""
+    codes = np.repeat(np.arange(len(names), dtype=np.int32), lengths)
+    return pd.Categorical.from_codes(codes, categories=names)
+
+
+# =========================================
+# 3. 読み込み
+# =========================================
+
+class LazyDataset:
+    """
+    複数ファイルを結合せずに扱うデータセット
+
+    スキーマは各ファイルの先頭 SCHEMA_SAMPLE_ROWS 行から決め、iter_frames() で
+    1ファイルずつ（次のファイルを先読みしながら）共通のスキーマに揃えて返す。
+    先頭行だけでは欠損の有無が分からないため、整数列は float64、真偽値の列は nullable の boolean として扱う。
+    先頭行より後に数値にできない値がある列は、そのファイルから object に広げる（schema も更新される）。
+    """
+
+    def __init__(self, paths: List[str], max_workers: Optional[int] = None,
+                 source_column: Optional[str] = SOURCE_COLUMN):
+        self.paths = paths
+        self.names = _source_names(paths)
+        self.max_workers = max_workers
+        self.source_column = source_column
+        samples = _read_all(paths, max_workers, nrows=SCHEMA_SAMPLE_ROWS)
+        self.schema = {col: self._nullable(dtype)
+                       for col, dtype in reconcile_schemas([sample.dtypes for sample in samples]).items()}
+
+    @staticmethod
+    def _nullable(dtype: Any) -> Any:
+        """先頭行になかった欠損も表せる型"""
+        if pd.api.types.is_bool_dtype(dtype):
+            return pd.BooleanDtype()
+        if pd.api.types.is_integer_dtype(dtype):
+            return np.dtype(np.float64)
+        return dtype
+
+    def __len__(self) -> int:
+        return len(self.paths)
+
+    @property
+    def columns(self) -> List[str]:
+        return list(self.schema) + ([self.source_column] if self.source_column else [])
+
+    def _conform(self, frame: pd.DataFrame, index: int) -> pd.DataFrame:
+        widened = [col for col, dtype in self.schema.items() if dtype != object]
+        frame = conform_frame(frame, self.schema, widen=True)
+        widened = [col for col in widened if self.schema[col] == object]
+        if widened:
+            print(f"⚠️ {self.names[index]}: 列 {widened} に数値以外の値があるため object 型として扱います")
+        if self.source_column:
+            frame[self.source_column] = pd.Categorical.from_codes(
+                np.full(len(frame), index, dtype=np.int32), categories=self.names)
+        return frame
+
+    def iter_frames(self, prefetch: int = 2) -> Iterator[pd.DataFrame]:
+        """1ファイルずつ読み込んで返す（prefetch 個先まで並行して読み込む）"""
+        with ThreadPoolExecutor(max_workers=max(prefetch, 1)) as executor:
+            futures = [executor.submit(read_table, path) for path in self.paths[:prefetch]]
+            for i in range(len(self.paths)):
+                frame = futures[i].result()
+                if i + prefetch < len(self.paths):
+                    futures.append(executor.submit(read_table, self.paths[i + prefetch]))
+                futures[i] = None
+                yield self._conform(frame, i)
+
+    def to_frame(self) -> pd.DataFrame:
+        """すべてのファイルを読み込んで結合"""
+        return combine_frames(_read_all(self.paths, self.max_workers), self.names, self.source_column)
+
+
+def combine_frames(frames: List[pd.DataFrame], names: List[str],
+                   source_column: Optional[str] = SOURCE_COLUMN) -> pd.DataFrame:
+    """
+    読み込んだDataFrameを共通のスキーマに揃えて結合
+
+    Args:
+        frames (List[pd.DataFrame]): 各ファイルのデータ
+        names (List[str]): 各ファイルの名前
+        source_column (Optional[str]): 読み込み元を入れる列名（None=付けない）
+
+    Returns:
+        pd.DataFrame: 結合したデータ
+    """
+    schema = reconcile_schemas([frame.dtypes for frame in frames])
+    combined = pd.concat([conform_frame(frame, schema) for frame in frames], ignore_index=True, copy=False)
+    if source_column:
+        if source_column in combined.columns:
+            raise ValueError(f"列名 '{source_column}' は既にデータに含まれています")
+        combined[source_column] = _source_column(names, [len(frame) for frame in frames])
+    return combined
+
+
+def load_files(source: Union[str, Sequence[str]], patterns: Sequence[str] = DEFAULT_PATTERNS,
+               recursive: bool = False, max_workers: Optional[int] = None,
+               source_column: Optional[str] = SOURCE_COLUMN,
+               lazy: bool = False) -> Union[pd.DataFrame, LazyDataset]:
+    """
+    複数のExcel/CSVを並列に読み込んで1つにまとめる
+
+    Args:
+        source: フォルダ、globパターン、またはファイルパスのリスト
+        patterns: フォルダ指定時に対象とするパターン
+        recursive (bool): サブフォルダも探すか
+        max_workers (Optional[int]): 並列数（None=CPUコア数）
+        source_column (Optional[str]): 読み込み元を入れる列名（None=付けない）
+        lazy (bool): True の場合は結合せず LazyDataset を返す
+
+    Returns:
+        Union[pd.DataFrame, LazyDataset]: 結合したデータ
+    """
+    paths = discover_files(source, patterns, recursive)
+    if lazy:
+        return LazyDataset(paths, max_workers, source_column)
+    return combine_frames(_read_all(paths, max_workers), _source_names(paths), source_column)
+
+
+def main():
+    """メイン関数"""
+    parser = argparse.ArgumentParser(description='複数のExcel/CSVを並列に読み込んで結合')
+    parser.add_argument('source', help='フォルダまたはglobパターン')
+    parser.add_argument('output', help='出力ファイル（.csv / .parquet）')
+    parser.add_argument('--recursive', action='store_true', help='サブフォルダも探す')
+    parser.add_argument('--workers', type=int, default=None, help='並列数（省略時はCPUコア数）')
+    args = parser.parse_args()
+
+    paths = discover_files(args.source, recursive=args.recursive)
+    print(f"📂 {len(paths)}ファイルを読み込みます")
+    start = time.perf_counter()
+    combined = load_files(paths, max_workers=args.workers)
+    print(f"✅ 読み込み完了: {combined.shape[0]:,}行 × {combined.shape[1]}列 ({time.perf_counter() - start:.1f}秒)")
+
+    if args.output.lower().endswith('.parquet'):
+        combined.to_parquet(args.output, index=False)
+    else:
+        combined.to_csv(args.output, index=False, encoding='utf-8-sig')
+    print(f"💾 保存しました: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,285 @@
+# -*- coding: utf-8 -*-
+"""
+オンライン学習モジュール
+Description: 正規化の統計値とモデルを、新しい日の売上だけで partial_fit により更新する。
+             更新前に直近のデータ（新しい日を含む数日分）の平均・分散を保存済みの統計値と比べてドリフトを検出し、
+             状態は pipeline_artifacts のバージョンとして保存する。
+             日次の再学習コストは全履歴ではなく新しいデータの量に比例する
+
+使用例:
+    # 初回: 過去の売上で学習
+    python online_learning.py init models/sales_online rose_garden_sales.csv
+    # 毎日: 新しい日の売上だけで更新
+    python online_learning.py update models/sales_online sales_2025-01-31.csv
+"""
+
+import argparse
+import os
+from datetime import datetime
+from typing import Any, Dict, List
+
+import numpy as np
+import pandas as pd
+
+from pipeline_artifacts import load_pipeline, save_pipeline
+from streaming_scaler import ColumnStatistics
+
+DEFAULT_Z_THRESHOLD = 3.0
+DEFAULT_VARIANCE_RATIO = 4.0
+DEFAULT_DRIFT_WINDOW = 7  # ドリフト判定に使う直近の行数（日次更新では日数）
+STATS_KEYS = ['count', 'mean', 'm2', 'min', 'max']
+
+# partial_fit に対応したモデル（モデル名 -> sklearnのクラス名）
+ONLINE_MODELS = {
+    'sgd': 'SGDRegressor',
+    'passive_aggressive': 'PassiveAggressiveRegressor',
+    'mlp': 'MLPRegressor',
+}
+
+
+def make_online_model(name: str = 'sgd', **params):
+    """partial_fit に対応したモデルを作成"""
+    if name == 'sgd':
+        from sklearn.linear_model import SGDRegressor
+        return SGDRegressor(**{'learning_rate': 'invscaling', 'eta0': 0.01, 'random_state': 42, **params})
+    if name == 'passive_aggressive':
+        from sklearn.linear_model import PassiveAggressiveRegressor
+        return PassiveAggressiveRegressor(**{'random_state': 42, **params})
+    if name == 'mlp':
+        from sklearn.neural_network import MLPRegressor
+        return MLPRegressor(**{'hidden_layer_sizes': (32,), 'random_state': 42, **params})
+    raise ValueError(f"サポートされていないモデル: {name}（{list(ONLINE_MODELS)}）")
+
+
+def make_online_scaler(method: str = 'standard'):
+    """partial_fit に対応したスケーラーを作成"""
+    if method == 'standard':
+        from sklearn.preprocessing import StandardScaler
+        return StandardScaler()
+    if method == 'minmax':
+        from sklearn.preprocessing import MinMaxScaler
+        return MinMaxScaler()
+    raise ValueError(f"オンライン更新に対応していない正規化方法: {method}")
+
+
+def check_drift(stored: ColumnStatistics, values: np.ndarray, columns: List[str],
+                z_threshold: float = DEFAULT_Z_THRESHOLD,
+                variance_ratio: float = DEFAULT_VARIANCE_RATIO) -> pd.DataFrame:
+    """
+    新しいデータの平均・分散を保存済みの統計値と比較
+
+    平均のずれは保存済みの標準偏差で割った値（z）、分散は比率で判定する。
+
+    Args:
+        stored (ColumnStatistics): これまでの統計値
+        values (np.ndarray): 新しいデータ（行 × 列）
+        columns (List[str]): 列名
+        z_threshold (float): 平均のずれの上限（標準偏差の何倍か）
+        variance_ratio (float): 分散の比率の上限（新/旧 と 旧/新 のどちらか）
+
+    Returns:
+        pd.DataFrame: 列ごとの比較結果（drift=True の列がドリフト）
+    """
+    new = ColumnStatistics(len(columns))
+    new.update(values)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        stored_std = np.where(stored.std > 0, stored.std, np.nan)
+        z_shift = np.abs(new.mean - stored.mean) / stored_std
+        ratio = new.variance / np.where(stored.variance > 0, stored.variance, np.nan)
+
+    report = pd.DataFrame({
+        'stored_mean': stored.mean,
+        'new_mean': new.mean,
+        'z_shift': z_shift,
+        'stored_std': stored.std,
+        'new_std': new.std,
+        'variance_ratio': ratio,
+    }, index=pd.Index(columns, name='column'))
+    report['drift'] = ((report['z_shift'] > z_threshold)
+                       | (report['variance_ratio'] > variance_ratio)
+                       | (report['variance_ratio'] < 1 / variance_ratio))
+    return report
+
+
+class OnlineForecaster:
+    """
+    新しいデータで逐次更新する予測モデル
+
+    update() ごとに「更新前のモデルで予測 → 誤差を記録 → ドリフト判定 → スケーラー・モデルを更新」
+    の順に処理する（Prequential評価）。
+    日次更新では新しいデータが1行しかないため、ドリフト判定は新しい行を含む直近 drift_window 行
+    （特徴量と目的変数）を保存済みの統計値と比べる。
+    """
+
+    def __init__(self, feature_columns: List[str], target_column: str, model: Any = None, scaler: Any = None,
+                 z_threshold: float = DEFAULT_Z_THRESHOLD, variance_ratio: float = DEFAULT_VARIANCE_RATIO,
+                 drift_window: int = DEFAULT_DRIFT_WINDOW):
+        """
+        初期化
+
+        Args:
+            feature_columns (List[str]): 特徴量の列名
+            target_column (str): 目的変数の列名
+            model (Any): partial_fit に対応したモデル（None=SGDRegressor）
+            scaler (Any): partial_fit に対応したスケーラー（None=StandardScaler）
+            z_threshold (float): ドリフト判定の平均のずれの上限
+            variance_ratio (float): ドリフト判定の分散の比率の上限
+            drift_window (int): ドリフト判定に使う直近の行数
+        """
+        self.feature_columns = list(feature_columns)
+        self.target_column = target_column
+        self.model = model if model is not None else make_online_model()
+        self.scaler = scaler if scaler is not None else make_online_scaler()
+        for name, obj in [('model', self.model), ('scaler', self.scaler)]:
+            if not hasattr(obj, 'partial_fit'):
+                raise ValueError(f"{name} が partial_fit に対応していません: {type(obj).__name__}")
+        self.z_threshold = z_threshold
+        self.variance_ratio = variance_ratio
+        self.drift_window = drift_window
+        self.stats = ColumnStatistics(len(self.feature_columns))
+        self.target_stats = ColumnStatistics(1)
+        self.recent = np.empty((0, len(self.feature_columns) + 1))  # 直近の行（特徴量 + 目的変数）
+        self.update_log: List[Dict[str, Any]] = []
+
+    @property
+    def is_fitted(self) -> bool:
+        return bool(self.stats.count.max() > 0)
+
+    def _arrays(self, frame: pd.DataFrame):
+        X = frame[self.feature_columns].to_numpy(dtype=np.float64, na_value=np.nan)
+        y = frame[self.target_column].to_numpy(dtype=np.float64)
+        valid = ~np.isnan(X).any(axis=1) & ~np.isnan(y)
+        return X[valid], y[valid]
+
+    def _drift_reference(self) -> ColumnStatistics:
+        """特徴量と目的変数をまとめた保存済みの統計値"""
+        reference = ColumnStatistics(len(self.feature_columns) + 1)
+        for key in STATS_KEYS:
+            setattr(reference, key, np.concatenate([getattr(self.stats, key), getattr(self.target_stats, key)]))
+        return reference
+
+    def predict(self, frame: pd.DataFrame) -> np.ndarray:
+        """予測"""
+        X = frame[self.feature_columns].to_numpy(dtype=np.float64, na_value=np.nan)
+        return self.model.predict(self.scaler.transform(X))
+
+    def update(self, frame: pd.DataFrame, n_epochs: int = 1, label: str = None) -> Dict[str, Any]:
+        """
+        新しいデータでスケーラーとモデルを更新
+
+        Args:
+            frame (pd.DataFrame): 新しいデータ（特徴量と目的変数）
+            n_epochs (int): partial_fit を繰り返す回数（初回学習では増やす）
+            label (str): 更新履歴に記録する名前（日付など）
+
+        Returns:
+            Dict[str, Any]: 更新結果（行数・更新前のRMSE・ドリフトした列）
+        """
+        X, y = self._arrays(frame)
+        entry = {'label': label, 'updated_at': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                 'rows': int(len(X)), 'rmse_before': None, 'drift_columns': []}
+        if len(X) == 0:
+            self.update_log.append(entry)
+            return entry
+
+        rows = np.column_stack([X, y])
+        window = np.vstack([self.recent, rows])[-max(self.drift_window, len(rows)):]
+        if self.is_fitted:
+            entry['rmse_before'] = float(np.sqrt(np.mean((self.model.predict(self.scaler.transform(X)) - y) ** 2)))
+            if len(window) > 1:
+                drift = check_drift(self._drift_reference(), window, self.feature_columns + [self.target_column],
+                                    self.z_threshold, self.variance_ratio)
+                entry['drift_columns'] = drift.index[drift['drift']].tolist()
+                if entry['drift_columns']:
+                    print(f"⚠️ ドリフトを検出: {entry['drift_columns']}")
+
+        self.scaler.partial_fit(X)
+        X_scaled = self.scaler.transform(X)
+        for _ in range(n_epochs):
+            self.model.partial_fit(X_scaled, y)
+        self.stats.update(X)
+        self.target_stats.update(y.reshape(-1, 1))
+        self.recent = window[-self.drift_window:]
+
+        self.update_log.append(entry)
+        return entry
+
+    def save(self, path: str, version: str = None) -> str:
+        """状態を pipeline_artifacts の新しいバージョンとして保存"""
+        state = {
+            'online': True,
+            'z_threshold': self.z_threshold,
+            'variance_ratio': self.variance_ratio,
+            'drift_window': self.drift_window,
+            'stats': {key: getattr(self.stats, key).tolist() for key in STATS_KEYS},
+            'target_stats': {key: getattr(self.target_stats, key).tolist() for key in STATS_KEYS},
+            'recent': self.recent.tolist(),
+            'update_log': self.update_log,
+        }
+        return save_pipeline(path, self.model, self.scaler, feature_columns=self.feature_columns,
+                             feature_dtypes={col: 'float64' for col in self.feature_columns},
+                             version=version, target_column=self.target_column, extra_metadata=state)
+
+    @classmethod
+    def load(cls, path: str, version: str = None) -> 'OnlineForecaster':
+        """save() で保存した状態を読み込む（更新できるようメモリマップは使わない）"""
+        artifact = load_pipeline(path, version, mmap_mode=None)
+        state = artifact.metadata['extra']
+        if not state.get('online'):
+            raise ValueError(f"オンライン学習の状態ではありません: {artifact.version_dir}")
+
+        forecaster = cls(artifact.feature_columns, artifact.metadata['target_column'], artifact.model,
+                         artifact.scaler, state['z_threshold'], state['variance_ratio'],
+                         state.get('drift_window', DEFAULT_DRIFT_WINDOW))
+        for key, values in state['stats'].items():
+            setattr(forecaster.stats, key, np.asarray(values, dtype=float))
+        # 目的変数の統計値・直近の行がない古い状態では、次の更新から貯める
+        for key, values in state.get('target_stats', {}).items():
+            setattr(forecaster.target_stats, key, np.asarray(values, dtype=float))
+        if state.get('recent'):
+            forecaster.recent = np.asarray(state['recent'], dtype=float)
+        forecaster.update_log = state['update_log']
+        return forecaster
+
+
+def main():
+    """メイン関数"""
+    parser = argparse.ArgumentParser(description='売上予測モデルのオンライン更新')
+    parser.add_argument('mode', choices=['init', 'update'])
+    parser.add_argument('artifact', help='状態の保存先ディレクトリ')
+    parser.add_argument('sales', help='売上CSV（init: 過去の売上, update: 新しい日の売上）')
+    parser.add_argument('--customers', default='rose_garden_customers.csv', help='顧客CSV')
+    parser.add_argument('--feature-state', help='特徴量の状態ファイル（省略時は <保存先>/feature_state.json）')
+    parser.add_argument('--model', choices=list(ONLINE_MODELS), default='sgd')
+    parser.add_argument('--scaler', choices=['standard', 'minmax'], default='standard')
+    parser.add_argument('--epochs', type=int, default=5, help='init時に partial_fit を繰り返す回数')
+    args = parser.parse_args()
+
+    from kyaba_features import SalesFeatureBuilder
+
+    sales_df = pd.read_csv(args.sales, encoding='utf-8-sig')
+    customers_df = pd.read_csv(args.customers, encoding='utf-8-sig')
+    feature_state = args.feature_state or os.path.join(args.artifact, 'feature_state.json')
+    builder = SalesFeatureBuilder(customers_df)
+
+    if args.mode == 'init':
+        daily = builder.fit_transform(sales_df, level='day').iloc[builder.history_days:]
+        feature_columns = [col for col in daily.columns if col != 'revenue']
+        forecaster = OnlineForecaster(feature_columns, 'revenue', make_online_model(args.model),
+                                      make_online_scaler(args.scaler))
+        entry = forecaster.update(daily, n_epochs=args.epochs, label=str(daily.index.max().date()))
+    else:
+        builder.load_state(feature_state)
+        forecaster = OnlineForecaster.load(args.artifact)
+        daily = builder.update(sales_df, level='day')
+        entry = forecaster.update(daily, label=str(daily.index.max().date()) if len(daily) else None)
+        if entry['rmse_before'] is not None:
+            print(f"📏 更新前のモデルの誤差（RMSE）: {entry['rmse_before']:,.0f}")
+
+    print(f"🔄 {entry['rows']}日分で更新しました")
+    forecaster.save(args.artifact)
+    builder.save_state(feature_state)
+
+
+if __name__ == "__main__":
+    main()
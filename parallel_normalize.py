@@ -0,0 +1,482 @@
+"""
+Dask不要の並列正規化モジュール
+Description: CSV / Parquet / .npy をチャンク（CSVはバイト範囲、Parquetは行グループ、
+             .npyはメモリマップの行範囲）に分け、プロセスプールで読み込み・正規化を並列実行する。
+             結果は入力順のまま列指向の出力先（Parquet、またはpyarrowがなければ列ごとのバイナリ）に書き込む
+
+使用例:
+    python parallel_normalize.py sales_history.csv sales_normalized.parquet --method standard
+"""
+
+import argparse
+import io
+import json
+import math
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterable, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from streaming_scaler import SCALING_METHODS, StreamingScalerFitter, apply_scaling
+
+DEFAULT_CHUNK_BYTES = 64 * 1024 * 1024
+DEFAULT_NPY_ROWS = 1_000_000
+
+# CSVの列の型は、ファイル全体に散らばったチャンクの先頭行を見本にして一度だけ決める
+SCHEMA_SAMPLE_TASKS = 16
+SCHEMA_SAMPLE_ROWS = 1_000
+
+
+# =========================================
+# 1. 入力の分割と読み込み
+# =========================================
+
+def _csv_tasks(path: str, chunk_bytes: int, encoding: str) -> Tuple[List[str], List[Tuple[int, int]]]:
+    """
+    CSVをヘッダーと行境界に揃えたバイト範囲に分割
+
+    フィールド内に改行を含むCSVには使えない（kyaba形式の売上データは該当しない）。
+    """
+    size = os.path.getsize(path)
+    with open(path, 'rb') as f:
+        header = f.readline()
+        # kyaba_sales.py の出力は BOM付きUTF-8 なのでヘッダーはBOMを除いて読む
+        header_encoding = 'utf-8-sig' if encoding.lower().replace('_', '-') in ('utf-8', 'utf8') else encoding
+        names = pd.read_csv(io.BytesIO(header), encoding=header_encoding, nrows=0).columns.tolist()
+        ranges = []
+        start = f.tell()
+        while start < size:
+            f.seek(min(start + chunk_bytes, size))
+            f.readline()  # 次の改行まで進める
+            end = min(f.tell(), size)
+            ranges.append((start, end))
+            start = end
+    return [str(name) for name in names], ranges
+
+
+def _infer_csv_dtypes(path: str, names: List[str], ranges: List[Tuple[int, int]],
+                      encoding: str) -> Dict[str, str]:
+    """
+    全チャンクで共通の列の型を決める
+
+    チャンクごとに型を推定すると、最初のチャンクでは数値（または全て欠損）で後のチャンクでは文字列の列が
+    出力の途中で型が合わなくなるため、ファイル全体から均等に選んだチャンクの先頭行を見本にする。
+    見本で一度でも数値以外が現れた列・全て欠損の列は文字列にする。
+
+    Returns:
+        Dict[str, str]: 列名 -> 'str', 'boolean', 'Int64', 'float64'
+    """
+    step = max(1, math.ceil(len(ranges) / SCHEMA_SAMPLE_TASKS))
+    samples = []
+    with open(path, 'rb') as f:
+        for start, end in ranges[::step]:
+            f.seek(start)
+            lines = []
+            while len(lines) < SCHEMA_SAMPLE_ROWS and f.tell() < end:
+                line = f.readline()
+                if not line:
+                    break
+                lines.append(line)
+            if lines:
+                samples.append(pd.read_csv(io.BytesIO(b''.join(lines)), names=names, header=None,
+                                           encoding=encoding))
+    sample = pd.concat(samples, ignore_index=True) if samples else pd.DataFrame(columns=names)
+
+    dtypes = {}
+    for col in names:
+        series = sample[col]
+        if series.isna().all() or not pd.api.types.is_numeric_dtype(series):
+            dtypes[col] = 'str'
+        elif pd.api.types.is_bool_dtype(series):
+            dtypes[col] = 'boolean'
+        elif pd.api.types.is_integer_dtype(series):
+            dtypes[col] = 'Int64'  # 後のチャンクに欠損があっても整数のまま
+        else:
+            dtypes[col] = 'float64'
+    return dtypes
+
+
+def _is_boolean(series: pd.Series) -> bool:
+    """True / False（と欠損）だけの列か"""
+    if pd.api.types.is_bool_dtype(series):
+        return True
+    values = series.dropna()
+    return series.dtype == object and all(isinstance(value, (bool, np.bool_)) for value in values.unique())
+
+
+def _conform_csv_chunk(chunk: pd.DataFrame, dtypes: Dict[str, str]) -> pd.DataFrame:
+    """
+    列を共通の型に揃える
+
+    見本と合わない値がある列は値を失わないよう、そのチャンクでは広い型にする
+    （整数→float64、数値・真偽値→文字列）。全体の型は widen_csv_dtypes() で揃える。
+    """
+    for col, dtype in dtypes.items():
+        if dtype == 'str':
+            continue
+        series = chunk[col]
+        if dtype == 'boolean':
+            chunk[col] = series.astype('boolean') if _is_boolean(series) else _as_text(series)
+            continue
+        if not pd.api.types.is_numeric_dtype(series) or pd.api.types.is_bool_dtype(series):
+            chunk[col] = _as_text(series)
+            continue
+        if dtype == 'Int64' and pd.api.types.is_float_dtype(series) and (series.dropna() % 1 != 0).any():
+            dtype = 'float64'
+        chunk[col] = series.astype(dtype)
+    return chunk
+
+
+def _as_text(series: pd.Series) -> pd.Series:
+    """欠損以外の値を文字列にする"""
+    return series.astype(object).where(series.isna(), series.astype(str))
+
+
+def _dtype_kind(series: pd.Series) -> str:
+    """_conform_csv_chunk() 後の列の型を 'str', 'boolean', 'Int64', 'float64' で返す"""
+    dtype = str(series.dtype)
+    return dtype if dtype in ('boolean', 'Int64', 'float64') else 'str'
+
+
+def _wider_dtype(a: str, b: str) -> str:
+    """2つの型の両方の値を表せる型"""
+    if a == b:
+        return a
+    if {a, b} <= {'Int64', 'float64'}:
+        return 'float64'
+    return 'str'
+
+
+def widen_csv_dtypes(source: Dict[str, Any], observed: Iterable[Dict[str, str]]):
+    """チャンクごとに実際に読めた型で source['dtypes'] を広げる（見本に現れなかった値に合わせる）"""
+    dtypes = dict(source['dtypes'])
+    for chunk_dtypes in observed:
+        for col, dtype in chunk_dtypes.items():
+            dtypes[col] = _wider_dtype(dtypes[col], dtype)
+    widened = {col: dtype for col, dtype in dtypes.items() if dtype != source['dtypes'][col]}
+    if widened:
+        print(f"⚠️ 見本の行と型が異なる値があるため列の型を広げました: {widened}")
+    source['dtypes'] = dtypes
+
+
+def _read_task(source: Dict[str, Any], task: Any) -> pd.DataFrame:
+    """ワーカー内で1チャンクを読み込む"""
+    kind, path = source['kind'], source['path']
+    if kind == 'csv':
+        start, end = task
+        with open(path, 'rb') as f:
+            f.seek(start)
+            data = f.read(end - start)
+        dtypes = source['dtypes']
+        read_dtypes = {col: str for col, dtype in dtypes.items() if dtype == 'str'}
+        chunk = pd.read_csv(io.BytesIO(data), names=source['names'], header=None, encoding=source['encoding'],
+                            dtype=read_dtypes)
+        return _conform_csv_chunk(chunk, dtypes)
+    if kind == 'parquet':
+        import pyarrow.parquet as pq
+        return pq.ParquetFile(path).read_row_group(task).to_pandas()
+    if kind == 'npy':
+        start, end = task
+        values = np.load(path, mmap_mode='r')[start:end]
+        return pd.DataFrame(np.asarray(values, dtype=float), columns=source['names'])
+    raise ValueError(f"サポートされていない入力形式: {kind}")
+
+
+def plan_source(path: str, chunk_bytes: int = DEFAULT_CHUNK_BYTES, npy_rows: int = DEFAULT_NPY_ROWS,
+                encoding: str = 'utf-8', names: List[str] = None) -> Tuple[Dict[str, Any], List[Any]]:
+    """
+    入力ファイルを並列処理用のタスクに分割
+
+    Args:
+        path (str): 入力ファイル（.csv, .parquet, .npy）
+        chunk_bytes (int): CSVの1タスクのバイト数
+        npy_rows (int): .npyの1タスクの行数
+        encoding (str): CSVの文字エンコーディング
+        names (List[str]): .npyの列名（None=col_0, col_1, ...）
+
+    Returns:
+        Tuple[Dict, List]: 入力情報, タスクのリスト
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.csv':
+        names, ranges = _csv_tasks(path, chunk_bytes, encoding)
+        dtypes = _infer_csv_dtypes(path, names, ranges, encoding)
+        return {'kind': 'csv', 'path': path, 'names': names, 'encoding': encoding, 'dtypes': dtypes}, ranges
+    if extension == '.parquet':
+        import pyarrow.parquet as pq
+        return {'kind': 'parquet', 'path': path}, list(range(pq.ParquetFile(path).num_row_groups))
+    if extension == '.npy':
+        n_rows, n_columns = np.load(path, mmap_mode='r').shape
+        names = names or [f"col_{i}" for i in range(n_columns)]
+        tasks = [(start, min(start + npy_rows, n_rows)) for start in range(0, n_rows, npy_rows)]
+        return {'kind': 'npy', 'path': path, 'names': names}, tasks
+    raise ValueError(f"サポートされていないファイル形式: {extension}")
+
+
+# =========================================
+# 2. ワーカー処理
+# =========================================
+
+def _numeric_columns(chunk: pd.DataFrame, columns: List[str]) -> pd.DataFrame:
+    """正規化する列を数値にする（文字列に広げた列の数値にできない値は正規化できないため欠損）"""
+    converted = {col: pd.to_numeric(chunk[col], errors='coerce') for col in columns
+                 if not pd.api.types.is_numeric_dtype(chunk[col]) or pd.api.types.is_bool_dtype(chunk[col])}
+    return chunk.assign(**converted) if converted else chunk
+
+
+def _fit_task(source: Dict[str, Any], task: Any, columns: List[str],
+              quantiles: bool) -> Tuple[StreamingScalerFitter, Dict[str, str]]:
+    """ワーカー内で1チャンクの統計値を学習（CSVでは実際に読めた列の型も返す）"""
+    chunk = _read_task(source, task)
+    fitter = StreamingScalerFitter(columns, quantiles=quantiles).partial_fit(_numeric_columns(chunk, columns))
+    observed = {col: _dtype_kind(chunk[col]) for col in chunk.columns} if source['kind'] == 'csv' else {}
+    return fitter, observed
+
+
+def _scan_task(source: Dict[str, Any], task: Any) -> Dict[str, str]:
+    """ワーカー内で1チャンクを読み込み、実際に読めた列の型を返す"""
+    chunk = _read_task(source, task)
+    return {col: _dtype_kind(chunk[col]) for col in chunk.columns}
+
+
+def _transform_task(source: Dict[str, Any], task: Any, columns: List[str],
+                    params: Dict[str, np.ndarray]) -> pd.DataFrame:
+    """ワーカー内で1チャンクを読み込んで正規化"""
+    chunk = _read_task(source, task)
+    scaled = apply_scaling(_numeric_columns(chunk, columns)[columns].to_numpy(dtype=float, na_value=np.nan), params)
+    for i, col in enumerate(columns):
+        chunk[col] = scaled[:, i]  # Int64 の列も float の列に置き換える
+    return chunk
+
+
+def _ordered_results(executor: ProcessPoolExecutor, func, source: Dict[str, Any], tasks: List[Any],
+                     extra_args: tuple, max_in_flight: int):
+    """
+    タスクを並列実行し、結果を投入順に返す
+
+    同時に保持する結果を max_in_flight 件に抑え、出力が遅くてもメモリが増え続けないようにする。
+    """
+    pending = deque()
+    for task in tasks:
+        pending.append(executor.submit(func, source, task, *extra_args))
+        if len(pending) >= max_in_flight:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+# =========================================
+# 3. 列指向の出力先
+# =========================================
+
+ARROW_TYPES = {'str': 'string', 'boolean': 'bool', 'Int64': 'int64', 'float64': 'float64'}
+
+
+def output_schema(source: Dict[str, Any], scaled_columns: List[str]):
+    """
+    出力の Arrow スキーマ（入力の列の型で、正規化した列は float64）
+
+    最初のチャンクから決めると、そのチャンクで全て欠損の列が null 型になり後のチャンクを書き込めないため、
+    入力全体で共通の型から作る。
+    """
+    import pyarrow as pa
+    scaled = set(scaled_columns)
+    if source['kind'] == 'csv':
+        fields = [(col, pa.float64() if col in scaled else pa.type_for_alias(ARROW_TYPES[dtype]))
+                  for col, dtype in source['dtypes'].items()]
+    elif source['kind'] == 'parquet':
+        import pyarrow.parquet as pq
+        fields = [(field.name, pa.float64() if field.name in scaled else field.type)
+                  for field in pq.ParquetFile(source['path']).schema_arrow]
+    else:
+        fields = [(col, pa.float64()) for col in source['names']]
+    return pa.schema(fields)
+
+
+class ParquetSink:
+    """チャンクを順にParquetへ追記する出力先（pyarrowが必要）"""
+
+    def __init__(self, path: str, schema=None):
+        """
+        Args:
+            path (str): 出力ファイル
+            schema (pa.Schema): 出力のスキーマ（None=最初のチャンクから決め、null 型の列は文字列にする）
+        """
+        import pyarrow  # noqa: F401  利用可否の確認
+        self.path = path
+        self.writer = None
+        self.schema = schema
+        self.rows = 0
+
+    def write(self, chunk: pd.DataFrame):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        if self.schema is None:
+            inferred = pa.Table.from_pandas(chunk, preserve_index=False).schema
+            self.schema = pa.schema([field.with_type(pa.string()) if pa.types.is_null(field.type) else field
+                                     for field in inferred])
+        table = pa.Table.from_pandas(chunk, schema=self.schema, preserve_index=False)
+        if self.writer is None:
+            self.writer = pq.ParquetWriter(self.path, self.schema)
+        self.writer.write_table(table)
+        self.rows += len(chunk)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+
+class ColumnBinarySink:
+    """
+    数値列を列ごとの生バイナリファイルに追記する出力先（pyarrowがない環境用）
+
+    出力先ディレクトリに <列名>.bin と schema.json を作成し、
+    np.memmap(path, dtype, mode='r', shape=(rows,)) で読み戻せる。数値以外の列は保存しない。
+    """
+
+    def __init__(self, directory: str, dtype: str = 'float64'):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.dtype = np.dtype(dtype)
+        self.columns = None
+        self.files = {}
+        self.rows = 0
+
+    def write(self, chunk: pd.DataFrame):
+        if self.columns is None:
+            self.columns = chunk.select_dtypes(include=[np.number]).columns.tolist()
+            self.files = {col: open(os.path.join(self.directory, f"{col}.bin"), 'wb') for col in self.columns}
+        for col in self.columns:
+            self.files[col].write(np.ascontiguousarray(chunk[col].to_numpy(dtype=self.dtype, na_value=np.nan)).tobytes())
+        self.rows += len(chunk)
+
+    def close(self):
+        for f in self.files.values():
+            f.close()
+        with open(os.path.join(self.directory, 'schema.json'), 'w', encoding='utf-8') as f:
+            json.dump({'rows': self.rows, 'dtype': self.dtype.name, 'columns': self.columns or []},
+                      f, ensure_ascii=False, indent=2)
+
+
+def open_sink(output_path: str, source: Dict[str, Any] = None, scaled_columns: List[str] = None):
+    """
+    出力先を作成（.parquet はpyarrowがあればParquet、なければ列バイナリのディレクトリ）
+
+    source を渡すと、Parquet のスキーマを入力全体で共通の型から決める。
+    """
+    if output_path.endswith('.parquet'):
+        try:
+            schema = output_schema(source, scaled_columns or []) if source is not None else None
+            return ParquetSink(output_path, schema)
+        except ImportError:
+            output_path = output_path[:-len('.parquet')]
+            print(f"⚠️ pyarrow がないため列バイナリ形式で保存します: {output_path}/")
+    return ColumnBinarySink(output_path)
+
+
+# =========================================
+# 4. 並列正規化
+# =========================================
+
+def fit_parallel(source: Dict[str, Any], tasks: List[Any], columns: List[str] = None, quantiles: bool = True,
+                 max_workers: int = None) -> StreamingScalerFitter:
+    """
+    チャンクごとの統計値を並列に学習してマージ
+
+    CSVでは同時に全チャンクで実際に読めた型を集め、source['dtypes'] を広げる（出力のスキーマに使う）。
+
+    Returns:
+        StreamingScalerFitter: マージ済みの学習結果
+    """
+    if columns is None and tasks:
+        columns = _read_task(source, tasks[0]).select_dtypes(include=[np.number]).columns.tolist()
+
+    merged = StreamingScalerFitter(columns, quantiles=quantiles)
+    observed = []
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        for partial, chunk_dtypes in executor.map(_fit_task, [source] * len(tasks), tasks,
+                                                  [columns] * len(tasks), [quantiles] * len(tasks)):
+            merged.merge(partial)
+            observed.append(chunk_dtypes)
+    if source['kind'] == 'csv':
+        widen_csv_dtypes(source, observed)
+    return merged
+
+
+def scan_csv_dtypes(source: Dict[str, Any], tasks: List[Any], max_workers: int = None):
+    """全チャンクを読んで source['dtypes'] を実際の型に広げる（学習済みパラメータを使う場合の確認用）"""
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        widen_csv_dtypes(source, executor.map(_scan_task, [source] * len(tasks), tasks))
+
+
+def normalize_parallel(input_path: str, output_path: str, method: str = 'minmax', columns: List[str] = None,
+                       fitter: StreamingScalerFitter = None, max_workers: int = None,
+                       chunk_bytes: int = DEFAULT_CHUNK_BYTES, encoding: str = 'utf-8') -> StreamingScalerFitter:
+    """
+    大量データを並列に正規化して列指向形式で保存
+
+    Args:
+        input_path (str): 入力ファイル（.csv, .parquet, .npy）
+        output_path (str): 出力先（.parquet、またはディレクトリ）
+        method (str): 'minmax', 'standard', 'robust'
+        columns (List[str]): 正規化する列（None=数値列すべて）
+        fitter (StreamingScalerFitter): 学習済みパラメータ（None=並列に学習）
+        max_workers (int): プロセス数（None=CPU数）
+        chunk_bytes (int): CSVの1タスクのバイト数
+        encoding (str): CSVの文字エンコーディング
+
+    Returns:
+        StreamingScalerFitter: 使用した学習結果
+    """
+    if method not in SCALING_METHODS:
+        raise ValueError(f"サポートされていない正規化方法: {method}")
+
+    source, tasks = plan_source(input_path, chunk_bytes=chunk_bytes, encoding=encoding)
+    print(f"🔀 {len(tasks)}チャンクに分割しました")
+
+    if fitter is None:
+        fitter = fit_parallel(source, tasks, columns, quantiles=(method == 'robust'), max_workers=max_workers)
+        print(f"📊 {len(fitter.columns)}列の統計値を学習 ({int(fitter.stats.count.max()):,}行)")
+    elif source['kind'] == 'csv':
+        scan_csv_dtypes(source, tasks, max_workers)
+    params = fitter.params(method)
+
+    workers = max_workers or os.cpu_count() or 1
+    sink = open_sink(output_path, source, fitter.columns)
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for chunk in _ordered_results(executor, _transform_task, source, tasks,
+                                          (fitter.columns, params), max_in_flight=workers * 2):
+                sink.write(chunk)
+    finally:
+        sink.close()
+
+    print(f"✅ 正規化済みデータを保存しました: {output_path} ({sink.rows:,}行)")
+    return fitter
+
+
+def main():
+    """メイン関数"""
+    parser = argparse.ArgumentParser(description='Dask不要の並列正規化')
+    parser.add_argument('input', help='入力ファイル（.csv, .parquet, .npy）')
+    parser.add_argument('output', help='出力先（.parquet またはディレクトリ）')
+    parser.add_argument('--method', choices=SCALING_METHODS, default='minmax')
+    parser.add_argument('--columns', nargs='+', help='正規化する列')
+    parser.add_argument('--workers', type=int, help='プロセス数')
+    parser.add_argument('--chunk-mb', type=int, default=DEFAULT_CHUNK_BYTES // 1024 // 1024)
+    parser.add_argument('--encoding', default='utf-8')
+    parser.add_argument('--save-params', help='学習したパラメータをJSONで保存するパス')
+    args = parser.parse_args()
+
+    fitter = normalize_parallel(args.input, args.output, args.method, args.columns, max_workers=args.workers,
+                                chunk_bytes=args.chunk_mb * 1024 * 1024, encoding=args.encoding)
+    if args.save_params:
+        fitter.save(args.save_params)
+        print(f"📄 パラメータを保存しました: {args.save_params}")
+
+
+if __name__ == "__main__":
+    main()
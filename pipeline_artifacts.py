@@ -0,0 +1,305 @@
+"""
+学習済みパイプラインの保存・読み込みモジュール
+Description: 学習済みのスケーラーとモデルを、特徴量スキーマのハッシュとバージョン情報付きで保存する。
+             読み込みはメタデータだけを先に読み、モデル本体は初回の予測時に
+             joblibのメモリマップで読み込む。メモリマップのまま複数ワーカーで共有されるのは
+             スケーラーの統計値や線形モデルの係数のような ndarray の属性だけで、
+             RandomForestRegressor などの決定木は読み込み時にノードがコピーされるため
+             ワーカーごとにモデル全体の大きさのメモリを使う
+
+保存形式:
+    <保存先>/
+        LATEST                 最新バージョン名
+        <バージョン>/
+            metadata.json      特徴量・スキーマハッシュ・ライブラリのバージョン
+            pipeline.joblib    {'scaler': ..., 'model': ...}（非圧縮、ndarray の属性はメモリマップ可能）
+
+使用例:
+    save_pipeline('models/sales_forecast', model, scaler, feature_columns)
+    artifact = load_pipeline('models/sales_forecast')
+    result_df = predict_new_data(artifact, new_data)
+"""
+
+import hashlib
+import json
+import os
+import platform
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Union
+
+ARTIFACT_FORMAT_VERSION = 1
+METADATA_FILE = 'metadata.json'
+PIPELINE_FILE = 'pipeline.joblib'
+LATEST_FILE = 'LATEST'
+
+
+def feature_schema_hash(feature_columns: List[str], feature_dtypes: Dict[str, str] = None) -> str:
+    """
+    特徴量の列名・順序・型からスキーマのハッシュを計算
+
+    Args:
+        feature_columns (List[str]): 特徴量の列名（順序も含めて比較する）
+        feature_dtypes (Dict[str, str]): 列名 -> 型名
+
+    Returns:
+        str: SHA-256の16進文字列
+    """
+    feature_dtypes = feature_dtypes or {}
+    schema = [[str(col), str(feature_dtypes.get(col, ''))] for col in feature_columns]
+    return hashlib.sha256(json.dumps(schema, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+
+def _library_versions() -> Dict[str, str]:
+    versions = {'python': platform.python_version()}
+    for name in ['numpy', 'pandas', 'sklearn', 'joblib']:
+        try:
+            versions[name] = __import__(name).__version__
+        except ImportError:
+            continue
+    return versions
+
+
+def save_pipeline(path: str, model: Any, scaler: Any = None, feature_columns: List[str] = None,
+                  feature_dtypes: Dict[str, str] = None, version: str = None, target_column: str = None,
+                  extra_metadata: Dict[str, Any] = None) -> str:
+    """
+    学習済みのスケーラーとモデルを保存
+
+    Args:
+        path (str): 保存先ディレクトリ（バージョンごとのサブディレクトリを作成）
+        model (Any): 学習済みモデル（sklearn Pipeline も可。その場合 scaler は None）
+        scaler (Any): 学習済みスケーラー
+        feature_columns (List[str]): 特徴量の列名（予測時に同じ順序で渡す）
+        feature_dtypes (Dict[str, str]): 列名 -> 型名
+        version (str): バージョン名（None=保存日時）
+        target_column (str): 目的変数の列名
+        extra_metadata (Dict[str, Any]): 追加で記録する情報（評価指標など）
+
+    Returns:
+        str: 保存したバージョンのディレクトリ
+    """
+    import joblib
+
+    if not feature_columns:
+        feature_columns = list(getattr(scaler if scaler is not None else model, 'feature_names_in_', []))
+    if not feature_columns:
+        raise ValueError("feature_columns を指定してください")
+
+    version = version or datetime.now().strftime("%Y%m%d_%H%M%S")
+    version_dir = os.path.join(path, version)
+    if os.path.exists(version_dir):
+        raise FileExistsError(f"バージョンが既に存在します: {version_dir}")
+    os.makedirs(version_dir)
+
+    # ndarray の属性をメモリマップで読めるよう圧縮しない
+    joblib.dump({'scaler': scaler, 'model': model}, os.path.join(version_dir, PIPELINE_FILE), compress=0)
+
+    metadata = {
+        'format_version': ARTIFACT_FORMAT_VERSION,
+        'version': version,
+        'created_at': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        'feature_columns': list(feature_columns),
+        'feature_dtypes': {col: str(dtype) for col, dtype in (feature_dtypes or {}).items()},
+        'schema_hash': feature_schema_hash(feature_columns, feature_dtypes),
+        'target_column': target_column,
+        'model_class': type(model).__name__,
+        'scaler_class': type(scaler).__name__ if scaler is not None else None,
+        'libraries': _library_versions(),
+        'extra': extra_metadata or {},
+    }
+    with open(os.path.join(version_dir, METADATA_FILE), 'w', encoding='utf-8') as f:
+        json.dump(metadata, f, ensure_ascii=False, indent=2, default=str)
+
+    # 最新バージョンの記録は最後に置き換える（読み込み側が途中状態を見ないように）
+    latest_tmp = os.path.join(path, LATEST_FILE + '.tmp')
+    with open(latest_tmp, 'w', encoding='utf-8') as f:
+        f.write(version)
+    os.replace(latest_tmp, os.path.join(path, LATEST_FILE))
+
+    print(f"✅ パイプラインを保存しました: {version_dir}")
+    return version_dir
+
+
+def list_versions(path: str) -> List[str]:
+    """保存済みのバージョン名を古い順に取得"""
+    if not os.path.isdir(path):
+        return []
+    return sorted(name for name in os.listdir(path)
+                  if os.path.isfile(os.path.join(path, name, METADATA_FILE)))
+
+
+class PipelineArtifact:
+    """
+    保存済みパイプライン
+
+    メタデータは生成時に読み込み、スケーラーとモデルは初めて使う時に読み込む。
+    """
+
+    def __init__(self, version_dir: str, mmap_mode: Optional[str] = 'r'):
+        self.version_dir = version_dir
+        self.mmap_mode = mmap_mode
+        with open(os.path.join(version_dir, METADATA_FILE), 'r', encoding='utf-8') as f:
+            self.metadata = json.load(f)
+        if self.metadata.get('format_version') != ARTIFACT_FORMAT_VERSION:
+            raise ValueError(f"未対応の保存形式です: {self.metadata.get('format_version')}")
+        self._objects = None
+
+    @property
+    def version(self) -> str:
+        return self.metadata['version']
+
+    @property
+    def feature_columns(self) -> List[str]:
+        return self.metadata['feature_columns']
+
+    def load(self) -> Dict[str, Any]:
+        """スケーラーとモデルを読み込む（読み込み済みなら何もしない）"""
+        if self._objects is None:
+            import joblib
+            self._objects = joblib.load(os.path.join(self.version_dir, PIPELINE_FILE), mmap_mode=self.mmap_mode)
+        return self._objects
+
+    @property
+    def scaler(self) -> Any:
+        return self.load()['scaler']
+
+    @property
+    def model(self) -> Any:
+        return self.load()['model']
+
+    def check_schema(self, data) -> None:
+        """
+        入力データが学習時の特徴量スキーマと一致するか確認
+
+        Raises:
+            ValueError: 特徴量の列が不足している、または型が異なる場合
+        """
+        missing = [col for col in self.feature_columns if col not in data.columns]
+        if missing:
+            raise ValueError(f"特徴量の列が不足しています: {missing}")
+
+        expected = self.metadata.get('feature_dtypes') or {}
+        if expected:
+            actual = {col: str(data[col].dtype) for col in self.feature_columns}
+            if feature_schema_hash(self.feature_columns, actual) != self.metadata['schema_hash']:
+                changed = {col: (expected.get(col), actual[col])
+                           for col in self.feature_columns if expected.get(col) != actual[col]}
+                raise ValueError(f"特徴量の型が学習時と異なります: {changed}")
+
+    def predict(self, data):
+        """
+        特徴量列を学習時の順序で取り出し、正規化して予測
+
+        Args:
+            data (pd.DataFrame): 特徴量を含むデータ
+
+        Returns:
+            np.ndarray: 予測値
+        """
+        self.check_schema(data)
+        features = data[self.feature_columns]
+        if self.scaler is not None:
+            features = self.scaler.transform(features)
+        return self.model.predict(features)
+
+
+def load_pipeline(path: str, version: str = None, mmap_mode: Optional[str] = 'r') -> PipelineArtifact:
+    """
+    保存済みパイプラインを読み込む（モデル本体は初回使用時に読み込む）
+
+    Args:
+        path (str): save_pipeline() の保存先ディレクトリ
+        version (str): バージョン名（None=最新）
+        mmap_mode (Optional[str]): joblibのメモリマップモード（None=通常読み込み）。
+            決定木のモデルは mmap_mode に関係なくプロセスごとにコピーされる
+
+    Returns:
+        PipelineArtifact: 保存済みパイプライン
+    """
+    if version is None:
+        latest_path = os.path.join(path, LATEST_FILE)
+        if os.path.exists(latest_path):
+            with open(latest_path, 'r', encoding='utf-8') as f:
+                version = f.read().strip()
+        else:
+            versions = list_versions(path)
+            if not versions:
+                raise FileNotFoundError(f"保存済みパイプラインが見つかりません: {path}")
+            version = versions[-1]
+    return PipelineArtifact(os.path.join(path, version), mmap_mode=mmap_mode)
+
+
+def predict_new_data(artifact: Union[str, PipelineArtifact], new_data, prediction_column: str = None):
+    """
+    新しいデータに対する予測関数（本番環境用）
+
+    学習済みのスケーラー・モデルを保存先から読み込むため、予測の前に再学習する必要がない。
+
+    Args:
+        artifact (Union[str, PipelineArtifact]): 保存先ディレクトリ、または読み込み済みパイプライン
+        new_data (pd.DataFrame): 予測対象データ
+        prediction_column (str): 予測値の列名（None=predicted_<目的変数名>）
+
+    Returns:
+        pd.DataFrame: 予測値の列を追加したデータ
+    """
+    if isinstance(artifact, str):
+        artifact = load_pipeline(artifact)
+
+    predictions = artifact.predict(new_data)
+    column = prediction_column or f"predicted_{artifact.metadata.get('target_column') or 'value'}"
+    result_df = new_data.assign(**{column: predictions})
+
+    print(f"✅ {len(new_data)}件のデータを予測完了 (モデル: {artifact.version})")
+    return result_df
+
+
+def complete_ml_pipeline(df, target_column: str, test_size: float = 0.2, save_path: str = None,
+                         version: str = None):
+    """
+    完全な機械学習パイプライン（学習結果を保存先に保存）
+
+    Args:
+        df (pd.DataFrame): 学習データ
+        target_column (str): 目的変数の列名
+        test_size (float): テストデータの割合
+        save_path (str): 保存先ディレクトリ（None=保存しない）
+        version (str): バージョン名（None=保存日時）
+
+    Returns:
+        Tuple[Pipeline, float]: 学習済みパイプライン, テストデータのRMSE
+    """
+    import numpy as np
+    from sklearn.ensemble import RandomForestRegressor
+    from sklearn.metrics import mean_squared_error
+    from sklearn.model_selection import train_test_split
+    from sklearn.pipeline import Pipeline
+    from sklearn.preprocessing import StandardScaler
+
+    # 1. データ準備
+    X = df.drop(target_column, axis=1)
+    y = df[target_column]
+
+    # 2. 分割
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=test_size, random_state=42)
+
+    # 3. 正規化パイプライン
+    pipeline = Pipeline([
+        ('scaler', StandardScaler()),
+        ('model', RandomForestRegressor(random_state=42))
+    ])
+
+    # 4. 学習
+    pipeline.fit(X_train, y_train)
+
+    # 5. 評価
+    y_pred = pipeline.predict(X_test)
+    rmse = float(np.sqrt(mean_squared_error(y_test, y_pred)))
+
+    # 6. 保存（スケーラーとモデルを分けて保存し、予測時に個別に使えるようにする）
+    if save_path:
+        save_pipeline(save_path, pipeline.named_steps['model'], pipeline.named_steps['scaler'],
+                      feature_columns=X.columns.tolist(), feature_dtypes=X.dtypes.astype(str).to_dict(),
+                      version=version, target_column=target_column, extra_metadata={'rmse': rmse})
+
+    return pipeline, rmse
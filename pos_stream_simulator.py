@@ -0,0 +1,543 @@
+"""
+POS売上イベントのリアルタイム・シミュレーター
+Description: kyaba_sales.py と同じ顧客・キャスト（kyaba_dimensions）と料金モデル（kyaba_pricing）で、
+             売上イベントを時刻順に asyncio で送り出す。イベントの発生は営業時間・曜日の重みに従い、
+             平均の送信レート（件/秒）と時間の早送り倍率を指定できる。
+             出力先はローカルのソケット（TCP、JSON Lines）、一定件数・時間ごとに切り替わるファイル、コールバック。
+             イベントはまとめてベクトル演算で生成し、送信予定時刻を過ぎた分をまとめて送るため、
+             1台のPCで毎秒数万件を送り続けられる。予定時刻からの遅れと出力先ごとの書き込み時間を計測する
+
+使用例:
+    # 平均2万件/秒、60倍速（1秒で1分進む）で、TCP 9009番に接続したクライアントへ配信
+    python pos_stream_simulator.py --rate 20000 --acceleration 60 --socket 127.0.0.1:9009
+    # 10秒ごとにCSVを切り替えて inbox/ に書き出す（hot_folder_watcher.py の入力にできる）
+    python pos_stream_simulator.py --rate 500 --output-dir inbox --file-format csv --rotate-seconds 10
+"""
+
+import argparse
+import asyncio
+import csv
+import inspect
+import io
+import json
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from approx_profile import ReservoirSample
+from kyaba_dimensions import DimensionSampler, generate_casts, generate_customers
+from kyaba_pricing import HOUR_WEIGHTS, WEEKDAY_WEIGHTS, hour_weight, price_sales
+
+SALE_COLUMNS = ['sale_id', 'customer_id', 'cast_id', 'sale_date', 'sale_time', 'service_type',
+                'base_charge', 'drink_charge', 'nomination_fee', 'extension_fee', 'total_amount',
+                'payment_method', 'duration_minutes']
+DEFAULT_MAX_BATCH_EVENTS = 50_000
+DEFAULT_TICK = 0.005
+
+
+# =========================================
+# 1. イベント生成
+# =========================================
+
+class EventBatch:
+    """時刻順の売上イベント（列ごとの配列）"""
+
+    def __init__(self, columns: List[str], values: Dict[str, np.ndarray], offsets: np.ndarray):
+        self.columns = columns
+        self.values = values
+        self.offsets = offsets  # シミュレーション開始からの経過秒
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    def slice(self, start: int, end: int) -> 'EventBatch':
+        return EventBatch(self.columns, {col: values[start:end] for col, values in self.values.items()},
+                          self.offsets[start:end])
+
+    def rows(self, emitted_at: float) -> List[tuple]:
+        """1件ずつのタプル（列の順は columns、最後に送信時刻 emitted_at）"""
+        lists = [self.values[col].tolist() for col in self.columns]
+        return [row + (emitted_at,) for row in zip(*lists)]
+
+    def records(self, emitted_at: float) -> List[Dict[str, Any]]:
+        """1件ずつの辞書"""
+        names = self.columns + ['emitted_at']
+        return [dict(zip(names, row)) for row in self.rows(emitted_at)]
+
+
+class SaleEventGenerator:
+    """
+    売上イベントを時刻順に生成するクラス
+
+    発生は区間ごとに一定の強度を持つポアソン過程とし、強度は営業時間・曜日の重み（profile='business'）
+    または一定（profile='flat'）。平均の強度は「送信レート / 早送り倍率」件/シミュレーション秒になる。
+    """
+
+    def __init__(self, customers_df: pd.DataFrame, casts_df: pd.DataFrame, rate: float = 1000.0,
+                 acceleration: float = 1.0, start: datetime = None, profile: str = 'business',
+                 skew: str = 'pareto', seed: Optional[int] = None,
+                 max_batch_events: int = DEFAULT_MAX_BATCH_EVENTS):
+        """
+        初期化
+
+        Args:
+            customers_df (pd.DataFrame): 顧客データ（generate_customers の形式）
+            casts_df (pd.DataFrame): キャストデータ（generate_casts の形式）
+            rate (float): 平均の送信レート（件/実時間の秒）
+            acceleration (float): 時間の早送り倍率（60なら実時間1秒でシミュレーション時刻が1分進む）
+            start (datetime): シミュレーション開始時刻（None=今日の開店時刻）
+            profile (str): 'business'（営業時間・曜日の重み）, 'flat'（一定）
+            skew (str): 来店・指名頻度の偏り（kyaba_sales.py の --skew）
+            seed (Optional[int]): 乱数シード
+            max_batch_events (int): 1回に生成するイベント数の目安
+        """
+        if rate <= 0 or acceleration <= 0:
+            raise ValueError("rate と acceleration は正の値を指定してください")
+        if profile not in ('business', 'flat'):
+            raise ValueError(f"サポートされていないプロファイル: {profile}")
+        self.rate = rate
+        self.acceleration = acceleration
+        self.start = start or datetime.now().replace(hour=19, minute=0, second=0, microsecond=0)
+        self.profile = profile
+        self.max_batch_events = max_batch_events
+        self.rng = np.random.default_rng(seed)
+        self.sampler = DimensionSampler(customers_df, casts_df, skew=skew,
+                                        seed=None if seed is None else seed + 1)
+
+        self.customer_ids = customers_df['customer_id'].to_numpy()
+        self.customer_ranks = customers_df['customer_rank'].to_numpy()
+        self.customer_stores = customers_df['store_id'].to_numpy() if 'store_id' in customers_df.columns else None
+        self.cast_ids = casts_df['cast_id'].to_numpy()
+        self.columns = ['event_time'] + SALE_COLUMNS + (['store_id'] if self.customer_stores is not None else [])
+        self.next_sale_id = 1
+
+        # 1週間の重みの平均が1になるよう正規化（営業日の0-2時は前日の曜日として数える）
+        self.sim_rate = rate / acceleration
+        self.mean_weight = sum(HOUR_WEIGHTS) * sum(WEEKDAY_WEIGHTS) / (7 * 24)
+
+    def intensity(self, moment: datetime) -> float:
+        """その時刻の発生強度（件/シミュレーション秒）"""
+        if self.profile == 'flat':
+            return self.sim_rate
+        business_day = (moment - timedelta(hours=6)).weekday()  # 深夜0-2時は前日の営業日
+        weight = hour_weight(moment.hour) * WEEKDAY_WEIGHTS[business_day]
+        return self.sim_rate * weight / self.mean_weight
+
+    def _make_events(self, offsets: np.ndarray) -> EventBatch:
+        n = len(offsets)
+        customer_positions, cast_positions = self.sampler.sample(n)
+        timestamps = np.datetime64(self.start, 'ms') + (offsets * 1000).astype(np.int64).astype('timedelta64[ms]')
+        seconds = np.datetime_as_string(timestamps, unit='s')
+
+        values = {
+            'event_time': np.datetime_as_string(timestamps, unit='ms'),
+            'sale_id': np.arange(self.next_sale_id, self.next_sale_id + n),
+            'customer_id': self.customer_ids[customer_positions],
+            'cast_id': self.cast_ids[cast_positions],
+            'sale_date': seconds.astype('U10'),
+            'sale_time': np.array([text[11:] for text in seconds.tolist()], dtype=object),
+        }
+        values.update(price_sales(self.customer_ranks[customer_positions], self.rng))
+        if self.customer_stores is not None:
+            values['store_id'] = self.customer_stores[customer_positions]
+        self.next_sale_id += n
+        return EventBatch(self.columns, values, offsets)
+
+    def batches(self, offset: float = 0.0) -> Iterator[EventBatch]:
+        """
+        イベントを時刻順のまとまりで無限に返す
+
+        区間は1時間の中で切り、1区間のイベント数の期待値が max_batch_events 程度になるよう長さを決める。
+        """
+        while True:
+            moment = self.start + timedelta(seconds=offset)
+            hour_end = offset + 3600 - (moment.minute * 60 + moment.second + moment.microsecond / 1e6)
+            lam = self.intensity(moment)
+            if lam <= 0:
+                offset = hour_end  # 営業時間外は次の1時間へ
+                continue
+            end = min(offset + self.max_batch_events / lam, hour_end)
+            count = self.rng.poisson(lam * (end - offset))
+            if count:
+                yield self._make_events(np.sort(offset + self.rng.random(count) * (end - offset)))
+            offset = end
+
+
+# =========================================
+# 2. 出力先
+# =========================================
+
+class EventSink:
+    """出力先の基底クラス（start → write を繰り返す → close）"""
+
+    name = 'sink'
+
+    async def start(self):
+        pass
+
+    async def write(self, batch: EventBatch, emitted_at: float):
+        raise NotImplementedError
+
+    async def close(self):
+        pass
+
+
+def _jsonl_bytes(batch: EventBatch, emitted_at: float) -> bytes:
+    names = batch.columns + ['emitted_at']
+    lines = [json.dumps(dict(zip(names, row)), ensure_ascii=False) for row in batch.rows(emitted_at)]
+    return ('\n'.join(lines) + '\n').encode('utf-8')
+
+
+class CallbackSink(EventSink):
+    """イベントの辞書のリストを関数に渡す（async 関数も可）"""
+
+    name = 'callback'
+
+    def __init__(self, callback: Callable[[List[Dict[str, Any]]], Any]):
+        self.callback = callback
+
+    async def write(self, batch: EventBatch, emitted_at: float):
+        result = self.callback(batch.records(emitted_at))
+        if inspect.isawaitable(result):
+            await result
+
+
+class CountingSink(EventSink):
+    """件数を数えるだけの出力先（生成・送信の速度の計測用）"""
+
+    name = 'count'
+
+    def __init__(self):
+        self.count = 0
+
+    async def write(self, batch: EventBatch, emitted_at: float):
+        self.count += len(batch)
+
+
+class SocketSink(EventSink):
+    """
+    TCPソケットへ JSON Lines で送る
+
+    listen=True では接続してきたすべてのクライアントへ配信するサーバーになり、
+    listen=False では指定先（取り込み側のサーバー）へ接続して送る。
+    遅いクライアントには drain() で待たされる（送信が追いつかない場合はシミュレーター全体が待つ）。
+    """
+
+    name = 'socket'
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 9009, listen: bool = True):
+        self.host = host
+        self.port = port
+        self.listen = listen
+        self.server = None
+        self.writers: List[asyncio.StreamWriter] = []
+
+    async def start(self):
+        if self.listen:
+            async def on_client(reader, writer):
+                self.writers.append(writer)
+                print(f"🔌 クライアントが接続しました: {writer.get_extra_info('peername')}")
+
+            self.server = await asyncio.start_server(on_client, self.host, self.port)
+            print(f"📡 イベントを配信中: tcp://{self.host}:{self.port}")
+        else:
+            _, writer = await asyncio.open_connection(self.host, self.port)
+            self.writers.append(writer)
+
+    async def _send(self, writer: asyncio.StreamWriter, data: bytes):
+        try:
+            writer.write(data)
+            await writer.drain()
+        except (ConnectionError, OSError):
+            self.writers.remove(writer)
+            writer.close()
+            if not self.listen:
+                raise
+
+    async def write(self, batch: EventBatch, emitted_at: float):
+        if not self.writers:
+            return
+        data = _jsonl_bytes(batch, emitted_at)
+        await asyncio.gather(*(self._send(writer, data) for writer in list(self.writers)))
+
+    async def close(self):
+        for writer in self.writers:
+            writer.close()
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+
+
+class RotatingFileSink(EventSink):
+    """
+    一定件数・一定時間ごとに切り替わるファイルへ書き出す
+
+    書き込み中のファイルは .part を付けた名前にし、切り替え時に os.replace で完成した名前にする
+    （hot_folder_watcher.py は .part のファイルを無視する）。書き込みは別スレッドで行う。
+    """
+
+    name = 'file'
+
+    def __init__(self, directory: str, prefix: str = 'pos_events', file_format: str = 'jsonl',
+                 max_events: int = 100_000, max_seconds: float = 60.0):
+        if file_format not in ('jsonl', 'csv'):
+            raise ValueError(f"サポートされていない形式: {file_format}")
+        self.directory = directory
+        self.prefix = prefix
+        self.file_format = file_format
+        self.max_events = max_events
+        self.max_seconds = max_seconds
+        self.file = None
+        self.part_path = None
+        self.opened_at = 0.0
+        self.events_in_file = 0
+        self.sequence = 0
+        self.completed: List[str] = []
+        os.makedirs(directory, exist_ok=True)
+
+    def _finish(self):
+        if self.file is None:
+            return
+        self.file.close()
+        final_path = self.part_path[:-len('.part')]
+        os.replace(self.part_path, final_path)
+        self.completed.append(final_path)
+        self.file = None
+
+    def _open(self, columns: List[str]):
+        self.sequence += 1
+        stamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        name = f"{self.prefix}_{stamp}_{self.sequence:05d}.{self.file_format}"
+        self.part_path = os.path.join(self.directory, name + '.part')
+        encoding = 'utf-8-sig' if self.file_format == 'csv' else 'utf-8'
+        self.file = open(self.part_path, 'w', encoding=encoding, newline='')
+        if self.file_format == 'csv':
+            csv.writer(self.file).writerow(columns + ['emitted_at'])
+        self.opened_at = time.monotonic()
+        self.events_in_file = 0
+
+    def _write_sync(self, batch: EventBatch, emitted_at: float):
+        if self.file is not None and (self.events_in_file >= self.max_events
+                                      or time.monotonic() - self.opened_at >= self.max_seconds):
+            self._finish()
+        if self.file is None:
+            self._open(batch.columns)
+        if self.file_format == 'csv':
+            buffer = io.StringIO()
+            csv.writer(buffer).writerows(batch.rows(emitted_at))
+            self.file.write(buffer.getvalue())
+        else:
+            self.file.write(_jsonl_bytes(batch, emitted_at).decode('utf-8'))
+        self.events_in_file += len(batch)
+
+    async def write(self, batch: EventBatch, emitted_at: float):
+        await asyncio.to_thread(self._write_sync, batch, emitted_at)
+
+    async def close(self):
+        await asyncio.to_thread(self._finish)
+
+
+# =========================================
+# 3. 送信と計測
+# =========================================
+
+class LatencyStats:
+    """送信予定時刻からの遅れと、出力先ごとの書き込み時間（1件あたり）の分布"""
+
+    def __init__(self, sample_size: int = 100_000, seed: Optional[int] = None):
+        self.sample_size = sample_size
+        self.seed = seed
+        self.lag = ReservoirSample(sample_size, seed)
+        self.sink_seconds: Dict[str, ReservoirSample] = {}
+        self.max_lag = 0.0
+
+    def add_lag(self, lags: np.ndarray):
+        self.lag.update(lags)
+        if len(lags):
+            self.max_lag = max(self.max_lag, float(lags.max()))
+
+    def add_sink(self, name: str, seconds: float):
+        if name not in self.sink_seconds:
+            self.sink_seconds[name] = ReservoirSample(self.sample_size, self.seed)
+        self.sink_seconds[name].update([seconds])
+
+    @staticmethod
+    def _percentiles_ms(sample: ReservoirSample) -> Dict[str, float]:
+        values = sample.sample().astype(float)
+        if not len(values):
+            return {}
+        p50, p95, p99 = np.percentile(values, [50, 95, 99]) * 1000
+        return {'p50_ms': round(p50, 2), 'p95_ms': round(p95, 2), 'p99_ms': round(p99, 2)}
+
+    def summary(self) -> Dict[str, Any]:
+        lag = self._percentiles_ms(self.lag)
+        lag['max_ms'] = round(self.max_lag * 1000, 2)
+        return {
+            'lag': lag,
+            'sink_write': {name: self._percentiles_ms(sample) for name, sample in self.sink_seconds.items()},
+        }
+
+
+class PosStreamSimulator:
+    """
+    SaleEventGenerator のイベントを送信予定時刻に合わせて出力先へ送る
+
+    送信予定時刻 = 開始時刻 + シミュレーション経過秒 / 早送り倍率。
+    予定時刻が tick 秒以内のイベントはまとめて1回で送る（1件ずつ sleep しない）。
+    paced=False の場合は待たずに出力先が受け付けられる速さで送る。
+    """
+
+    def __init__(self, generator: SaleEventGenerator, sinks: List[EventSink], paced: bool = True,
+                 tick: float = DEFAULT_TICK, max_slice_events: int = 10_000, report_interval: float = 5.0):
+        self.generator = generator
+        self.sinks = sinks
+        self.paced = paced
+        self.tick = tick
+        self.max_slice_events = max_slice_events
+        self.report_interval = report_interval
+        self.stats = LatencyStats()
+        self.events = 0
+        self._stopping = False
+
+    def stop(self):
+        """送信を止める（run() は現在のまとまりを送った後に戻る）"""
+        self._stopping = True
+
+    async def _write(self, sink: EventSink, batch: EventBatch, emitted_at: float):
+        start = time.perf_counter()
+        await sink.write(batch, emitted_at)
+        self.stats.add_sink(sink.name, (time.perf_counter() - start) / max(len(batch), 1))
+
+    def _report(self, wall_elapsed: float, last_offset: float, window_events: int, window_seconds: float):
+        lag = self.stats.summary()['lag']
+        sim_time = self.generator.start + timedelta(seconds=last_offset)
+        print(f"📈 {self.events:,}件 ({window_events / max(window_seconds, 1e-9):,.0f}件/秒) "
+              f"経過{wall_elapsed:.0f}秒 シミュレーション時刻 {sim_time:%Y-%m-%d %H:%M:%S} "
+              f"遅れ p95 {lag.get('p95_ms', '-')}ms")
+
+    async def run(self, duration: float = None, max_events: int = None) -> Dict[str, Any]:
+        """
+        イベントを送り続ける
+
+        Args:
+            duration (float): 実時間での送信時間（秒、None=無制限）
+            max_events (int): 送信するイベント数の上限（None=無制限）
+
+        Returns:
+            Dict[str, Any]: 送信件数・平均レート・遅れと書き込み時間の分布
+        """
+        loop = asyncio.get_running_loop()
+        for sink in self.sinks:
+            await sink.start()
+
+        wall_start = loop.time()
+        last_report, report_events = wall_start, 0
+        last_offset = 0.0
+        try:
+            for batch in self.generator.batches():
+                schedule = wall_start + batch.offsets / self.generator.acceleration
+                i = 0
+                while i < len(batch):
+                    now = loop.time()
+                    if self._stopping or (duration is not None and now - wall_start >= duration):
+                        return self.summary(now - wall_start)
+                    if self.paced and schedule[i] > now:
+                        await asyncio.sleep(min(schedule[i] - now, 0.5))
+                        continue
+
+                    j = int(np.searchsorted(schedule, now + self.tick, side='right')) if self.paced else len(batch)
+                    j = min(max(j, i + 1), i + self.max_slice_events)
+                    if max_events is not None:
+                        j = min(j, i + max_events - self.events)
+                    chunk = batch.slice(i, j)
+                    if self.paced:
+                        self.stats.add_lag(np.maximum(now - schedule[i:j], 0.0))
+                    await asyncio.gather(*(self._write(sink, chunk, time.time()) for sink in self.sinks))
+                    if not self.paced:
+                        await asyncio.sleep(0)  # 他のタスク（ソケットの接続受付など）に順番を回す
+
+                    self.events += j - i
+                    last_offset = float(batch.offsets[j - 1])
+                    i = j
+                    if max_events is not None and self.events >= max_events:
+                        return self.summary(loop.time() - wall_start)
+                    if self.report_interval and now - last_report >= self.report_interval:
+                        self._report(now - wall_start, last_offset, self.events - report_events, now - last_report)
+                        last_report, report_events = now, self.events
+        finally:
+            for sink in self.sinks:
+                await sink.close()
+
+    def summary(self, wall_seconds: float) -> Dict[str, Any]:
+        """送信結果のまとめ"""
+        return {
+            'events': self.events,
+            'wall_seconds': round(wall_seconds, 3),
+            'events_per_second': round(self.events / wall_seconds, 1) if wall_seconds > 0 else None,
+            **self.stats.summary(),
+        }
+
+
+def _host_port(text: str):
+    host, _, port = text.rpartition(':')
+    return host or '127.0.0.1', int(port)
+
+
+def main():
+    """メイン関数"""
+    parser = argparse.ArgumentParser(description='POS売上イベントのリアルタイム・シミュレーター')
+    parser.add_argument('--rate', type=float, default=1000.0, help='平均の送信レート（件/秒）')
+    parser.add_argument('--acceleration', type=float, default=60.0, help='時間の早送り倍率')
+    parser.add_argument('--profile', choices=['business', 'flat'], default='business',
+                        help='発生の時間帯分布（business=営業時間・曜日の重み, flat=一定）')
+    parser.add_argument('--start', help='シミュレーション開始時刻（例: "2025-01-31 19:00"、省略時は今日の19時）')
+    parser.add_argument('--duration', type=float, help='送信時間（秒）')
+    parser.add_argument('--max-events', type=int, help='送信するイベント数の上限')
+    parser.add_argument('--no-pace', action='store_true', help='送信予定時刻を待たずに最大速度で送る')
+    parser.add_argument('--customers', type=int, default=500, help='顧客数')
+    parser.add_argument('--casts', type=int, default=30, help='キャスト数')
+    parser.add_argument('--stores', type=int, default=1, help='店舗数')
+    parser.add_argument('--skew', choices=['pareto', 'zipf', 'uniform'], default='pareto')
+    parser.add_argument('--seed', type=int, help='乱数シード')
+    parser.add_argument('--socket', help='HOST:PORT で待ち受けて接続したクライアントへ配信')
+    parser.add_argument('--connect', help='HOST:PORT の取り込みサーバーへ接続して送信')
+    parser.add_argument('--output-dir', help='切り替わるファイルの出力先フォルダ')
+    parser.add_argument('--file-format', choices=['jsonl', 'csv'], default='jsonl')
+    parser.add_argument('--rotate-events', type=int, default=100_000, help='1ファイルのイベント数の上限')
+    parser.add_argument('--rotate-seconds', type=float, default=60.0, help='ファイルを切り替える間隔（秒）')
+    parser.add_argument('--report-interval', type=float, default=5.0, help='途中経過を表示する間隔（秒）')
+    args = parser.parse_args()
+
+    customers_df = generate_customers(args.customers, args.stores, seed=args.seed)
+    casts_df = generate_casts(args.casts, args.stores, seed=None if args.seed is None else args.seed + 1)
+    start = datetime.strptime(args.start, '%Y-%m-%d %H:%M') if args.start else None
+    generator = SaleEventGenerator(customers_df, casts_df, args.rate, args.acceleration, start,
+                                   args.profile, args.skew, seed=None if args.seed is None else args.seed + 2)
+
+    sinks: List[EventSink] = []
+    if args.socket:
+        sinks.append(SocketSink(*_host_port(args.socket), listen=True))
+    if args.connect:
+        sinks.append(SocketSink(*_host_port(args.connect), listen=False))
+    if args.output_dir:
+        sinks.append(RotatingFileSink(args.output_dir, file_format=args.file_format,
+                                      max_events=args.rotate_events, max_seconds=args.rotate_seconds))
+    if not sinks:
+        sinks.append(CountingSink())
+
+    simulator = PosStreamSimulator(generator, sinks, paced=not args.no_pace, report_interval=args.report_interval)
+    print(f"🍸 POSイベントを送信します: 平均{args.rate:,.0f}件/秒, {args.acceleration:g}倍速, "
+          f"開始 {generator.start:%Y-%m-%d %H:%M} (Ctrl+Cで停止)")
+    try:
+        summary = asyncio.run(simulator.run(args.duration, args.max_events))
+    except KeyboardInterrupt:
+        summary = simulator.summary(float('nan'))
+    print(json.dumps(summary, ensure_ascii=False, indent=2, default=str))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,280 @@
+"""
+前処理操作の計測モジュール
+Description: 前処理の各操作について実行時間・CPU時間・行数・メモリ量・ピークメモリ増分を記録し、
+             必要に応じてcProfile / py-spyでプロファイルを取得する。
+             ピークメモリ増分は操作ごとに別スレッドでRSSを一定間隔で測り、開始時のRSSとの差で求める
+             （ru_maxrss はプロセス全体の最大値のため、過去の操作より小さいピークを測れない）
+"""
+
+import cProfile
+import functools
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+RSS_SAMPLE_INTERVAL = 0.01
+
+
+def peak_rss_bytes(children: bool = False) -> Optional[int]:
+    """
+    現在のプロセス（または終了済み子プロセス）のピークRSSをバイトで返す
+
+    Args:
+        children (bool): Trueなら終了済み子プロセスの最大値を返す
+
+    Returns:
+        Optional[int]: ピークRSS（取得できない環境ではNone）
+    """
+    if resource is not None:
+        who = resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF
+        max_rss = resource.getrusage(who).ru_maxrss
+        # Linuxはキロバイト、macOSはバイト
+        return max_rss if sys.platform == 'darwin' else max_rss * 1024
+
+    if children:
+        return None
+    try:
+        import psutil
+        return getattr(psutil.Process().memory_info(), 'peak_wset', None)
+    except ImportError:
+        return None
+
+
+def current_rss_bytes() -> Optional[int]:
+    """現在のRSSをバイトで返す（取得できない環境ではNone）"""
+    if sys.platform.startswith('linux'):
+        try:
+            with open('/proc/self/statm', 'r') as f:
+                return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+        except (OSError, ValueError):
+            pass
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        return None
+
+
+class RssSampler:
+    """
+    別スレッドで RSS を一定間隔で測り、期間中の最大値を記録するクラス
+
+    間隔より短い一時的な確保を取りこぼさないよう、期間中に ru_maxrss が更新された場合はその値も使う。
+    """
+
+    def __init__(self, interval: float = RSS_SAMPLE_INTERVAL):
+        self.interval = interval
+        self.start_rss = None
+        self.peak_rss = None
+        self._lifetime_peak = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self) -> 'RssSampler':
+        self.start_rss = self.peak_rss = current_rss_bytes()
+        self._lifetime_peak = peak_rss_bytes()
+        if self.start_rss is not None:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+        return self
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def _sample(self):
+        rss = current_rss_bytes()
+        if rss is not None and rss > self.peak_rss:
+            self.peak_rss = rss
+
+    def stop(self) -> Optional[int]:
+        """計測を終えて、開始時のRSSからのピーク増分を返す"""
+        if self._thread is None:
+            return None
+        self._stop.set()
+        self._thread.join()
+        self._sample()
+        lifetime_peak = peak_rss_bytes()
+        if lifetime_peak is not None and self._lifetime_peak is not None and lifetime_peak > self._lifetime_peak:
+            self.peak_rss = max(self.peak_rss, lifetime_peak)
+        return self.peak_rss - self.start_rss
+
+
+def _frame_size(owner: Any) -> Dict[str, Optional[int]]:
+    """対象オブジェクトの data / data_info から行数・列数・メモリ量を取得"""
+    data = getattr(owner, 'data', None)
+    data_info = getattr(owner, 'data_info', None) or {}
+    memory_usage = data_info.get('memory_usage')
+    return {
+        'rows': len(data) if data is not None else 0,
+        'columns': len(data.columns) if data is not None else 0,
+        'bytes': int(memory_usage) if memory_usage is not None and data is not None else None,
+    }
+
+
+class ProcessingMetrics:
+    """
+    前処理操作ごとの計測結果を保持するクラス
+
+    各レコードは以下のキーを持つ辞書:
+        operation, started_at, status, wall_s, cpu_s,
+        rows_in, rows_out, columns_in, columns_out,
+        bytes_in, bytes_out, peak_rss_delta_bytes, profile_path
+
+    peak_rss_delta_bytes は操作中のRSSの最大値と操作開始時のRSSの差。
+    """
+
+    def __init__(self):
+        self.records = []
+        self.profile_mode = None
+        self.profile_dir = None
+
+    def enable_profiling(self, mode: str = 'cprofile', output_dir: str = 'profiles'):
+        """
+        操作ごとのプロファイル取得を有効にする
+
+        Args:
+            mode (str): 'cprofile'（標準ライブラリ） または 'py-spy'（要インストール、Linuxでは要root権限）
+            output_dir (str): プロファイル出力先ディレクトリ
+        """
+        if mode not in ('cprofile', 'py-spy'):
+            raise ValueError(f"サポートされていないプロファイルモード: {mode}")
+        if mode == 'py-spy' and shutil.which('py-spy') is None:
+            raise RuntimeError("py-spy が見つかりません (pip install py-spy)")
+        os.makedirs(output_dir, exist_ok=True)
+        self.profile_mode = mode
+        self.profile_dir = output_dir
+
+    def disable_profiling(self):
+        """プロファイル取得を無効にする"""
+        self.profile_mode = None
+
+    def _profile_path(self, operation: str) -> str:
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+        extension = 'prof' if self.profile_mode == 'cprofile' else 'speedscope.json'
+        return os.path.join(self.profile_dir, f"{operation}_{timestamp}.{extension}")
+
+    @contextmanager
+    def measure(self, operation: str, owner: Any):
+        """
+        with文の中の処理を1操作として計測する
+
+        Args:
+            operation (str): 操作名
+            owner (Any): data / data_info 属性を持つ処理対象（前処理クラスやGUI）
+        """
+        before = _frame_size(owner)
+        sampler = RssSampler().start()
+        record = {
+            'operation': operation,
+            'started_at': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            'status': 'ok',
+            'profile_path': None,
+        }
+
+        profiler = None
+        spy_process = None
+        if self.profile_mode == 'cprofile':
+            record['profile_path'] = self._profile_path(operation)
+            profiler = cProfile.Profile()
+            profiler.enable()
+        elif self.profile_mode == 'py-spy':
+            record['profile_path'] = self._profile_path(operation)
+            spy_process = subprocess.Popen(
+                ['py-spy', 'record', '--pid', str(os.getpid()), '--format', 'speedscope',
+                 '--output', record['profile_path']],
+                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+        wall_start, cpu_start = time.perf_counter(), time.process_time()
+        try:
+            yield record
+        except Exception:
+            record['status'] = 'error'
+            raise
+        finally:
+            record['wall_s'] = time.perf_counter() - wall_start
+            record['cpu_s'] = time.process_time() - cpu_start
+
+            if profiler is not None:
+                profiler.disable()
+                profiler.dump_stats(record['profile_path'])
+            if spy_process is not None:
+                if sys.platform == 'win32':
+                    spy_process.terminate()
+                else:
+                    spy_process.send_signal(signal.SIGINT)
+                spy_process.wait()
+
+            peak_delta = sampler.stop()
+            after = _frame_size(owner)
+            record.update({
+                'rows_in': before['rows'],
+                'rows_out': after['rows'],
+                'columns_in': before['columns'],
+                'columns_out': after['columns'],
+                'bytes_in': before['bytes'],
+                'bytes_out': after['bytes'],
+                'peak_rss_delta_bytes': peak_delta,
+            })
+            self.records.append(record)
+
+    def reset(self):
+        """計測結果をクリア"""
+        self.records = []
+
+    def get_records(self) -> List[Dict[str, Any]]:
+        """計測結果を取得"""
+        return [record.copy() for record in self.records]
+
+    def to_dataframe(self):
+        """計測結果をDataFrameで取得"""
+        import pandas as pd
+        return pd.DataFrame(self.records)
+
+    def format_lines(self) -> List[str]:
+        """計測結果を表示用の文字列リストに整形"""
+        def mb(value: Optional[int]) -> str:
+            return f"{value / 1024 / 1024:.1f}" if value is not None else '-'
+
+        lines = [f"{'操作':<26} {'時間(s)':>8} {'CPU(s)':>8} {'行数(前→後)':>24} "
+                 f"{'メモリMB(前→後)':>18} {'ピーク増分MB':>10}"]
+        for r in self.records:
+            rows = f"{r['rows_in']:,}→{r['rows_out']:,}"
+            memory = f"{mb(r['bytes_in'])}→{mb(r['bytes_out'])}"
+            status = '' if r['status'] == 'ok' else ' ❌'
+            lines.append(f"{r['operation']:<26} {r['wall_s']:>8.3f} {r['cpu_s']:>8.3f} {rows:>24} "
+                         f"{memory:>18} {mb(r['peak_rss_delta_bytes']):>10}{status}")
+        total_wall = sum(r['wall_s'] for r in self.records)
+        lines.append(f"{'合計':<26} {total_wall:>8.3f}")
+        return lines
+
+
+def track_operation(func: Callable) -> Callable:
+    """
+    メソッドを1操作として計測するデコレータ
+
+    デコレート対象のクラスは metrics (ProcessingMetrics) 属性を持つこと。
+    さらに recipe (list) 属性を持ち、メソッド名が RECIPE_OPERATIONS に含まれる場合は、
+    成功した呼び出しを {'operation', 'args', 'kwargs'} としてレシピに記録する。
+    """
+    @functools.wraps(func)
+    def wrapper(self, *args, **kwargs):
+        with self.metrics.measure(func.__name__, self):
+            result = func(self, *args, **kwargs)
+        recipe = getattr(self, 'recipe', None)
+        if recipe is not None and func.__name__ in getattr(self, 'RECIPE_OPERATIONS', ()):
+            recipe.append({'operation': func.__name__, 'args': list(args), 'kwargs': dict(kwargs)})
+        return result
+    return wrapper
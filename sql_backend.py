@@ -0,0 +1,605 @@
+"""
+組み込みSQLエンジンによる前処理バックエンド
+Description: データを組み込みのローカルSQLエンジン（DuckDB、なければ標準ライブラリのSQLite）に渡し、
+             filter_data / remove_duplicates / rename_columns / fill_missing_values と集計をSQLのビューとして積み重ねる。
+             各操作ではデータを読まず、最後に materialize() / save() した時点で1回だけ実行されるため、
+             大きなCSV/Parquetでも絞り込み・集計後の結果だけがメモリに載る
+
+使用例:
+    backend = SQLPreprocessor('sales_history.parquet')
+    backend.filter_data({'total_amount': {'operator': '>=', 'value': 10000}})
+    backend.remove_duplicates(subset=['sale_id'])
+    summary = backend.summarize(['sale_date'], {'total_amount': ['sum', 'mean']})
+    df = backend.materialize()                   # 結果だけを DataFrame にする
+    processor = backend.to_preprocessor()        # 続きは TableauDataPreprocessor で
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import os
+import re
+import shutil
+import sqlite3
+import tempfile
+from datetime import date, datetime
+from typing import Any, Dict, List, Union
+
+from lazy_imports import lazy_import
+from processing_metrics import ProcessingMetrics, track_operation
+
+pd = lazy_import('pandas')
+np = lazy_import('numpy')
+
+ROW_ORDER = '__row_order'
+SQLITE_LOAD_CHUNK_ROWS = 100_000
+
+# 集計関数名 -> SQL（{col} に列名が入る）
+AGGREGATIONS = {
+    'sum': 'SUM({col})',
+    'mean': 'AVG({col})',
+    'min': 'MIN({col})',
+    'max': 'MAX({col})',
+    'count': 'COUNT({col})',
+    'nunique': 'COUNT(DISTINCT {col})',
+    'median': 'MEDIAN({col})',  # DuckDBのみ
+}
+
+
+# =========================================
+# 1. SQLの組み立て
+# =========================================
+
+def quote_identifier(name: str) -> str:
+    """列名・ビュー名をSQL用に引用符で囲む"""
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+def sql_literal(value: Any) -> str:
+    """Pythonの値をSQLのリテラルにする（ビューにはバインド変数を使えないため）"""
+    if isinstance(value, np.generic):
+        value = value.item()
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return 'NULL'
+    if isinstance(value, bool):
+        return 'TRUE' if value else 'FALSE'
+    if isinstance(value, (int, float)):
+        if isinstance(value, float) and math.isinf(value):
+            raise ValueError(f"無限大はSQLのリテラルにできません: {value}")
+        return repr(value)
+    if isinstance(value, (datetime, date)):
+        value = value.isoformat(sep=' ') if isinstance(value, datetime) else value.isoformat()
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def _is_utf8(path: str, probe_bytes: int = 1024 * 1024) -> bool:
+    """ファイルの先頭がUTF-8として読めるか（DuckDBのCSV読み込みはUTF-8のみ対応）"""
+    import codecs
+
+    with open(path, 'rb') as f:
+        head = f.read(probe_bytes)
+    try:
+        codecs.getincrementaldecoder('utf-8')().decode(head, final=False)
+        return True
+    except UnicodeDecodeError:
+        return False
+
+
+def _regexp(pattern: str, value: Any) -> bool:
+    """SQLite用の REGEXP 関数（pandas の str.contains と同じく正規表現で部分一致）"""
+    return value is not None and re.search(pattern, str(value)) is not None
+
+
+# =========================================
+# 2. バックエンド
+# =========================================
+
+class SQLPreprocessor:
+    """
+    前処理の操作をSQLのビューとして積み重ねるクラス
+
+    操作ごとに直前のビューを元にした新しいビュー（step_1, step_2, ...）を作るだけで、
+    データの読み込み・計算は materialize() / save() / summarize() の実行時に行われる。
+    行の順序は元データの順序（隠し列 __row_order）で保つ。
+    """
+
+    def __init__(self, source: Union[str, 'pd.DataFrame'], engine: str = 'auto', database: str = None):
+        """
+        初期化
+
+        Args:
+            source: CSV / Parquet / Excel のパス、または DataFrame
+            engine (str): 'auto'（DuckDB、なければSQLite）, 'duckdb', 'sqlite'
+            database (str): データベースファイル（None=一時フォルダに作成し、close() で削除）
+        """
+        self.engine = self._resolve_engine(engine)
+        self.data = None
+        self.data_info = {}
+        self.processing_log = []
+        self.metrics = ProcessingMetrics()
+        self.file_path = source if isinstance(source, str) else None
+        self._steps = 0
+        self._temp_dir = None
+
+        if database is None:
+            # :memory: では読み込んだデータがすべてメモリに載るため、一時ファイルに置く
+            self._temp_dir = tempfile.mkdtemp(prefix='sql_backend_')
+            database = os.path.join(self._temp_dir, f"backend.{self.engine}")
+        if self.engine == 'duckdb':
+            import duckdb
+            self.connection = duckdb.connect(database)
+        else:
+            self.connection = sqlite3.connect(database, check_same_thread=False)
+            self.connection.create_function('REGEXP', 2, _regexp, deterministic=True)
+
+        self.current = self._load_source(source)
+        self.columns = self._view_columns(self.current)
+        self._log_action(f"SQLバックエンド ({self.engine}) に登録: "
+                         f"{os.path.basename(source) if isinstance(source, str) else 'DataFrame'}")
+
+    @staticmethod
+    def _resolve_engine(engine: str) -> str:
+        if engine not in ('auto', 'duckdb', 'sqlite'):
+            raise ValueError(f"サポートされていないエンジン: {engine}")
+        if engine == 'sqlite':
+            return engine
+        try:
+            import duckdb  # noqa: F401
+            return 'duckdb'
+        except ImportError:
+            if engine == 'duckdb':
+                raise ImportError("DuckDBがインストールされていません: pip install duckdb")
+            return 'sqlite'
+
+    @property
+    def text_type(self) -> str:
+        return 'VARCHAR' if self.engine == 'duckdb' else 'TEXT'
+
+    def _execute(self, sql: str):
+        return self.connection.execute(sql)
+
+    def _query_frame(self, sql: str) -> 'pd.DataFrame':
+        if self.engine == 'duckdb':
+            return self.connection.execute(sql).df()
+        return pd.read_sql_query(sql, self.connection)
+
+    def _view_columns(self, view: str) -> List[str]:
+        cursor = self._execute(f"SELECT * FROM {quote_identifier(view)} LIMIT 0")
+        return [desc[0] for desc in cursor.description if desc[0] != ROW_ORDER]
+
+    def _load_source(self, source: Union[str, 'pd.DataFrame']) -> str:
+        """
+        元データを登録
+
+        DuckDBでは UTF-8 のCSVとParquetはファイルを直接参照し、DataFrameはコピーせずに参照する。
+        それ以外はチャンクごとにデータベースのテーブルへ追記する（全体をメモリに載せない）。
+        """
+        if isinstance(source, str):
+            if not os.path.exists(source):
+                raise FileNotFoundError(f"ファイルが見つかりません: {source}")
+            extension = os.path.splitext(source)[1].lower()
+            if self.engine == 'duckdb' and (extension == '.parquet' or extension == '.csv' and _is_utf8(source)):
+                reader = 'read_parquet' if extension == '.parquet' else 'read_csv_auto'
+                self._execute(f"CREATE TEMP VIEW source AS SELECT *, row_number() OVER () AS {ROW_ORDER} "
+                              f"FROM {reader}({sql_literal(source)})")
+                return 'source'
+            frames = self._iter_source_frames(source, extension)
+        elif self.engine == 'duckdb':
+            self.connection.register('source_frame', source)
+            self._execute(f"CREATE TEMP VIEW source AS SELECT *, row_number() OVER () AS {ROW_ORDER} FROM source_frame")
+            return 'source'
+        else:
+            frames = [source]
+
+        for i, frame in enumerate(frames):
+            if self.engine == 'duckdb':
+                self.connection.register('source_chunk', frame)
+                self._execute("CREATE TABLE source_table AS SELECT * FROM source_chunk" if i == 0
+                              else "INSERT INTO source_table SELECT * FROM source_chunk")
+                self.connection.unregister('source_chunk')
+            else:
+                frame.to_sql('source_table', self.connection, if_exists='append', index=False)
+        self._execute(f"CREATE TEMP VIEW source AS SELECT *, rowid AS {ROW_ORDER} FROM source_table")
+        return 'source'
+
+    def _iter_source_frames(self, path: str, extension: str):
+        """ファイルをチャンクごとに読み込む"""
+        if extension == '.csv':
+            from multi_file_loader import CSV_ENCODINGS
+            for encoding in CSV_ENCODINGS:
+                try:
+                    # 先頭だけ読んでエンコーディングを確かめる
+                    pd.read_csv(path, encoding=encoding, nrows=1000)
+                except UnicodeDecodeError:
+                    continue
+                return pd.read_csv(path, encoding=encoding, chunksize=SQLITE_LOAD_CHUNK_ROWS)
+            return pd.read_csv(path, encoding='utf-8', encoding_errors='ignore', chunksize=SQLITE_LOAD_CHUNK_ROWS)
+        if extension == '.parquet':
+            import pyarrow.parquet as pq
+            parquet = pq.ParquetFile(path)
+            return (batch.to_pandas() for batch in parquet.iter_batches(batch_size=SQLITE_LOAD_CHUNK_ROWS))
+        if extension in ('.xlsx', '.xls'):
+            return [pd.read_excel(path)]
+        raise ValueError(f"サポートされていないファイル形式: {extension}")
+
+    def _add_step(self, select_sql: str, action: str):
+        """直前のビューを元にした新しいビューを作る"""
+        self._steps += 1
+        view = f"step_{self._steps}"
+        self._execute(f"CREATE TEMP VIEW {view} AS {select_sql}")
+        self.current = view
+        self.columns = self._view_columns(view)
+        self._log_action(action)
+
+    def _select_list(self, expressions: Dict[str, str] = None) -> str:
+        """列の一覧（expressions で列ごとの式を置き換える）と並び順の列"""
+        expressions = expressions or {}
+        items = [f"{expressions[col]} AS {quote_identifier(col)}" if col in expressions else quote_identifier(col)
+                 for col in self.columns]
+        return ', '.join(items + [ROW_ORDER])
+
+    def _log_action(self, action: str):
+        """処理ログを記録"""
+        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        self.processing_log.append(f"[{timestamp}] {action}")
+        print(f"📝 {action}")
+
+    # -----------------------------------------
+    # 前処理の操作（TableauDataPreprocessor と同じ引数）
+    # -----------------------------------------
+
+    def _condition_sql(self, column: str, operator: str, value: Any) -> str:
+        col = quote_identifier(column)
+        as_text = f"CAST({col} AS {self.text_type})"
+        values = value if isinstance(value, list) else [value]
+        in_list = ', '.join(sql_literal(v) for v in values)
+
+        if operator in ('>', '<', '>=', '<='):
+            return f"{col} {operator} {sql_literal(value)}"
+        if operator == '==':
+            return f"{col} = {sql_literal(value)}"
+        if operator == '!=':
+            # pandas では欠損値も「等しくない」に含まれる
+            return f"({col} IS NULL OR {col} <> {sql_literal(value)})"
+        if operator == 'contains':
+            if self.engine == 'duckdb':
+                return f"coalesce(regexp_matches({as_text}, {sql_literal(value)}), FALSE)"
+            return f"coalesce({as_text} REGEXP {sql_literal(value)}, FALSE)"
+        if operator in ('startswith', 'endswith'):
+            # SQLiteの LIKE は大文字・小文字を区別しないため、文字列の一部を比較する
+            text = str(value)
+            if not text:
+                return f"{col} IS NOT NULL"
+            if self.engine == 'duckdb':
+                func = 'starts_with' if operator == 'startswith' else 'ends_with'
+                return f"coalesce({func}({as_text}, {sql_literal(text)}), FALSE)"
+            start = '1' if operator == 'startswith' else f"-{len(text)}"
+            return f"coalesce(substr({as_text}, {start}, {len(text)}) = {sql_literal(text)}, FALSE)"
+        if operator == 'in':
+            return f"{col} IN ({in_list})" if values else '1 = 0'
+        if operator == 'notin':
+            return f"({col} IS NULL OR {col} NOT IN ({in_list}))" if values else '1 = 1'
+        if operator == 'isnull':
+            return f"{col} IS NULL"
+        if operator == 'notnull':
+            return f"{col} IS NOT NULL"
+        raise ValueError(f"サポートされていない演算子: {operator}")
+
+    @track_operation
+    def filter_data(self, conditions: Dict[str, Any]) -> 'SQLPreprocessor':
+        """
+        データをフィルタリング（条件は TableauDataPreprocessor.filter_data と同じ形式）
+
+        Args:
+            conditions (dict): フィルタ条件 {'列名': {'operator': '>', 'value': 100}, ...}
+
+        Returns:
+            SQLPreprocessor: 自分自身（操作をつなげて書ける）
+        """
+        clauses = []
+        for column, condition in conditions.items():
+            if column not in self.columns:
+                print(f"⚠️ 列 '{column}' が見つかりません")
+                continue
+            try:
+                clauses.append(self._condition_sql(column, condition.get('operator', '=='), condition.get('value')))
+            except ValueError as e:
+                print(f"⚠️ フィルタ条件の適用に失敗 ({column}): {e}")
+
+        where = ' AND '.join(f"({clause})" for clause in clauses) or '1 = 1'
+        self._add_step(f"SELECT * FROM {quote_identifier(self.current)} WHERE {where}",
+                       f"データフィルタ (SQL): {len(clauses)}条件")
+        return self
+
+    @track_operation
+    def remove_duplicates(self, subset: List[str] = None, keep: str = 'first') -> 'SQLPreprocessor':
+        """
+        重複行を削除
+
+        Args:
+            subset (List[str]): 重複チェックする列名のリスト（None=全列）
+            keep (str): 保持する重複行 ('first', 'last', False)
+        """
+        partition = ', '.join(quote_identifier(col) for col in (subset or self.columns))
+        source = quote_identifier(self.current)
+        if keep is False:
+            inner = f"SELECT *, COUNT(*) OVER (PARTITION BY {partition}) AS __dup_count FROM {source}"
+            where = '__dup_count = 1'
+        elif keep in ('first', 'last'):
+            order = 'ASC' if keep == 'first' else 'DESC'
+            inner = (f"SELECT *, row_number() OVER (PARTITION BY {partition} ORDER BY {ROW_ORDER} {order}) "
+                     f"AS __dup_rank FROM {source}")
+            where = '__dup_rank = 1'
+        else:
+            raise ValueError(f"keep には 'first', 'last', False のいずれかを指定してください: {keep}")
+
+        self._add_step(f"SELECT {self._select_list()} FROM ({inner}) AS t WHERE {where}",
+                       f"重複行削除 (SQL): keep={keep}")
+        return self
+
+    @track_operation
+    def rename_columns(self, column_mapping: Dict[str, str]) -> 'SQLPreprocessor':
+        """
+        列名を変更
+
+        Args:
+            column_mapping (dict): 列名マッピング {'old_name': 'new_name'}
+        """
+        items = [f"{quote_identifier(col)} AS {quote_identifier(column_mapping.get(col, col))}"
+                 for col in self.columns]
+        renamed = len([col for col in column_mapping if col in self.columns])
+        self._add_step(f"SELECT {', '.join(items + [ROW_ORDER])} FROM {quote_identifier(self.current)}",
+                       f"列名変更 (SQL): {renamed}列変更")
+        return self
+
+    def _numeric_columns(self) -> List[str]:
+        sample = self._query_frame(f"SELECT * FROM {quote_identifier(self.current)} LIMIT 1000")
+        return [col for col in self.columns if pd.api.types.is_numeric_dtype(sample[col])
+                and not pd.api.types.is_bool_dtype(sample[col])]
+
+    def _scalar(self, sql: str) -> Any:
+        row = self._execute(sql).fetchone()
+        return row[0] if row else None
+
+    @track_operation
+    def fill_missing_values(self, strategy: str = 'forward', custom_value: Any = None,
+                            columns: List[str] = None) -> 'SQLPreprocessor':
+        """
+        欠損値を埋める
+
+        forward / backward は「直前（直後）の非欠損値までの欠損」を1グループとして窓関数で埋める。
+        mean / median / mode は先に集計値だけを求めてから COALESCE で埋める。
+
+        Args:
+            strategy (str): 'forward', 'backward', 'mean', 'median', 'mode', 'zero', 'custom'
+            custom_value (Any): カスタム値（strategy='custom'の場合）
+            columns (List[str]): 処理する列名のリスト（None=全列）
+        """
+        targets = [col for col in (columns or self.columns) if col in self.columns]
+        source = quote_identifier(self.current)
+
+        if strategy in ('forward', 'backward'):
+            order = 'ASC' if strategy == 'forward' else 'DESC'
+            groups = ', '.join(f"COUNT({quote_identifier(col)}) OVER (ORDER BY {ROW_ORDER} {order}) AS __fill_group_{i}"
+                               for i, col in enumerate(targets))
+            expressions = {col: (f"FIRST_VALUE({quote_identifier(col)}) OVER "
+                                 f"(PARTITION BY __fill_group_{i} ORDER BY {ROW_ORDER} {order})")
+                           for i, col in enumerate(targets)}
+            inner = f"SELECT *, {groups} FROM {source}" if targets else f"SELECT * FROM {source}"
+            select_sql = f"SELECT {self._select_list(expressions)} FROM ({inner}) AS t"
+        else:
+            if strategy in ('mean', 'median'):
+                numeric = set(self._numeric_columns())
+                targets = [col for col in targets if col in numeric]
+            fill_values = {}
+            for col in targets:
+                q = quote_identifier(col)
+                if strategy == 'mean':
+                    fill_values[col] = self._scalar(f"SELECT AVG({q}) FROM {source}")
+                elif strategy == 'median':
+                    fill_values[col] = self._median(col)
+                elif strategy == 'mode':
+                    fill_values[col] = self._scalar(f"SELECT {q} FROM {source} WHERE {q} IS NOT NULL "
+                                                    f"GROUP BY {q} ORDER BY COUNT(*) DESC, {q} LIMIT 1")
+                elif strategy == 'zero':
+                    fill_values[col] = 0
+                elif strategy == 'custom':
+                    fill_values[col] = custom_value
+                else:
+                    raise ValueError(f"サポートされていない方法: {strategy}")
+            expressions = {col: f"COALESCE({quote_identifier(col)}, {sql_literal(value)})"
+                           for col, value in fill_values.items() if value is not None}
+            select_sql = f"SELECT {self._select_list(expressions)} FROM {source}"
+
+        self._add_step(select_sql, f"欠損値処理 (SQL): {len(targets)}列 (方法: {strategy})")
+        return self
+
+    def _median(self, col: str) -> Any:
+        q, source = quote_identifier(col), quote_identifier(self.current)
+        if self.engine == 'duckdb':
+            return self._scalar(f"SELECT MEDIAN({q}) FROM {source}")
+        # SQLiteには MEDIAN がないため、中央の1〜2行を取り出して平均する
+        count = self._scalar(f"SELECT COUNT({q}) FROM {source}")
+        if not count:
+            return None
+        return self._scalar(f"SELECT AVG({q}) FROM (SELECT {q} FROM {source} WHERE {q} IS NOT NULL "
+                            f"ORDER BY {q} LIMIT {2 - count % 2} OFFSET {(count - 1) // 2})")
+
+    # -----------------------------------------
+    # 結果の取り出し
+    # -----------------------------------------
+
+    def summarize(self, group_by: List[str], aggregations: Dict[str, List[str]]) -> 'pd.DataFrame':
+        """
+        グループ別の集計（集計結果だけを DataFrame にする）
+
+        Args:
+            group_by (List[str]): グループ化する列
+            aggregations (dict): {'列名': ['sum', 'mean', ...]}（列名は "<列>_<集計>" になる）
+
+        Returns:
+            pd.DataFrame: 集計結果
+        """
+        items = [quote_identifier(col) for col in group_by]
+        for col, funcs in aggregations.items():
+            for func in funcs:
+                if func not in AGGREGATIONS:
+                    raise ValueError(f"サポートされていない集計: {func}（{list(AGGREGATIONS)}）")
+                if func == 'median' and self.engine != 'duckdb':
+                    raise ValueError("SQLiteでは median 集計は使えません（DuckDBをインストールしてください）")
+                items.append(f"{AGGREGATIONS[func].format(col=quote_identifier(col))} "
+                             f"AS {quote_identifier(f'{col}_{func}')}")
+
+        keys = ', '.join(quote_identifier(col) for col in group_by)
+        sql = f"SELECT {', '.join(items)} FROM {quote_identifier(self.current)}"
+        if group_by:
+            sql += f" GROUP BY {keys} ORDER BY {keys}"
+        return self._query_frame(sql)
+
+    def count_rows(self) -> int:
+        """現在の行数"""
+        return int(self._scalar(f"SELECT COUNT(*) FROM {quote_identifier(self.current)}"))
+
+    def _result_sql(self, limit: int = None) -> str:
+        columns = ', '.join(quote_identifier(col) for col in self.columns)
+        sql = f"SELECT {columns} FROM {quote_identifier(self.current)} ORDER BY {ROW_ORDER}"
+        return sql + (f" LIMIT {int(limit)}" if limit is not None else '')
+
+    def preview_data(self, n_rows: int = 10) -> 'pd.DataFrame':
+        """先頭の数行"""
+        return self._query_frame(self._result_sql(n_rows))
+
+    def to_sql(self) -> str:
+        """結果を返すSQL（確認用）"""
+        return self._result_sql()
+
+    @track_operation
+    def materialize(self) -> 'pd.DataFrame':
+        """積み重ねた操作を実行し、結果を DataFrame にする"""
+        self.data = self._query_frame(self._result_sql())
+        self._log_action(f"SQL実行: {len(self.data):,}行 × {len(self.data.columns)}列")
+        return self.data
+
+    def _sqlite_arrow_schema(self):
+        """
+        SQLite の結果の Arrow スキーマ（全行の値の型から決める）
+
+        SQLite の型は値ごとで、チャンクごとに推定すると全て NULL のチャンクなどで型が変わるため、
+        保存前に typeof() で全行を1回集計する。文字列が混ざる列・全て NULL の列は文字列にする。
+        """
+        import pyarrow as pa
+        checks = []
+        for col in self.columns:
+            column = quote_identifier(col)
+            checks += [f"MAX(typeof({column}) IN ('text', 'blob'))", f"MAX(typeof({column}) = 'real')",
+                       f"MAX(typeof({column}) = 'integer')"]
+        row = self._execute(f"SELECT {', '.join(checks)} FROM {quote_identifier(self.current)}").fetchone()
+
+        fields = []
+        for i, col in enumerate(self.columns):
+            has_text, has_real, has_integer = row[3 * i:3 * i + 3]
+            if has_text or not (has_real or has_integer):
+                fields.append((col, pa.string()))
+            else:
+                fields.append((col, pa.float64() if has_real else pa.int64()))
+        return pa.schema(fields)
+
+    @track_operation
+    def save(self, output_path: str) -> str:
+        """
+        結果をファイルに保存（結果全体をメモリに載せずに書き出す）
+
+        Args:
+            output_path (str): 出力ファイル（.csv / .parquet）
+        """
+        parquet = output_path.lower().endswith('.parquet')
+        if self.engine == 'duckdb':
+            options = "(FORMAT PARQUET)" if parquet else "(FORMAT CSV, HEADER)"
+            self._execute(f"COPY ({self._result_sql()}) TO {sql_literal(output_path)} {options}")
+        elif parquet:
+            from parallel_normalize import ParquetSink
+            schema = self._sqlite_arrow_schema()
+            text_columns = [field.name for field in schema if str(field.type) == 'string']
+            integer_columns = [field.name for field in schema if str(field.type) == 'int64']
+            sink = ParquetSink(output_path, schema)
+            try:
+                for chunk in pd.read_sql_query(self._result_sql(), self.connection, chunksize=SQLITE_LOAD_CHUNK_ROWS):
+                    for col in text_columns:
+                        # 数値と文字列が混ざる列は文字列に揃える
+                        chunk[col] = chunk[col].astype(object).where(chunk[col].isna(), chunk[col].astype(str))
+                    for col in integer_columns:
+                        chunk[col] = chunk[col].astype('Int64')  # NULL を含むチャンクは float で読まれる
+                    sink.write(chunk)
+            finally:
+                sink.close()
+        else:
+            header = True
+            for chunk in pd.read_sql_query(self._result_sql(), self.connection, chunksize=SQLITE_LOAD_CHUNK_ROWS):
+                chunk.to_csv(output_path, mode='w' if header else 'a', header=header,
+                             index=False, encoding='utf-8-sig' if header else 'utf-8')
+                header = False
+
+        self._log_action(f"SQL結果を保存: {output_path}")
+        return output_path
+
+    def to_preprocessor(self):
+        """結果を TableauDataPreprocessor に渡す（残りの前処理・Tableau出力は pandas で行う）"""
+        from tableau_preprocessor import TableauDataPreprocessor
+
+        processor = TableauDataPreprocessor()
+        processor.data = self.materialize() if self.data is None else self.data
+        processor.original_data = processor.data.copy()
+        processor.file_path = self.file_path
+        processor.processing_log.extend(self.processing_log)
+        processor._update_data_info()
+        return processor
+
+    def close(self):
+        """接続を閉じる（一時フォルダに作ったデータベースは削除）"""
+        self.connection.close()
+        if self._temp_dir:
+            shutil.rmtree(self._temp_dir, ignore_errors=True)
+            self._temp_dir = None
+
+    def __enter__(self) -> 'SQLPreprocessor':
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def main():
+    """メイン関数"""
+    parser = argparse.ArgumentParser(description='組み込みSQLエンジンでの前処理')
+    parser.add_argument('input', help='入力ファイル（.csv / .parquet / .xlsx）')
+    parser.add_argument('output', help='出力ファイル（.csv / .parquet）')
+    parser.add_argument('--engine', choices=['auto', 'duckdb', 'sqlite'], default='auto')
+    parser.add_argument('--conditions', help='filter_data の条件（JSONファイル）')
+    parser.add_argument('--dedupe', nargs='*', help='重複行を削除（列名を指定した場合はその列で判定）')
+    parser.add_argument('--fill', choices=['forward', 'backward', 'mean', 'median', 'mode', 'zero'],
+                        help='欠損値を埋める方法')
+    parser.add_argument('--rename', help='列名の変更（JSONファイル {"旧": "新"}）')
+    parser.add_argument('--show-sql', action='store_true', help='実行するSQLを表示')
+    args = parser.parse_args()
+
+    with SQLPreprocessor(args.input, engine=args.engine) as backend:
+        if args.conditions:
+            with open(args.conditions, encoding='utf-8') as f:
+                backend.filter_data(json.load(f))
+        if args.dedupe is not None:
+            backend.remove_duplicates(subset=args.dedupe or None)
+        if args.fill:
+            backend.fill_missing_values(args.fill)
+        if args.rename:
+            with open(args.rename, encoding='utf-8') as f:
+                backend.rename_columns(json.load(f))
+        if args.show_sql:
+            print(backend.to_sql())
+        backend.save(args.output)
+        print(f"✅ 保存しました: {args.output} ({backend.count_rows():,}行)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,411 @@
+"""
+ストリーミング正規化モジュール
+Description: 大量データをチャンク単位で1回だけ読み、全数値列の最小値・最大値・平均・分散
+             （Welford / Chan のマージ式）と近似分位点を同時に求める。
+             部分結果はワーカー間でマージでき、2回目の読み込みで Min-Max / Standard / Robust
+             正規化を適用して出力する
+
+使用例:
+    fitter = fit_csv('sales_history.csv')
+    transform_csv('sales_history.csv', 'sales_normalized.csv', fitter, method='standard')
+"""
+
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+SCALING_METHODS = ['minmax', 'standard', 'robust']
+
+DEFAULT_CHUNKSIZE = 200_000
+
+
+class ColumnStatistics:
+    """
+    列ごとの件数・平均・偏差平方和・最小値・最大値を逐次計算するクラス
+
+    チャンク内はNumPyで一括計算し、チャンク間は Chan らの並列アルゴリズムでマージする。
+    欠損値（NaN）は件数に含めない。
+    """
+
+    def __init__(self, n_columns: int):
+        self.count = np.zeros(n_columns)
+        self.mean = np.zeros(n_columns)
+        self.m2 = np.zeros(n_columns)
+        self.min = np.full(n_columns, np.inf)
+        self.max = np.full(n_columns, -np.inf)
+
+    def update(self, values: np.ndarray):
+        """2次元配列（行 × 列）のチャンクを加える"""
+        valid = ~np.isnan(values)
+        count = valid.sum(axis=0).astype(float)
+        if not count.any():
+            return
+        with np.errstate(invalid='ignore', divide='ignore'):
+            total = np.where(valid, values, 0.0).sum(axis=0)
+            mean = np.where(count > 0, total / count, 0.0)
+            m2 = np.where(valid, (values - mean) ** 2, 0.0).sum(axis=0)
+        chunk = ColumnStatistics(len(count))
+        chunk.count, chunk.mean, chunk.m2 = count, mean, m2
+        chunk.min = np.where(count > 0, np.where(valid, values, np.inf).min(axis=0), np.inf)
+        chunk.max = np.where(count > 0, np.where(valid, values, -np.inf).max(axis=0), -np.inf)
+        self.merge(chunk)
+
+    def merge(self, other: 'ColumnStatistics'):
+        """別の集計結果をマージ（Chanの式）"""
+        total = self.count + other.count
+        with np.errstate(invalid='ignore', divide='ignore'):
+            delta = other.mean - self.mean
+            ratio = np.where(total > 0, other.count / total, 0.0)
+            self.mean = self.mean + delta * ratio
+            self.m2 = self.m2 + other.m2 + delta ** 2 * self.count * ratio
+        self.count = total
+        self.min = np.minimum(self.min, other.min)
+        self.max = np.maximum(self.max, other.max)
+
+    @property
+    def variance(self) -> np.ndarray:
+        """母分散（StandardScalerと同じ ddof=0）"""
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(self.count > 0, self.m2 / self.count, np.nan)
+
+    @property
+    def std(self) -> np.ndarray:
+        return np.sqrt(self.variance)
+
+
+class QuantileSketch:
+    """
+    マージ可能な近似分位点スケッチ（KLL方式の簡易版）
+
+    各レベルの保持件数が k を超えたらソートして1つおきに上位レベルへ昇格させる。
+    レベル h の要素は 2**h 件分の重みを持つ。
+    """
+
+    def __init__(self, k: int = 2048, seed: Optional[int] = None):
+        self.k = k
+        self.levels = []
+        self.rng = np.random.default_rng(seed)
+
+    def update(self, values: np.ndarray):
+        """1次元配列の値を加える（NaNは無視）"""
+        values = np.asarray(values, dtype=float)
+        values = values[~np.isnan(values)]
+        if len(values):
+            self._add(0, values)
+            self._compress()
+
+    def _add(self, level: int, values: np.ndarray):
+        while len(self.levels) <= level:
+            self.levels.append(np.empty(0))
+        self.levels[level] = np.concatenate([self.levels[level], values])
+
+    def _compress(self):
+        level = 0
+        while level < len(self.levels):
+            buffer = self.levels[level]
+            if len(buffer) > self.k:
+                buffer = np.sort(buffer)
+                keep = buffer[-1:] if len(buffer) % 2 else np.empty(0)
+                pairs = buffer[:len(buffer) - len(keep)]
+                self.levels[level] = keep
+                self._add(level + 1, pairs[self.rng.integers(2)::2])
+            level += 1
+
+    def merge(self, other: 'QuantileSketch'):
+        """別のスケッチをマージ"""
+        for level, values in enumerate(other.levels):
+            if len(values):
+                self._add(level, values)
+        self._compress()
+
+    @property
+    def count(self) -> int:
+        return int(sum(len(values) << level for level, values in enumerate(self.levels)))
+
+    def quantile(self, q) -> np.ndarray:
+        """
+        近似分位点を取得
+
+        Args:
+            q (float or array-like): 0〜1の分位
+
+        Returns:
+            np.ndarray: 分位点の値（データがなければNaN）
+        """
+        q = np.atleast_1d(np.asarray(q, dtype=float))
+        if not self.count:
+            return np.full(len(q), np.nan)
+        values = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(v), 2.0 ** level) for level, v in enumerate(self.levels)])
+        order = np.argsort(values)
+        values, weights = values[order], weights[order]
+        positions = (np.cumsum(weights) - weights / 2) / weights.sum()
+        return np.interp(q, positions, values)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'k': self.k, 'levels': [values.tolist() for values in self.levels]}
+
+    @classmethod
+    def from_dict(cls, payload: Dict[str, Any]) -> 'QuantileSketch':
+        sketch = cls(payload['k'])
+        sketch.levels = [np.asarray(values, dtype=float) for values in payload['levels']]
+        return sketch
+
+
+class StreamingScalerFitter:
+    """
+    チャンク単位で正規化パラメータを学習するクラス
+
+    1回の読み込みで全列の統計値を求めるため、列数・統計量の数だけファイルを
+    読み直す必要がない。partial_fit() の結果は merge() で結合できる。
+    """
+
+    def __init__(self, columns: List[str] = None, quantiles: bool = True, sketch_size: int = 2048):
+        """
+        初期化
+
+        Args:
+            columns (List[str]): 対象列（None=最初のチャンクの数値列すべて）
+            quantiles (bool): Robust正規化用の分位点スケッチを作るか
+            sketch_size (int): スケッチの各レベルの保持件数（大きいほど高精度）
+        """
+        self.columns = list(columns) if columns is not None else None
+        self.quantiles = quantiles
+        self.sketch_size = sketch_size
+        self.stats = None
+        self.sketches = None
+
+    def _initialize(self):
+        self.stats = ColumnStatistics(len(self.columns))
+        self.sketches = [QuantileSketch(self.sketch_size) for _ in self.columns] if self.quantiles else None
+
+    def partial_fit(self, chunk: pd.DataFrame) -> 'StreamingScalerFitter':
+        """
+        チャンクを学習に加える
+
+        Args:
+            chunk (pd.DataFrame): データの一部
+
+        Returns:
+            StreamingScalerFitter: 自身
+        """
+        if self.columns is None:
+            self.columns = chunk.select_dtypes(include=[np.number]).columns.tolist()
+        if self.stats is None:
+            self._initialize()
+
+        values = chunk[self.columns].to_numpy(dtype=float, na_value=np.nan)
+        self.stats.update(values)
+        if self.sketches is not None:
+            for i, sketch in enumerate(self.sketches):
+                sketch.update(values[:, i])
+        return self
+
+    def merge(self, other: 'StreamingScalerFitter') -> 'StreamingScalerFitter':
+        """別ワーカーの学習結果をマージ"""
+        if other.stats is None:
+            return self
+        if self.stats is None:
+            self.columns = other.columns
+            self._initialize()
+        if other.columns != self.columns:
+            raise ValueError(f"列構成が一致しません: {self.columns} / {other.columns}")
+        self.stats.merge(other.stats)
+        if self.sketches is not None and other.sketches is not None:
+            for sketch, other_sketch in zip(self.sketches, other.sketches):
+                sketch.merge(other_sketch)
+        return self
+
+    def params(self, method: str = 'minmax') -> Dict[str, np.ndarray]:
+        """
+        正規化パラメータを取得（x' = (x - offset) / scale）
+
+        Args:
+            method (str): 'minmax', 'standard', 'robust'
+
+        Returns:
+            Dict[str, np.ndarray]: offset, scale
+        """
+        if self.stats is None:
+            raise ValueError("学習されていません")
+        if method == 'minmax':
+            offset, scale = self.stats.min, self.stats.max - self.stats.min
+        elif method == 'standard':
+            offset, scale = self.stats.mean, self.stats.std
+        elif method == 'robust':
+            if self.sketches is None:
+                raise ValueError("Robust正規化には quantiles=True で学習してください")
+            q25, median, q75 = np.array([sketch.quantile([0.25, 0.5, 0.75]) for sketch in self.sketches]).T
+            offset, scale = median, q75 - q25
+        else:
+            raise ValueError(f"サポートされていない正規化方法: {method}")
+
+        # 幅が0の列はsklearnと同様にscale=1として扱う
+        scale = np.where((scale == 0) | ~np.isfinite(scale), 1.0, scale)
+        return {'offset': np.asarray(offset, dtype=float), 'scale': scale}
+
+    def summary(self) -> pd.DataFrame:
+        """列ごとの統計値を表で取得"""
+        table = pd.DataFrame({
+            'count': self.stats.count.astype(np.int64),
+            'min': self.stats.min,
+            'max': self.stats.max,
+            'mean': self.stats.mean,
+            'std': self.stats.std,
+        }, index=self.columns)
+        if self.sketches is not None:
+            quartiles = np.array([sketch.quantile([0.25, 0.5, 0.75]) for sketch in self.sketches])
+            table['q25'], table['median'], table['q75'] = quartiles.T
+        return table
+
+    def save(self, path: str):
+        """学習結果をJSONで保存"""
+        payload = {
+            'columns': self.columns,
+            'count': self.stats.count.tolist(),
+            'mean': self.stats.mean.tolist(),
+            'm2': self.stats.m2.tolist(),
+            'min': self.stats.min.tolist(),
+            'max': self.stats.max.tolist(),
+            'sketches': [sketch.to_dict() for sketch in self.sketches] if self.sketches else None,
+        }
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(payload, f, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, path: str) -> 'StreamingScalerFitter':
+        """save() で保存した学習結果を読み込む"""
+        with open(path, 'r', encoding='utf-8') as f:
+            payload = json.load(f)
+        fitter = cls(payload['columns'], quantiles=payload['sketches'] is not None)
+        fitter._initialize()
+        for key in ['count', 'mean', 'm2', 'min', 'max']:
+            setattr(fitter.stats, key, np.asarray(payload[key], dtype=float))
+        if payload['sketches']:
+            fitter.sketches = [QuantileSketch.from_dict(s) for s in payload['sketches']]
+        return fitter
+
+
+def apply_scaling(values: np.ndarray, params: Dict[str, np.ndarray]) -> np.ndarray:
+    """
+    学習済みパラメータで正規化（浮動小数配列はその場で変換）
+
+    Args:
+        values (np.ndarray): 2次元配列（行 × 列）
+        params (Dict): StreamingScalerFitter.params() の戻り値
+
+    Returns:
+        np.ndarray: 正規化済み配列
+    """
+    if not np.issubdtype(values.dtype, np.floating):
+        values = values.astype(float)
+    values -= params['offset'].astype(values.dtype, copy=False)
+    values /= params['scale'].astype(values.dtype, copy=False)
+    return values
+
+
+def fit_csv(file_path: str, columns: List[str] = None, chunksize: int = DEFAULT_CHUNKSIZE,
+            quantiles: bool = True, encoding: str = 'utf-8') -> StreamingScalerFitter:
+    """
+    CSVを1回だけ読んで正規化パラメータを学習
+
+    Args:
+        file_path (str): CSVファイルパス
+        columns (List[str]): 対象列（None=数値列すべて）
+        chunksize (int): 1チャンクの行数
+        quantiles (bool): 分位点も求めるか
+        encoding (str): 文字エンコーディング
+
+    Returns:
+        StreamingScalerFitter: 学習結果
+    """
+    fitter = StreamingScalerFitter(columns, quantiles=quantiles)
+    for chunk in pd.read_csv(file_path, chunksize=chunksize, encoding=encoding):
+        fitter.partial_fit(chunk)
+    return fitter
+
+
+def fit_files_parallel(file_paths: List[str], columns: List[str] = None, chunksize: int = DEFAULT_CHUNKSIZE,
+                       quantiles: bool = True, max_workers: int = None) -> StreamingScalerFitter:
+    """
+    複数のCSVを並列に学習してマージ（例: 店舗別・月別に分かれたファイル）
+
+    Args:
+        file_paths (List[str]): CSVファイルパスのリスト
+        columns (List[str]): 対象列（全ファイルで同じ列を使うため指定を推奨）
+        chunksize (int): 1チャンクの行数
+        quantiles (bool): 分位点も求めるか
+        max_workers (int): プロセス数（None=CPU数）
+
+    Returns:
+        StreamingScalerFitter: マージ済みの学習結果
+    """
+    if columns is None and file_paths:
+        columns = pd.read_csv(file_paths[0], nrows=1000).select_dtypes(include=[np.number]).columns.tolist()
+
+    merged = StreamingScalerFitter(columns, quantiles=quantiles)
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(fit_csv, path, columns, chunksize, quantiles) for path in file_paths]
+        for future in futures:
+            merged.merge(future.result())
+    return merged
+
+
+def transform_csv(input_path: str, output_path: str, fitter: StreamingScalerFitter, method: str = 'minmax',
+                  chunksize: int = DEFAULT_CHUNKSIZE, encoding: str = 'utf-8') -> str:
+    """
+    学習済みパラメータでCSVをチャンク単位で正規化して保存
+
+    Args:
+        input_path (str): 入力CSV
+        output_path (str): 出力CSV
+        fitter (StreamingScalerFitter): 学習結果
+        method (str): 'minmax', 'standard', 'robust'
+        chunksize (int): 1チャンクの行数
+        encoding (str): 入力の文字エンコーディング
+
+    Returns:
+        str: 出力ファイルパス
+    """
+    params = fitter.params(method)
+    columns = fitter.columns
+    first = True
+    for chunk in pd.read_csv(input_path, chunksize=chunksize, encoding=encoding):
+        chunk[columns] = apply_scaling(chunk[columns].to_numpy(dtype=float, na_value=np.nan), params)
+        chunk.to_csv(output_path, mode='w' if first else 'a', header=first, index=False)
+        first = False
+    return output_path
+
+
+def efficient_normalize_large_data(file_path: str, output_path: str = None, numeric_columns: List[str] = None,
+                                   method: str = 'minmax', chunksize: int = DEFAULT_CHUNKSIZE) -> str:
+    """
+    大量データの効率的な正規化処理関数（Dask不要の2パス版）
+
+    1パス目で全列の統計値をまとめて学習し、2パス目で正規化して書き出す。
+
+    Args:
+        file_path (str): 処理対象CSVファイルのパス
+        output_path (str): 出力先（None=元ファイル名_normalized.csv）
+        numeric_columns (List[str]): 正規化する列（None=数値列すべて）
+        method (str): 'minmax', 'standard', 'robust'
+        chunksize (int): 1チャンクの行数
+
+    Returns:
+        str: 出力ファイルパス
+    """
+    if method not in SCALING_METHODS:
+        raise ValueError(f"サポートされていない正規化方法: {method}")
+    if output_path is None:
+        root, _ = os.path.splitext(file_path)
+        output_path = f"{root}_normalized.csv"
+
+    fitter = fit_csv(file_path, numeric_columns, chunksize, quantiles=(method == 'robust'))
+    print(f"📊 {len(fitter.columns)}列の統計値を学習 ({int(fitter.stats.count.max()):,}行)")
+    transform_csv(file_path, output_path, fitter, method, chunksize)
+    print(f"✅ 正規化済みデータを保存しました: {output_path}")
+    return output_path
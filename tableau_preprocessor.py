@@ -0,0 +1,870 @@
+"""
+Tableau Excel データ前処理ツール
+Author: Claude
+Description: ExcelデータをTableau分析用に効率的に前処理するためのPythonツール
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import re
+from datetime import datetime
+from typing import List, Dict, Optional, Union, Any
+import warnings
+warnings.filterwarnings('ignore')
+
+from approx_profile import DEFAULT_TIME_BUDGET, ExactRefiner, approximate_profile, exact_data_info, format_count
+from lazy_imports import lazy_import
+from multi_file_loader import DEFAULT_PATTERNS, SOURCE_COLUMN, load_files
+from processing_metrics import ProcessingMetrics, track_operation
+from text_cleaning import (DEFAULT_TEXT_OPERATIONS, clean_text_column, fill_with_value, is_text_column,
+                           map_unique_values)
+
+# pandas / numpy は最初に使われた時点で読み込む（起動を速くするため）
+pd = lazy_import('pandas')
+np = lazy_import('numpy')
+
+
+class TableauDataPreprocessor:
+    """
+    Tableau分析用データ前処理クラス
+    
+    Excel/CSVファイルを読み込み、データクリーニングと変換を行う
+    """
+    
+    # レシピに記録する操作（読み込み・保存はファイルごとに異なるため含めない）
+    RECIPE_OPERATIONS = (
+        'remove_empty_rows', 'remove_empty_columns', 'remove_duplicates', 'fill_missing_values',
+        'clean_text_data', 'convert_data_types', 'filter_data', 'rename_columns',
+    )
+    RECIPE_FORMAT_VERSION = 1
+    
+    def __init__(self, file_path: str = None):
+        """
+        初期化
+        
+        Args:
+            file_path (str): 処理するファイルのパス
+        """
+        self.file_path = file_path
+        self.data = None
+        self.original_data = None
+        self.data_info = {}
+        self.processing_log = []
+        self.metrics = ProcessingMetrics()
+        self.recipe: List[Dict[str, Any]] = []
+        self.profile_mode = 'exact'
+        self.profile_time_budget = DEFAULT_TIME_BUDGET
+        self._refiner = ExactRefiner()
+        
+        if file_path:
+            self.load_data()
+    
+    @track_operation
+    def load_data(self, file_path: str = None) -> pd.DataFrame:
+        """
+        データファイルを読み込む
+        
+        Args:
+            file_path (str): ファイルパス（指定しない場合は初期化時のパスを使用）
+            
+        Returns:
+            pd.DataFrame: 読み込まれたデータ
+        """
+        if file_path:
+            self.file_path = file_path
+            
+        if not self.file_path:
+            raise ValueError("ファイルパスが指定されていません")
+            
+        if not os.path.exists(self.file_path):
+            raise FileNotFoundError(f"ファイルが見つかりません: {self.file_path}")
+        
+        file_extension = os.path.splitext(self.file_path)[1].lower()
+        
+        try:
+            if file_extension in ['.xlsx', '.xls']:
+                self.data = pd.read_excel(self.file_path)
+            elif file_extension == '.csv':
+                # 文字エンコーディングを自動判定
+                encodings = ['utf-8', 'shift_jis', 'cp932', 'iso-2022-jp']
+                for encoding in encodings:
+                    try:
+                        self.data = pd.read_csv(self.file_path, encoding=encoding)
+                        break
+                    except UnicodeDecodeError:
+                        continue
+                else:
+                    self.data = pd.read_csv(self.file_path, encoding='utf-8', errors='ignore')
+            else:
+                raise ValueError(f"サポートされていないファイル形式: {file_extension}")
+            
+            # 元データのバックアップを作成
+            self.original_data = self.data.copy()
+            self._update_data_info()
+            self._log_action(f"ファイル読み込み完了: {os.path.basename(self.file_path)}")
+            
+            print(f"✅ データ読み込み完了: {self.data.shape[0]}行 × {self.data.shape[1]}列")
+            return self.data
+            
+        except Exception as e:
+            raise Exception(f"ファイル読み込みエラー: {str(e)}")
+    
+    @track_operation
+    def load_directory(self, source: str, patterns: List[str] = None, recursive: bool = False,
+                       max_workers: int = None, source_column: str = SOURCE_COLUMN) -> pd.DataFrame:
+        """
+        フォルダ内（またはglobに一致する）複数のExcel/CSVを並列に読み込んで結合
+        
+        Args:
+            source (str): フォルダまたはglobパターン
+            patterns (List[str]): フォルダ指定時に対象とするパターン
+            recursive (bool): サブフォルダも探すか
+            max_workers (int): 並列数（None=CPUコア数）
+            source_column (str): 読み込み元のファイル名を入れる列名（None=付けない）
+            
+        Returns:
+            pd.DataFrame: 結合されたデータ
+        """
+        self.data = load_files(source, patterns or DEFAULT_PATTERNS, recursive, max_workers, source_column)
+        self.file_path = source
+        
+        # 元データのバックアップを作成
+        self.original_data = self.data.copy()
+        self._update_data_info()
+        n_files = self.data[source_column].cat.categories.size if source_column else None
+        self._log_action(f"フォルダ読み込み完了: {source}" + (f" ({n_files}ファイル)" if n_files else ""))
+        
+        print(f"✅ データ読み込み完了: {self.data.shape[0]}行 × {self.data.shape[1]}列")
+        return self.data
+    
+    def _update_data_info(self):
+        """データ情報を更新（概算モードでは時間内の概算を先に入れ、正確な値は後から差し替える）"""
+        if self.data is not None and self.profile_mode == 'approximate':
+            self.data_info = approximate_profile(self.data, self.profile_time_budget)
+            self._refine_data_info_async()
+        elif self.data is not None:
+            self._refiner.cancel()
+            self.data_info = {
+                'rows': len(self.data),
+                'columns': len(self.data.columns),
+                'empty_cells': self.data.isnull().sum().sum(),
+                'duplicates': self.data.duplicated().sum(),
+                'memory_usage': self.data.memory_usage(deep=True).sum(),
+                'dtypes': self.data.dtypes.to_dict()
+            }
+    
+    def _refine_data_info_async(self):
+        """
+        正確なデータ情報をバックグラウンドで計算（完了時にデータが変わっていなければ差し替える）
+
+        計算は1スレッドだけで行い、次の操作で呼ばれたら前の計算は打ち切る。
+        """
+        data = self.data
+
+        def apply_exact(info: Dict[str, Any]):
+            if self.data is data:
+                self.data_info = info
+
+        self._refiner.submit(data, apply_exact)
+    
+    def set_profile_mode(self, mode: str = 'approximate', time_budget: float = DEFAULT_TIME_BUDGET):
+        """
+        データ情報の計算方法を設定
+        
+        Args:
+            mode (str): 'exact'（全行を読む）, 'approximate'（time_budget 秒以内の概算）
+            time_budget (float): 概算の時間の上限（秒）
+        """
+        if mode not in ('exact', 'approximate'):
+            raise ValueError(f"サポートされていないモード: {mode}")
+        self.profile_mode = mode
+        self.profile_time_budget = time_budget
+    
+    def _log_action(self, action: str):
+        """処理ログを記録"""
+        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        log_entry = f"[{timestamp}] {action}"
+        self.processing_log.append(log_entry)
+        print(f"📝 {action}")
+    
+    def show_data_info(self, approximate: bool = None, time_budget: float = None,
+                       refine: bool = False) -> Dict[str, Any]:
+        """
+        データの詳細情報を表示
+        
+        Args:
+            approximate (bool): 概算で表示するか（None=profile_mode に従う）
+            time_budget (float): 概算の時間の上限（秒、None=profile_time_budget）
+            refine (bool): 概算の後、正確な値をバックグラウンドで計算して data_info を差し替えるか
+        
+        Returns:
+            dict: データ情報
+        """
+        if self.data is None:
+            print("❌ データが読み込まれていません")
+            return {}
+        
+        if approximate is None:
+            approximate = self.profile_mode == 'approximate'
+        if approximate:
+            info = approximate_profile(self.data, time_budget or self.profile_time_budget)
+            if refine:
+                self._refine_data_info_async()
+        else:
+            info = self.data_info if not self.data_info.get('approximate') else exact_data_info(self.data)
+        mark = "≈" if approximate else ""
+        
+        print("\n" + "="*50)
+        print("📊 DATA SUMMARY" + (f" (概算: {info['coverage']*100:.0f}%の行を{info['elapsed']:.2f}秒で確認)"
+                                  if approximate else ""))
+        print("="*50)
+        print(f"📁 ファイル: {os.path.basename(self.file_path) if self.file_path else 'Unknown'}")
+        print(f"📏 サイズ: {info['rows']:,}行 × {info['columns']}列")
+        print(f"🕳️  空セル: {mark}{info['empty_cells']:,}個")
+        print(f"🔄 重複行: {format_count(info['duplicates'], mark)}行")
+        print(f"💾 メモリ使用量: {mark}{info['memory_usage'] / 1024 / 1024:.2f} MB")
+        
+        print("\n📋 列情報:")
+        for i, (col, dtype) in enumerate(info['dtypes'].items()):
+            if approximate:
+                profile = info['column_profiles'][str(col)]
+                print(f"  {i+1:2d}. {col:<30} | {str(dtype):<10} | 欠損: ≈{profile['nulls']:,}個 "
+                      f"({profile['null_rate']*100:.1f}%) | ユニーク: ≈{profile['distinct']:,} | 例: {profile['sample'][:3]}")
+            else:
+                null_count = self.data[col].isnull().sum()
+                null_rate = (null_count / len(self.data)) * 100
+                print(f"  {i+1:2d}. {col:<30} | {str(dtype):<10} | 欠損: {null_count:,}個 ({null_rate:.1f}%)")
+        
+        return info
+    
+    def preview_data(self, n_rows: int = 10) -> pd.DataFrame:
+        """
+        データをプレビュー表示
+        
+        Args:
+            n_rows (int): 表示する行数
+            
+        Returns:
+            pd.DataFrame: プレビューデータ
+        """
+        if self.data is None:
+            print("❌ データが読み込まれていません")
+            return pd.DataFrame()
+        
+        print(f"\n👀 データプレビュー (最初の{n_rows}行):")
+        print("-" * 80)
+        preview = self.data.head(n_rows)
+        print(preview.to_string(max_cols=None, max_colwidth=20))
+        return preview
+    
+    @track_operation
+    def remove_empty_rows(self, threshold: float = 0.5) -> pd.DataFrame:
+        """
+        空行を削除
+        
+        Args:
+            threshold (float): 削除する閾値（0.5 = 半分以上が空の行を削除）
+            
+        Returns:
+            pd.DataFrame: 処理後のデータ
+        """
+        if self.data is None:
+            raise ValueError("データが読み込まれていません")
+        
+        initial_rows = len(self.data)
+        
+        # 各行の非null値の割合を計算
+        non_null_ratio = self.data.notna().sum(axis=1) / len(self.data.columns)
+        self.data = self.data[non_null_ratio >= threshold]
+        
+        removed_rows = initial_rows - len(self.data)
+        self._update_data_info()
+        self._log_action(f"空行削除: {removed_rows:,}行削除 (閾値: {threshold})")
+        
+        return self.data
+    
+    @track_operation
+    def remove_empty_columns(self, threshold: float = 0.5) -> pd.DataFrame:
+        """
+        空列を削除
+        
+        Args:
+            threshold (float): 削除する閾値（0.5 = 半分以上が空の列を削除）
+            
+        Returns:
+            pd.DataFrame: 処理後のデータ
+        """
+        if self.data is None:
+            raise ValueError("データが読み込まれていません")
+        
+        initial_cols = len(self.data.columns)
+        
+        # 各列の非null値の割合を計算
+        non_null_ratio = self.data.notna().sum() / len(self.data)
+        cols_to_keep = non_null_ratio[non_null_ratio >= threshold].index
+        self.data = self.data[cols_to_keep]
+        
+        removed_cols = initial_cols - len(self.data.columns)
+        self._update_data_info()
+        self._log_action(f"空列削除: {removed_cols}列削除 (閾値: {threshold})")
+        
+        return self.data
+    
+    @track_operation
+    def remove_duplicates(self, subset: List[str] = None, keep: str = 'first') -> pd.DataFrame:
+        """
+        重複行を削除
+        
+        Args:
+            subset (List[str]): 重複チェックする列名のリスト（None=全列）
+            keep (str): 保持する重複行 ('first', 'last', False)
+            
+        Returns:
+            pd.DataFrame: 処理後のデータ
+        """
+        if self.data is None:
+            raise ValueError("データが読み込まれていません")
+        
+        initial_rows = len(self.data)
+        self.data = self.data.drop_duplicates(subset=subset, keep=keep)
+        
+        removed_rows = initial_rows - len(self.data)
+        self._update_data_info()
+        self._log_action(f"重複行削除: {removed_rows:,}行削除")
+        
+        return self.data
+    
+    @track_operation
+    def fill_missing_values(self, strategy: str = 'forward', custom_value: Any = None, columns: List[str] = None) -> pd.DataFrame:
+        """
+        欠損値を埋める
+        
+        Args:
+            strategy (str): 埋める方法 ('forward', 'backward', 'mean', 'median', 'mode', 'zero', 'custom')
+            custom_value (Any): カスタム値（strategy='custom'の場合）
+            columns (List[str]): 処理する列名のリスト（None=全列）
+            
+        Returns:
+            pd.DataFrame: 処理後のデータ
+        """
+        if self.data is None:
+            raise ValueError("データが読み込まれていません")
+        
+        initial_nulls = self.data.isnull().sum().sum()
+        target_columns = columns if columns else self.data.columns
+        
+        for col in target_columns:
+            if col in self.data.columns:
+                if strategy == 'forward':
+                    self.data[col] = self.data[col].fillna(method='ffill')
+                elif strategy == 'backward':
+                    self.data[col] = self.data[col].fillna(method='bfill')
+                elif strategy == 'mean' and pd.api.types.is_numeric_dtype(self.data[col]):
+                    self.data[col] = self.data[col].fillna(self.data[col].mean())
+                elif strategy == 'median' and pd.api.types.is_numeric_dtype(self.data[col]):
+                    self.data[col] = self.data[col].fillna(self.data[col].median())
+                elif strategy == 'mode':
+                    mode_value = self.data[col].mode()
+                    if not mode_value.empty:
+                        self.data[col] = self.data[col].fillna(mode_value[0])
+                elif strategy == 'zero':
+                    self.data[col] = fill_with_value(self.data[col], 0)
+                elif strategy == 'custom':
+                    self.data[col] = fill_with_value(self.data[col], custom_value)
+        
+        final_nulls = self.data.isnull().sum().sum()
+        filled_count = initial_nulls - final_nulls
+        self._update_data_info()
+        self._log_action(f"欠損値処理: {filled_count:,}個を埋めた (方法: {strategy})")
+        
+        return self.data
+    
+    @track_operation
+    def clean_text_data(self, columns: List[str] = None, operations: List[str] = None) -> pd.DataFrame:
+        """
+        テキストデータをクリーニング
+        
+        処理は列ごとの重複のない値にだけ適用し、コードで各行に戻す（欠損値は欠損のまま）。
+        重複のない値が少ない列はカテゴリ型になる。
+        
+        Args:
+            columns (List[str]): 処理する列名のリスト（None=文字列列すべて）
+            operations (List[str]): 実行する操作のリスト
+                ['nfkc', 'trim', 'lower', 'upper', 'remove_special', 'normalize_space']
+                （'nfkc' は全角英数字・半角カナなどを統一する）
+                
+        Returns:
+            pd.DataFrame: 処理後のデータ
+        """
+        if self.data is None:
+            raise ValueError("データが読み込まれていません")
+        
+        if operations is None:
+            operations = DEFAULT_TEXT_OPERATIONS
+        
+        # 文字列列を自動選択（カテゴリ型の文字列列も含む）
+        if columns is None:
+            columns = [col for col in self.data.columns if is_text_column(self.data[col])]
+        
+        processed_columns = []
+        
+        for col in columns:
+            if col in self.data.columns:
+                self.data[col] = clean_text_column(self.data[col], operations)
+                processed_columns.append(col)
+        
+        self._update_data_info()
+        self._log_action(f"テキストクリーニング: {len(processed_columns)}列処理 ({', '.join(operations)})")
+        
+        return self.data
+    
+    @track_operation
+    def convert_data_types(self, auto_convert: bool = True, type_mapping: Dict[str, str] = None) -> pd.DataFrame:
+        """
+        データ型を変換
+        
+        Args:
+            auto_convert (bool): 自動変換を行うか
+            type_mapping (dict): 手動での型指定 {'column_name': 'new_type'}
+            
+        Returns:
+            pd.DataFrame: 処理後のデータ
+        """
+        if self.data is None:
+            raise ValueError("データが読み込まれていません")
+        
+        converted_columns = []
+        
+        # 手動型指定
+        if type_mapping:
+            for col, new_type in type_mapping.items():
+                if col in self.data.columns:
+                    try:
+                        if new_type == 'datetime':
+                            self.data[col] = pd.to_datetime(self.data[col], errors='coerce')
+                        elif new_type == 'category':
+                            self.data[col] = self.data[col].astype('category')
+                        else:
+                            self.data[col] = self.data[col].astype(new_type)
+                        converted_columns.append(f"{col} -> {new_type}")
+                    except Exception as e:
+                        print(f"⚠️ {col}の型変換に失敗: {e}")
+        
+        # 自動変換
+        if auto_convert:
+            for col in self.data.columns:
+                try:
+                    # 数値変換を試行（変換は重複のない値にだけ行う）
+                    if is_text_column(self.data[col]):
+                        # 数値かチェック
+                        numeric_series = map_unique_values(self.data[col], lambda u: pd.to_numeric(u, errors='coerce'),
+                                                           categorical=False)
+                        if numeric_series.notna().sum() / len(self.data[col]) > 0.8:  # 80%以上が数値
+                            self.data[col] = numeric_series
+                            converted_columns.append(f"{col} -> numeric")
+                        
+                        # 日付変換を試行
+                        elif not converted_columns or col not in [c.split(' -> ')[0] for c in converted_columns]:
+                            try:
+                                date_series = map_unique_values(self.data[col],
+                                                                lambda u: pd.to_datetime(u, errors='coerce'),
+                                                                categorical=False)
+                                if date_series.notna().sum() / len(self.data[col]) > 0.5:  # 50%以上が日付
+                                    self.data[col] = date_series
+                                    converted_columns.append(f"{col} -> datetime")
+                            except:
+                                pass
+                                
+                except Exception:
+                    continue
+        
+        self._update_data_info()
+        self._log_action(f"データ型変換: {len(converted_columns)}列変換")
+        
+        return self.data
+    
+    @track_operation
+    def filter_data(self, conditions: Dict[str, Any]) -> pd.DataFrame:
+        """
+        データをフィルタリング
+        
+        Args:
+            conditions (dict): フィルタ条件
+                例: {
+                    'column1': {'operator': '>', 'value': 100},
+                    'column2': {'operator': 'contains', 'value': 'keyword'},
+                    'column3': {'operator': 'in', 'value': ['A', 'B', 'C']}
+                }
+                
+        Returns:
+            pd.DataFrame: フィルタ後のデータ
+        """
+        if self.data is None:
+            raise ValueError("データが読み込まれていません")
+        
+        initial_rows = len(self.data)
+        mask = pd.Series([True] * len(self.data))
+        
+        for column, condition in conditions.items():
+            if column not in self.data.columns:
+                print(f"⚠️ 列 '{column}' が見つかりません")
+                continue
+            
+            operator = condition.get('operator', '==')
+            value = condition.get('value')
+            
+            try:
+                if operator == '>':
+                    mask &= (self.data[column] > value)
+                elif operator == '<':
+                    mask &= (self.data[column] < value)
+                elif operator == '>=':
+                    mask &= (self.data[column] >= value)
+                elif operator == '<=':
+                    mask &= (self.data[column] <= value)
+                elif operator == '==':
+                    mask &= (self.data[column] == value)
+                elif operator == '!=':
+                    mask &= (self.data[column] != value)
+                elif operator == 'contains':
+                    mask &= self.data[column].astype(str).str.contains(str(value), na=False)
+                elif operator == 'startswith':
+                    mask &= self.data[column].astype(str).str.startswith(str(value), na=False)
+                elif operator == 'endswith':
+                    mask &= self.data[column].astype(str).str.endswith(str(value), na=False)
+                elif operator == 'in':
+                    mask &= self.data[column].isin(value if isinstance(value, list) else [value])
+                elif operator == 'notin':
+                    mask &= ~self.data[column].isin(value if isinstance(value, list) else [value])
+                elif operator == 'isnull':
+                    mask &= self.data[column].isnull()
+                elif operator == 'notnull':
+                    mask &= self.data[column].notnull()
+                    
+            except Exception as e:
+                print(f"⚠️ フィルタ条件の適用に失敗 ({column}): {e}")
+        
+        self.data = self.data[mask]
+        filtered_rows = initial_rows - len(self.data)
+        self._update_data_info()
+        self._log_action(f"データフィルタ: {filtered_rows:,}行除外")
+        
+        return self.data
+    
+    @track_operation
+    def rename_columns(self, column_mapping: Dict[str, str]) -> pd.DataFrame:
+        """
+        列名を変更
+        
+        Args:
+            column_mapping (dict): 列名マッピング {'old_name': 'new_name'}
+            
+        Returns:
+            pd.DataFrame: 処理後のデータ
+        """
+        if self.data is None:
+            raise ValueError("データが読み込まれていません")
+        
+        self.data = self.data.rename(columns=column_mapping)
+        renamed_count = len([k for k in column_mapping.keys() if k in self.original_data.columns])
+        
+        self._update_data_info()
+        self._log_action(f"列名変更: {renamed_count}列変更")
+        
+        return self.data
+    
+    @track_operation
+    def create_tableau_extract(self, output_path: str = None, file_format: str = 'excel') -> str:
+        """
+        Tableau用にデータを保存
+        
+        Args:
+            output_path (str): 出力ファイルパス
+            file_format (str): ファイル形式 ('excel', 'csv')
+            
+        Returns:
+            str: 保存されたファイルパス
+        """
+        if self.data is None:
+            raise ValueError("データが読み込まれていません")
+        
+        if output_path is None:
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            if file_format == 'excel':
+                output_path = f"tableau_ready_data_{timestamp}.xlsx"
+            else:
+                output_path = f"tableau_ready_data_{timestamp}.csv"
+        
+        try:
+            if file_format == 'excel':
+                with pd.ExcelWriter(output_path, engine='openpyxl') as writer:
+                    # メインデータ
+                    self.data.to_excel(writer, sheet_name='Data', index=False)
+                    
+                    # データ概要
+                    info_df = pd.DataFrame([
+                        ['総行数', self.data_info['rows']],
+                        ['総列数', self.data_info['columns']],
+                        ['空セル数', self.data_info['empty_cells']],
+                        ['重複行数', self.data_info['duplicates'] if self.data_info['duplicates'] is not None else '計算中'],
+                        ['処理日時', datetime.now().strftime("%Y-%m-%d %H:%M:%S")]
+                    ], columns=['項目', '値'])
+                    info_df.to_excel(writer, sheet_name='Summary', index=False)
+                    
+                    # 処理ログ
+                    if self.processing_log:
+                        log_df = pd.DataFrame(self.processing_log, columns=['処理ログ'])
+                        log_df.to_excel(writer, sheet_name='Processing_Log', index=False)
+                        
+            elif file_format == 'csv':
+                self.data.to_csv(output_path, index=False, encoding='utf-8-sig')
+            
+            self._log_action(f"ファイル保存完了: {output_path}")
+            print(f"✅ Tableau用データを保存しました: {output_path}")
+            
+            return output_path
+            
+        except Exception as e:
+            raise Exception(f"ファイル保存エラー: {str(e)}")
+    
+    def reset_data(self):
+        """データを元の状態にリセット"""
+        if self.original_data is not None:
+            self.data = self.original_data.copy()
+            self._update_data_info()
+            self.processing_log = []
+            self.recipe = []
+            self.metrics.reset()
+            self._log_action("データリセット完了")
+        else:
+            print("❌ 元データが見つかりません")
+    
+    def save_recipe(self, output_path: str) -> str:
+        """
+        これまでに実行した前処理の手順（レシピ）をJSONで保存
+        
+        同じ形式の別ファイルに apply_recipe() で同じ手順を適用できる。
+        引数はJSONで表せる値（文字列・数値・リスト・辞書）であること。
+        
+        Args:
+            output_path (str): 出力ファイルパス
+            
+        Returns:
+            str: 保存されたファイルパス
+        """
+        payload = {
+            'format_version': self.RECIPE_FORMAT_VERSION,
+            'created_at': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            'source': os.path.basename(self.file_path) if self.file_path else None,
+            'steps': self.recipe,
+        }
+        with open(output_path, 'w', encoding='utf-8') as f:
+            json.dump(payload, f, ensure_ascii=False, indent=2)
+        print(f"📋 レシピを保存しました: {output_path} ({len(self.recipe)}手順)")
+        return output_path
+    
+    @staticmethod
+    def load_recipe(recipe_path: str) -> List[Dict[str, Any]]:
+        """save_recipe() で保存したレシピの手順を読み込む"""
+        with open(recipe_path, encoding='utf-8') as f:
+            payload = json.load(f)
+        if payload.get('format_version') != TableauDataPreprocessor.RECIPE_FORMAT_VERSION:
+            raise ValueError(f"サポートされていないレシピの形式です: {payload.get('format_version')}")
+        return payload['steps']
+    
+    def apply_recipe(self, recipe: Union[str, List[Dict[str, Any]]]) -> pd.DataFrame:
+        """
+        レシピの手順を現在のデータに順に適用
+        
+        Args:
+            recipe: レシピファイルのパス、または手順のリスト
+            
+        Returns:
+            pd.DataFrame: 処理後のデータ
+        """
+        steps = self.load_recipe(recipe) if isinstance(recipe, str) else recipe
+        for step in steps:
+            operation = step['operation']
+            if operation not in self.RECIPE_OPERATIONS:
+                raise ValueError(f"レシピに使えない操作です: {operation}")
+            getattr(self, operation)(*step.get('args', []), **step.get('kwargs', {}))
+        return self.data
+    
+    def get_processing_log(self) -> List[str]:
+        """処理ログを取得"""
+        return self.processing_log.copy()
+    
+    def get_metrics(self) -> List[Dict[str, Any]]:
+        """
+        操作ごとの計測結果を取得
+        
+        Returns:
+            List[Dict[str, Any]]: 実行時間・CPU時間・行数・メモリ量などの計測レコード
+        """
+        return self.metrics.get_records()
+    
+    def enable_profiling(self, mode: str = 'cprofile', output_dir: str = 'profiles'):
+        """
+        操作ごとのプロファイル取得を有効にする
+        
+        Args:
+            mode (str): 'cprofile' または 'py-spy'
+            output_dir (str): プロファイル出力先ディレクトリ
+        """
+        self.metrics.enable_profiling(mode, output_dir)
+    
+    def export_processing_summary(self, output_path: str = None) -> str:
+        """
+        処理サマリーをエクスポート
+        
+        Args:
+            output_path (str): 出力ファイルパス
+            
+        Returns:
+            str: 保存されたファイルパス
+        """
+        if output_path is None:
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            output_path = f"processing_summary_{timestamp}.txt"
+        
+        summary = []
+        summary.append("=" * 60)
+        summary.append("TABLEAU データ前処理サマリー")
+        summary.append("=" * 60)
+        summary.append(f"処理日時: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+        summary.append(f"対象ファイル: {os.path.basename(self.file_path) if self.file_path else 'Unknown'}")
+        summary.append("")
+        
+        summary.append("📊 最終データ概要:")
+        summary.append(f"  - 行数: {self.data_info['rows']:,}")
+        summary.append(f"  - 列数: {self.data_info['columns']}")
+        summary.append(f"  - 空セル数: {self.data_info['empty_cells']:,}")
+        summary.append(f"  - 重複行数: {format_count(self.data_info['duplicates'])}")
+        summary.append("")
+        
+        summary.append("🔄 処理ログ:")
+        for log in self.processing_log:
+            summary.append(f"  {log}")
+        summary.append("")
+        
+        if self.metrics.records:
+            summary.append("⏱️ 処理メトリクス:")
+            for line in self.metrics.format_lines():
+                summary.append(f"  {line}")
+        
+        with open(output_path, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(summary))
+        
+        print(f"✅ 処理サマリーを保存しました: {output_path}")
+        return output_path
+
+
+def main():
+    """
+    メイン実行関数 - 使用例
+    """
+    print("🚀 Tableau Excel前処理ツール")
+    print("=" * 50)
+    
+    # 使用例
+    try:
+        # ファイルパスを指定してインスタンス作成
+        # processor = TableauDataPreprocessor("sample_data.xlsx")
+        
+        # または空インスタンスを作成してからファイル読み込み
+        processor = TableauDataPreprocessor()
+        
+        # ファイル読み込み（実際のファイルパスに置き換えてください）
+        file_path = input("📁 処理するExcel/CSVファイルのパスを入力してください: ").strip()
+        if file_path and os.path.exists(file_path):
+            processor.load_data(file_path)
+            
+            # データ情報表示
+            processor.show_data_info()
+            processor.preview_data()
+            
+            # 基本的な前処理を実行
+            print("\n🧹 基本クリーニングを開始...")
+            processor.remove_empty_rows()
+            processor.remove_empty_columns()
+            processor.remove_duplicates()
+            processor.clean_text_data()
+            processor.convert_data_types()
+            
+            # Tableau用データを保存
+            output_file = processor.create_tableau_extract()
+            
+            # 処理サマリーを保存
+            processor.export_processing_summary()
+            
+            print(f"\n✅ 前処理完了！ {output_file} をTableauで読み込んでください。")
+            
+        else:
+            print("❌ 有効なファイルパスを指定してください")
+            
+    except Exception as e:
+        print(f"❌ エラー: {e}")
+
+
+if __name__ == "__main__":
+    main()
+
+
+# =============================================================================
+# 詳細使用例
+# =============================================================================
+
+"""
+使用例1: 基本的な前処理
+------------------------
+processor = TableauDataPreprocessor("data.xlsx")
+processor.show_data_info()
+processor.remove_empty_rows()
+processor.remove_duplicates()
+processor.clean_text_data()
+processor.convert_data_types(auto_convert=True)
+processor.create_tableau_extract("clean_data.xlsx")
+
+
+使用例2: カスタム処理
+--------------------
+processor = TableauDataPreprocessor("sales_data.csv")
+
+# 欠損値を平均値で埋める
+processor.fill_missing_values(strategy='mean', columns=['price', 'quantity'])
+
+# 特定の条件でフィルタ
+conditions = {
+    'sales_amount': {'operator': '>', 'value': 1000},
+    'region': {'operator': 'in', 'value': ['Tokyo', 'Osaka']}
+}
+processor.filter_data(conditions)
+
+# 列名を変更
+column_mapping = {
+    'old_column_name': 'new_column_name',
+    'price': 'unit_price'
+}
+processor.rename_columns(column_mapping)
+
+# CSV形式で保存
+processor.create_tableau_extract("filtered_sales.csv", file_format='csv')
+
+
+使用例3: 型変換指定
+------------------
+type_mapping = {
+    'date_column': 'datetime',
+    'category_column': 'category',
+    'number_column': 'float64'
+}
+processor.convert_data_types(auto_convert=False, type_mapping=type_mapping)
+
+
+使用例4: テキストクリーニング
+---------------------------
+operations = ['trim', 'lower', 'remove_special', 'normalize_space']
+processor.clean_text_data(columns=['name', 'description'], operations=operations)
+"""
@@ -4,8 +4,8 @@ Author: Claude
 Description: ExcelデータをTableau分析用に効率的に前処理するためのGUIツール
 """
 
-import pandas as pd
-import numpy as np
+from __future__ import annotations
+
 import os
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox, scrolledtext
@@ -15,6 +15,16 @@ import threading
 import warnings
 warnings.filterwarnings('ignore')
 
+from approx_profile import ExactRefiner, approximate_profile, exact_data_info, format_count
+from lazy_imports import lazy_import, preload
+from multi_file_loader import load_files
+from processing_metrics import ProcessingMetrics, track_operation
+from text_cleaning import DEFAULT_TEXT_OPERATIONS, clean_text_column, fill_with_value, is_text_column, map_unique_values
+
+# pandas / numpy は最初に使われた時点で読み込む（起動を速くするため）
+pd = lazy_import('pandas')
+np = lazy_import('numpy')
+
 
 class TableauPreprocessorGUI:
     def __init__(self, root):
@@ -28,7 +38,10 @@ class TableauPreprocessorGUI:
         self.original_data = None
         self.data_info = {}
         self.processing_log = []
+        self.metrics = ProcessingMetrics()
         self.file_path = None
+        self._info_generation = 0
+        self._refiner = ExactRefiner()
         
         # スタイル設定
         self.setup_styles()
@@ -109,6 +122,10 @@ class TableauPreprocessorGUI:
                                      command=self.load_file, style='Action.TButton')
         self.load_button.pack(side=tk.LEFT, padx=(0, 5))
         
+        self.folder_button = ttk.Button(file_button_frame, text="🗂️ フォルダ選択", 
+                                       command=self.load_folder)
+        self.folder_button.pack(side=tk.LEFT, padx=(0, 5))
+        
         self.reload_button = ttk.Button(file_button_frame, text="🔄 再読み込み", 
                                        command=self.reload_file, state='disabled')
         self.reload_button.pack(side=tk.LEFT)
@@ -121,6 +138,10 @@ class TableauPreprocessorGUI:
                                 state='disabled', bg='#f8f8f8')
         self.info_text.pack(fill=tk.BOTH)
         
+        self.approx_info_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(info_section, text="⚡ 概算表示（大きなデータ向け）", variable=self.approx_info_var,
+                        command=self.update_data_info).pack(anchor=tk.W, pady=(5, 0))
+        
         # クリーニングセクション
         cleaning_section = ttk.LabelFrame(control_frame, text="🧹 データクリーニング", padding="10")
         cleaning_section.pack(fill=tk.X, pady=(0, 10))
@@ -251,6 +272,14 @@ class TableauPreprocessorGUI:
             self.file_path = file_path
             self.load_data_async()
     
+    def load_folder(self):
+        """フォルダ内のExcel/CSVをまとめて読み込む"""
+        folder_path = filedialog.askdirectory(title="店舗別ファイルのフォルダを選択")
+        
+        if folder_path:
+            self.file_path = folder_path
+            self.load_data_async()
+    
     def load_data_async(self):
         """非同期でデータを読み込む"""
         def load_worker():
@@ -258,21 +287,26 @@ class TableauPreprocessorGUI:
                 self.update_status("ファイルを読み込み中...")
                 self.progress_var.set(20)
                 
-                # ファイル読み込み
+                # ファイル読み込み（フォルダの場合は中のファイルを並列に読み込んで結合）
                 file_extension = os.path.splitext(self.file_path)[1].lower()
                 
-                if file_extension in ['.xlsx', '.xls']:
-                    self.data = pd.read_excel(self.file_path)
-                elif file_extension == '.csv':
-                    encodings = ['utf-8', 'shift_jis', 'cp932', 'iso-2022-jp']
-                    for encoding in encodings:
-                        try:
-                            self.data = pd.read_csv(self.file_path, encoding=encoding)
-                            break
-                        except UnicodeDecodeError:
-                            continue
-                    else:
-                        self.data = pd.read_csv(self.file_path, encoding='utf-8', errors='ignore')
+                # 旧ファイルの情報を計測値に混ぜない（新しい情報は on_data_loaded で更新）
+                self.data_info = {}
+                with self.metrics.measure('load_file', self):
+                    if os.path.isdir(self.file_path):
+                        self.data = load_files(self.file_path)
+                    elif file_extension in ['.xlsx', '.xls']:
+                        self.data = pd.read_excel(self.file_path)
+                    elif file_extension == '.csv':
+                        encodings = ['utf-8', 'shift_jis', 'cp932', 'iso-2022-jp']
+                        for encoding in encodings:
+                            try:
+                                self.data = pd.read_csv(self.file_path, encoding=encoding)
+                                break
+                            except UnicodeDecodeError:
+                                continue
+                        else:
+                            self.data = pd.read_csv(self.file_path, encoding='utf-8', errors='ignore')
                 
                 self.progress_var.set(70)
                 
@@ -315,33 +349,52 @@ class TableauPreprocessorGUI:
             self.load_data_async()
     
     def update_data_info(self):
-        """データ情報を更新"""
+        """データ情報を更新（概算表示では先に概算を出し、正確な値はバックグラウンドで計算して差し替える）"""
         if self.data is None:
             return
         
-        self.data_info = {
-            'rows': len(self.data),
-            'columns': len(self.data.columns),
-            'empty_cells': self.data.isnull().sum().sum(),
-            'duplicates': self.data.duplicated().sum(),
-            'memory_usage': self.data.memory_usage(deep=True).sum()
-        }
+        self._info_generation += 1
+        if not self.approx_info_var.get():
+            self._refiner.cancel()
+            self.render_data_info(exact_data_info(self.data))
+            return
         
-        # 情報テキスト更新
-        info_text = f"""行数: {self.data_info['rows']:,}
-列数: {self.data_info['columns']}
-空セル数: {self.data_info['empty_cells']:,}
-重複行数: {self.data_info['duplicates']:,}
-メモリ使用量: {self.data_info['memory_usage']/1024/1024:.2f} MB
-
-列情報:"""
+        self.render_data_info(approximate_profile(self.data, time_budget=0.5))
+        generation = self._info_generation
+        
+        def on_exact(info):
+            # 計算中に別の操作でデータが変わった場合は古い結果を表示しない
+            self.root.after(0, lambda: generation == self._info_generation and self.render_data_info(info))
+        
+        # 前の操作の計算が残っていれば打ち切り、最新のデータだけを計算する
+        self._refiner.submit(self.data, on_exact)
+    
+    def render_data_info(self, info):
+        """データ情報をテキスト欄に表示"""
+        self.data_info = info
+        approximate = info.get('approximate', False)
+        mark = "≈" if approximate else ""
         
-        for i, (col, dtype) in enumerate(self.data.dtypes.items()):
-            null_count = self.data[col].isnull().sum()
-            null_rate = (null_count / len(self.data)) * 100
-            info_text += f"\n{i+1:2d}. {col[:20]:<20} | {str(dtype):<10}"
+        # 情報テキスト更新
+        info_text = f"""行数: {info['rows']:,}
+列数: {info['columns']}
+空セル数: {mark}{info['empty_cells']:,}
+重複行数: {format_count(info['duplicates'], mark)}
+メモリ使用量: {mark}{info['memory_usage']/1024/1024:.2f} MB"""
+        if approximate:
+            info_text += f"\n（概算: {info['coverage']*100:.0f}%の行から推定、正確な値を計算中…）"
+        info_text += "\n\n列情報:"
+        
+        for i, (col, dtype) in enumerate(info['dtypes'].items()):
+            if approximate:
+                profile = info['column_profiles'][str(col)]
+                null_count, null_rate = profile['nulls'], profile['null_rate'] * 100
+            else:
+                null_count = info['column_nulls'][col]
+                null_rate = (null_count / max(info['rows'], 1)) * 100
+            info_text += f"\n{i+1:2d}. {str(col)[:20]:<20} | {str(dtype):<10}"
             if null_count > 0:
-                info_text += f" | 欠損:{null_count}({null_rate:.1f}%)"
+                info_text += f" | 欠損:{mark}{null_count}({null_rate:.1f}%)"
         
         self.info_text.config(state='normal')
         self.info_text.delete(1.0, tk.END)
@@ -420,6 +473,7 @@ class TableauPreprocessorGUI:
         messagebox.showinfo("完了", message)
     
     # データ処理メソッド
+    @track_operation
     def remove_empty_rows(self):
         """空行を削除"""
         if self.data is None:
@@ -438,6 +492,7 @@ class TableauPreprocessorGUI:
         except Exception as e:
             self.show_error(f"空行削除エラー: {str(e)}")
     
+    @track_operation
     def remove_empty_columns(self):
         """空列を削除"""
         if self.data is None:
@@ -456,6 +511,7 @@ class TableauPreprocessorGUI:
         except Exception as e:
             self.show_error(f"空列削除エラー: {str(e)}")
     
+    @track_operation
     def remove_duplicates(self):
         """重複行を削除"""
         if self.data is None:
@@ -474,20 +530,19 @@ class TableauPreprocessorGUI:
         except Exception as e:
             self.show_error(f"重複行削除エラー: {str(e)}")
     
+    @track_operation
     def clean_text_data(self):
         """テキストデータをクリーニング"""
         if self.data is None:
             return
         
         try:
-            text_columns = self.data.select_dtypes(include=['object']).columns
+            text_columns = [col for col in self.data.columns if is_text_column(self.data[col])]
             processed_cols = 0
             
             for col in text_columns:
-                # 前後の空白を削除
-                self.data[col] = self.data[col].astype(str).str.strip()
-                # 連続する空白を1つに
-                self.data[col] = self.data[col].str.replace(r'\s+', ' ', regex=True)
+                # 全角・半角の統一、前後の空白削除、連続する空白を1つに（重複のない値にだけ適用）
+                self.data[col] = clean_text_column(self.data[col], DEFAULT_TEXT_OPERATIONS)
                 processed_cols += 1
             
             self.update_data_info()
@@ -498,6 +553,7 @@ class TableauPreprocessorGUI:
         except Exception as e:
             self.show_error(f"テキストクリーニングエラー: {str(e)}")
     
+    @track_operation
     def convert_data_types(self):
         """データ型を変換"""
         if self.data is None:
@@ -507,16 +563,19 @@ class TableauPreprocessorGUI:
             converted_cols = 0
             
             for col in self.data.columns:
-                if self.data[col].dtype == 'object':
-                    # 数値変換を試行
-                    numeric_series = pd.to_numeric(self.data[col], errors='coerce')
+                if is_text_column(self.data[col]):
+                    # 数値変換を試行（変換は重複のない値にだけ行う）
+                    numeric_series = map_unique_values(self.data[col], lambda u: pd.to_numeric(u, errors='coerce'),
+                                                       categorical=False)
                     if numeric_series.notna().sum() / len(self.data[col]) > 0.8:
                         self.data[col] = numeric_series
                         converted_cols += 1
                     else:
                         # 日付変換を試行
                         try:
-                            date_series = pd.to_datetime(self.data[col], errors='coerce')
+                            date_series = map_unique_values(self.data[col],
+                                                            lambda u: pd.to_datetime(u, errors='coerce'),
+                                                            categorical=False)
                             if date_series.notna().sum() / len(self.data[col]) > 0.5:
                                 self.data[col] = date_series
                                 converted_cols += 1
@@ -574,26 +633,28 @@ class TableauPreprocessorGUI:
                 method = method_var.get()
                 initial_nulls = self.data.isnull().sum().sum()
                 
-                if method == 'remove':
-                    self.data = self.data.dropna()
-                elif method == 'forward':
-                    self.data = self.data.fillna(method='ffill')
-                elif method == 'mean':
-                    numeric_cols = self.data.select_dtypes(include=[np.number]).columns
-                    self.data[numeric_cols] = self.data[numeric_cols].fillna(self.data[numeric_cols].mean())
-                elif method == 'median':
-                    numeric_cols = self.data.select_dtypes(include=[np.number]).columns
-                    self.data[numeric_cols] = self.data[numeric_cols].fillna(self.data[numeric_cols].median())
-                elif method == 'zero':
-                    self.data = self.data.fillna(0)
-                elif method == 'custom':
-                    custom_value = custom_var.get()
-                    self.data = self.data.fillna(custom_value)
+                with self.metrics.measure('fill_missing_values', self):
+                    if method == 'remove':
+                        self.data = self.data.dropna()
+                    elif method == 'forward':
+                        self.data = self.data.fillna(method='ffill')
+                    elif method == 'mean':
+                        numeric_cols = self.data.select_dtypes(include=[np.number]).columns
+                        self.data[numeric_cols] = self.data[numeric_cols].fillna(self.data[numeric_cols].mean())
+                    elif method == 'median':
+                        numeric_cols = self.data.select_dtypes(include=[np.number]).columns
+                        self.data[numeric_cols] = self.data[numeric_cols].fillna(self.data[numeric_cols].median())
+                    elif method == 'zero':
+                        self.data = fill_with_value(self.data, 0)
+                    elif method == 'custom':
+                        custom_value = custom_var.get()
+                        self.data = fill_with_value(self.data, custom_value)
+                    
+                    self.update_data_info()
                 
                 final_nulls = self.data.isnull().sum().sum()
                 processed_count = initial_nulls - final_nulls
                 
-                self.update_data_info()
                 self.update_data_table()
                 self.log_action(f"欠損値処理: {processed_count}個処理 (方法: {method})")
                 self.update_status(f"✅ {processed_count}個の欠損値を処理しました")
@@ -658,9 +719,10 @@ class TableauPreprocessorGUI:
                     messagebox.showwarning("警告", "新しい列名を入力してください")
                     return
                 
-                self.data = self.data.rename(columns={old_name: new_name})
+                with self.metrics.measure('rename_columns', self):
+                    self.data = self.data.rename(columns={old_name: new_name})
+                    self.update_data_info()
                 
-                self.update_data_info()
                 self.update_data_table()
                 self.log_action(f"列名変更: {old_name} -> {new_name}")
                 self.update_status(f"✅ 列名を変更しました: {old_name} -> {new_name}")
@@ -722,28 +784,30 @@ class TableauPreprocessorGUI:
                 
                 initial_rows = len(self.data)
                 
-                if condition == '==':
-                    self.data = self.data[self.data[column] == value]
-                elif condition == '!=':
-                    self.data = self.data[self.data[column] != value]
-                elif condition == '>':
-                    self.data = self.data[pd.to_numeric(self.data[column], errors='coerce') > float(value)]
-                elif condition == '<':
-                    self.data = self.data[pd.to_numeric(self.data[column], errors='coerce') < float(value)]
-                elif condition == '>=':
-                    self.data = self.data[pd.to_numeric(self.data[column], errors='coerce') >= float(value)]
-                elif condition == '<=':
-                    self.data = self.data[pd.to_numeric(self.data[column], errors='coerce') <= float(value)]
-                elif condition == 'contains':
-                    self.data = self.data[self.data[column].astype(str).str.contains(value, na=False)]
-                elif condition == 'startswith':
-                    self.data = self.data[self.data[column].astype(str).str.startswith(value, na=False)]
-                elif condition == 'endswith':
-                    self.data = self.data[self.data[column].astype(str).str.endswith(value, na=False)]
+                with self.metrics.measure('filter_data', self):
+                    if condition == '==':
+                        self.data = self.data[self.data[column] == value]
+                    elif condition == '!=':
+                        self.data = self.data[self.data[column] != value]
+                    elif condition == '>':
+                        self.data = self.data[pd.to_numeric(self.data[column], errors='coerce') > float(value)]
+                    elif condition == '<':
+                        self.data = self.data[pd.to_numeric(self.data[column], errors='coerce') < float(value)]
+                    elif condition == '>=':
+                        self.data = self.data[pd.to_numeric(self.data[column], errors='coerce') >= float(value)]
+                    elif condition == '<=':
+                        self.data = self.data[pd.to_numeric(self.data[column], errors='coerce') <= float(value)]
+                    elif condition == 'contains':
+                        self.data = self.data[self.data[column].astype(str).str.contains(value, na=False)]
+                    elif condition == 'startswith':
+                        self.data = self.data[self.data[column].astype(str).str.startswith(value, na=False)]
+                    elif condition == 'endswith':
+                        self.data = self.data[self.data[column].astype(str).str.endswith(value, na=False)]
+                    
+                    self.update_data_info()
                 
                 filtered_rows = initial_rows - len(self.data)
                 
-                self.update_data_info()
                 self.update_data_table()
                 self.log_action(f"データフィルタ: {column} {condition} {value} ({filtered_rows}行除外)")
                 self.update_status(f"✅ {filtered_rows}行をフィルタしました")
@@ -769,13 +833,18 @@ class TableauPreprocessorGUI:
         
         if file_path:
             try:
-                with pd.ExcelWriter(file_path, engine='openpyxl') as writer:
-                    self.data.to_excel(writer, sheet_name='Data', index=False)
-                    
-                    # 処理ログも保存
-                    if self.processing_log:
-                        log_df = pd.DataFrame(self.processing_log, columns=['処理ログ'])
-                        log_df.to_excel(writer, sheet_name='Log', index=False)
+                with self.metrics.measure('export_excel', self):
+                    with pd.ExcelWriter(file_path, engine='openpyxl') as writer:
+                        self.data.to_excel(writer, sheet_name='Data', index=False)
+                        
+                        # 処理ログも保存
+                        if self.processing_log:
+                            log_df = pd.DataFrame(self.processing_log, columns=['処理ログ'])
+                            log_df.to_excel(writer, sheet_name='Log', index=False)
+                        
+                        # 処理メトリクスも保存
+                        if self.metrics.records:
+                            self.metrics.to_dataframe().to_excel(writer, sheet_name='Metrics', index=False)
                 
                 self.log_action(f"Excel保存: {os.path.basename(file_path)}")
                 self.update_status(f"✅ Excelファイルを保存しました: {os.path.basename(file_path)}")
@@ -797,7 +866,8 @@ class TableauPreprocessorGUI:
         
         if file_path:
             try:
-                self.data.to_csv(file_path, index=False, encoding='utf-8-sig')
+                with self.metrics.measure('export_csv', self):
+                    self.data.to_csv(file_path, index=False, encoding='utf-8-sig')
                 
                 self.log_action(f"CSV保存: {os.path.basename(file_path)}")
                 self.update_status(f"✅ CSVファイルを保存しました: {os.path.basename(file_path)}")
@@ -816,6 +886,7 @@ class TableauPreprocessorGUI:
             self.update_data_info()
             self.update_data_table()
             self.processing_log = []
+            self.metrics.reset()
             self.log_action("データリセット完了")
             self.update_status("✅ データをリセットしました")
     
@@ -827,14 +898,20 @@ class TableauPreprocessorGUI:
         
         log_window = tk.Toplevel(self.root)
         log_window.title("処理ログ")
-        log_window.geometry("600x400")
+        log_window.geometry("900x500")
         
-        text_widget = scrolledtext.ScrolledText(log_window, wrap=tk.WORD, font=('Consolas', 9))
+        text_widget = scrolledtext.ScrolledText(log_window, wrap=tk.NONE, font=('Consolas', 9))
         text_widget.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
         
         for log in self.processing_log:
             text_widget.insert(tk.END, log + '\n')
         
+        # 操作ごとの計測結果
+        if self.metrics.records:
+            text_widget.insert(tk.END, '\n⏱️ 処理メトリクス\n')
+            for line in self.metrics.format_lines():
+                text_widget.insert(tk.END, line + '\n')
+        
         text_widget.config(state='disabled')
 
 
@@ -842,6 +919,8 @@ def main():
     """メイン関数"""
     root = tk.Tk()
     app = TableauPreprocessorGUI(root)
+    # ウィンドウ表示後、ファイル選択を待つ間に重いライブラリを読み込んでおく
+    root.after(200, lambda: preload('pandas', 'numpy', 'openpyxl'))
     root.mainloop()
 
 
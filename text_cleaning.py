@@ -0,0 +1,132 @@
+"""
+辞書エンコードによる文字列処理モジュール
+Description: 文字列列を「重複のない値（辞書）」と「各行の番号（コード）」に分け、
+             trim / 正規表現 / NFKC正規化（全角・半角の統一）などの処理を重複のない値だけに適用してから
+             コードで各行に戻す。service_type や payment_method のように同じ値が何百万行も繰り返される列では、
+             処理時間が行数ではなく重複のない値の数に比例する
+
+使用例:
+    df['service_type'] = clean_text_column(df['service_type'], ['nfkc', 'trim', 'normalize_space'])
+    df['amount'] = map_unique_values(df['amount'], lambda u: pd.to_numeric(u, errors='coerce'))
+"""
+
+from __future__ import annotations
+
+from typing import Callable, List
+
+from lazy_imports import lazy_import
+
+pd = lazy_import('pandas')
+np = lazy_import('numpy')
+
+DEFAULT_TEXT_OPERATIONS = ['nfkc', 'trim', 'normalize_space']
+
+# 重複のない値が行数のこの割合以下ならカテゴリ型で返す（それ以上はカテゴリにしても省メモリにならない）
+MAX_CATEGORY_RATIO = 0.5
+
+# 操作名 -> 重複のない値（文字列の Series）に適用する処理
+TEXT_OPERATIONS = {
+    'nfkc': lambda values: values.str.normalize('NFKC'),
+    'trim': lambda values: values.str.strip(),
+    'lower': lambda values: values.str.lower(),
+    'upper': lambda values: values.str.upper(),
+    'remove_special': lambda values: values.str.replace(r'[^\w\s]', '', regex=True),
+    'normalize_space': lambda values: values.str.replace(r'\s+', ' ', regex=True),
+}
+
+
+def _factorize(series: pd.Series):
+    """コード（欠損は -1）と重複のない値に分ける（カテゴリ型は既存の辞書をそのまま使う）"""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return series.cat.codes.to_numpy(), pd.Series(series.cat.categories)
+    codes, uniques = pd.factorize(series, use_na_sentinel=True)
+    return codes, pd.Series(uniques)
+
+
+def _rebuild(series: pd.Series, codes: np.ndarray, values: pd.Series, categorical: bool) -> pd.Series:
+    """変換後の重複のない値をコードで各行に戻す（変換で同じ値になったものはまとめ直す）"""
+    new_codes, new_uniques = pd.factorize(values, use_na_sentinel=True)
+    # 元のコード -> 新しいコード（欠損 -1 は末尾に足した -1 に対応させる）
+    row_codes = np.append(new_codes, -1).astype(np.int32)[codes]
+    if categorical:
+        result = pd.Categorical.from_codes(row_codes, categories=pd.Index(new_uniques).dropna())
+    else:
+        result = pd.api.extensions.take(np.asarray(new_uniques, dtype=object), row_codes, allow_fill=True)
+    return pd.Series(result, index=series.index, name=series.name)
+
+
+def map_unique_values(series: pd.Series, func: Callable[[pd.Series], pd.Series],
+                      categorical: bool = None) -> pd.Series:
+    """
+    重複のない値だけに func を適用し、結果を各行に戻す
+
+    Args:
+        series (pd.Series): 元の列
+        func (Callable): 重複のない値の Series を受け取り、同じ長さの Series を返す関数
+        categorical (bool): 結果をカテゴリ型にするか（None=元がカテゴリ型の場合のみ）
+
+    Returns:
+        pd.Series: 変換後の列
+    """
+    codes, uniques = _factorize(series)
+    values = pd.Series(func(uniques)).reset_index(drop=True)
+    if categorical is None:
+        categorical = isinstance(series.dtype, pd.CategoricalDtype)
+    if not categorical:
+        # 数値・日付への変換は型を保ったまま各行に戻す（欠損のコードは NaN / NaT になる）
+        return pd.Series(values.array.take(codes, allow_fill=True), index=series.index, name=series.name)
+    return _rebuild(series, codes, values, categorical=True)
+
+
+def clean_text_column(series: pd.Series, operations: List[str] = None,
+                      max_category_ratio: float = MAX_CATEGORY_RATIO) -> pd.Series:
+    """
+    文字列列をクリーニング（処理は重複のない値にだけ適用する）
+
+    欠損値は欠損のまま残す。重複のない値が少ない列はカテゴリ型で返す。
+
+    Args:
+        series (pd.Series): 元の列
+        operations (List[str]): TEXT_OPERATIONS の操作名（順に適用）
+        max_category_ratio (float): 重複のない値 / 行数 がこれ以下ならカテゴリ型で返す
+
+    Returns:
+        pd.Series: クリーニング後の列
+    """
+    operations = DEFAULT_TEXT_OPERATIONS if operations is None else operations
+    unknown = [op for op in operations if op not in TEXT_OPERATIONS]
+    if unknown:
+        raise ValueError(f"サポートされていない操作: {unknown}（{list(TEXT_OPERATIONS)}）")
+
+    codes, uniques = _factorize(series)
+    values = uniques.astype(str)
+    for operation in operations:
+        values = TEXT_OPERATIONS[operation](values)
+
+    categorical = (isinstance(series.dtype, pd.CategoricalDtype)
+                   or len(uniques) <= max_category_ratio * max(len(series), 1))
+    return _rebuild(series, codes, values, categorical)
+
+
+def is_text_column(series: pd.Series) -> bool:
+    """文字列の列か（object / string / 文字列のカテゴリ型）"""
+    dtype = series.dtype
+    if isinstance(dtype, pd.CategoricalDtype):
+        dtype = dtype.categories.dtype
+    return pd.api.types.is_object_dtype(dtype) or pd.api.types.is_string_dtype(dtype)
+
+
+def fill_with_value(data, value):
+    """
+    欠損値を value で埋める（Series / DataFrame）
+
+    カテゴリ型の列は、value がカテゴリにない場合は先にカテゴリへ追加してから埋める。
+    """
+    if isinstance(data, pd.Series):
+        if isinstance(data.dtype, pd.CategoricalDtype) and value not in data.cat.categories:
+            data = data.cat.add_categories([value])
+        return data.fillna(value)
+
+    columns = {col: fill_with_value(data[col], value) if isinstance(data[col].dtype, pd.CategoricalDtype)
+               else data[col] for col in data.columns}
+    return pd.DataFrame(columns, index=data.index).fillna(value)